@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+import numpy as np
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from redisvl.index import AsyncSearchIndex
+
+from arxivsearch import config
+from arxivsearch.api.routes.papers import embeddings
+from arxivsearch.db import facets, utils
+from arxivsearch.schema.models import BaseRequest, Provider
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+# readiness of this worker, updated by warmup
+state: Dict[str, Any] = {"models": False, "index": False, "error": None}
+
+
+async def warm_provider(index: AsyncSearchIndex, provider: str):
+    """Load the provider model and run a dummy KNN query on its field."""
+    await embeddings.warmup(provider)
+    dims = index.schema.fields[provider].attrs.dims
+    query = utils.build_vector_query(
+        np.full(dims, dims**-0.5, dtype=np.float32),
+        BaseRequest(
+            categories=[], years=[], provider=Provider(provider), number_of_results=1
+        ),
+    )
+    await index.query(query)
+
+
+async def warm(index: AsyncSearchIndex):
+    """Run the warmup steps that have not succeeded yet."""
+    if not state["index"]:
+        while not await utils.indexing_complete(index):
+            logger.info("Waiting for indexing to complete")
+            await asyncio.sleep(config.READY_POLL_INTERVAL)
+        if config.PRECOMPUTE_FACETS:
+            await facets.ensure_facet_table(index)
+        state["index"] = True
+
+    if not state["models"]:
+        if config.WARMUP:
+            await asyncio.gather(
+                *[warm_provider(index, provider) for provider in embeddings.providers]
+            )
+        state["models"] = True
+
+
+async def warmup(index: AsyncSearchIndex):
+    """
+    Get the worker ready for traffic: wait until the index has finished
+    indexing, build the facet table if it is missing and, unless WARMUP is
+    off, load every enabled provider and run a dummy embedding and KNN
+    query so that the first requests do not pay for cold models, clients
+    and caches.
+
+    Failures, e.g. Redis or the model server not being up yet, are retried
+    with exponential backoff up to WARMUP_RETRY_MAX_DELAY seconds until
+    warmup succeeds or the task is cancelled. The last error is reported by
+    /readyz meanwhile.
+    """
+    delay = config.READY_POLL_INTERVAL
+    while True:
+        try:
+            await warm(index)
+        except Exception as e:
+            logger.exception(f"Warmup failed, retrying in {delay:g}s")
+            state["error"] = f"{type(e).__name__}: {e}"
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, config.WARMUP_RETRY_MAX_DELAY)
+            continue
+        state["error"] = None
+        logger.info("Warmup complete, ready for traffic")
+        return
+
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness: the worker is up and serving requests."""
+    return {"status": "ok"}
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """Readiness: indexing is complete and the enabled models are warm."""
+    ready = state["index"] and state["models"]
+    return JSONResponse(
+        {"ready": ready, **state, "providers": embeddings.providers},
+        status_code=200 if ready else 503,
+    )
@@ -0,0 +1,99 @@
+from typing import Dict
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from arxivsearch.api.routes.papers import embeddings, response_cache
+from arxivsearch.db import facets, utils, vectors
+from arxivsearch.utils.metrics import registry, render_histogram, render_samples
+
+router = APIRouter()
+
+
+def pool_samples(pools: Dict[str, Dict[str, int]]):
+    """Connection counts of the Redis pools used by the API."""
+    for name, stats in pools.items():
+        yield {"pool": name, "state": "available"}, stats["available"]
+        yield {"pool": name, "state": "in_use"}, stats["in_use"]
+
+
+def cache_stats():
+    return {
+        "embedding": embeddings.cache.stats(),
+        "count": facets._count_cache.stats(),
+        "facets": facets._facets_cache.stats(),
+        "paper_vector": vectors._vector_cache.stats(),
+        "response": response_cache.stats(),
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request and stage latency histograms, Redis pool,
+    cache, embedding batch and executor statistics."""
+    lines = registry.render()
+    pools = utils.pool_stats()
+    lines += render_samples(
+        "arxivsearch_redis_connections", "gauge", pool_samples(pools)
+    )
+    for metric, kind, stat in (
+        ("pool_max_connections", "gauge", "max"),
+        ("pool_waiting", "gauge", "waiting"),
+        ("pool_wait_timeouts_total", "counter", "wait_timeouts"),
+    ):
+        lines += render_samples(
+            f"arxivsearch_redis_{metric}",
+            kind,
+            (({"pool": name}, stats[stat]) for name, stats in pools.items()),
+        )
+
+    caches = cache_stats()
+    for stat in ("hits", "misses", "evictions"):
+        lines += render_samples(
+            f"arxivsearch_cache_{stat}_total",
+            "counter",
+            (({"cache": name}, stats[stat]) for name, stats in caches.items()),
+        )
+    lines += render_samples(
+        "arxivsearch_cache_entries",
+        "gauge",
+        (({"cache": name}, stats["size"]) for name, stats in caches.items()),
+    )
+    for stat in ("redis_hits", "redis_misses", "redis_errors"):
+        lines += render_samples(
+            f"arxivsearch_embedding_cache_{stat}_total",
+            "counter",
+            [({}, caches["embedding"][stat])],
+        )
+        lines += render_samples(
+            f"arxivsearch_response_cache_{stat}_total",
+            "counter",
+            [({}, caches["response"][stat])],
+        )
+
+    executors = {
+        "network": embeddings.network_executor.stats(),
+        "huggingface": embeddings.hf_executor.stats(),
+    }
+    lines += render_samples(
+        "arxivsearch_embedding_executor_pending",
+        "gauge",
+        (({"executor": name}, stats["pending"]) for name, stats in executors.items()),
+    )
+    for stat in ("rejected", "timeouts"):
+        lines += render_samples(
+            f"arxivsearch_embedding_executor_{stat}_total",
+            "counter",
+            (({"executor": name}, stats[stat]) for name, stats in executors.items()),
+        )
+
+    for metric, key in (
+        ("batch_size", "batch_size"),
+        ("batch_wait_seconds", "wait_seconds"),
+    ):
+        name = f"arxivsearch_embedding_{metric}"
+        lines.append(f"# TYPE {name} histogram")
+        for provider, stats in embeddings.batch_stats().items():
+            lines += render_histogram(name, {"provider": provider}, stats[key])
+
+    return "\n".join(lines) + "\n"
@@ -1,33 +1,113 @@
 import asyncio
 import logging
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple, Union, cast
 
-import numpy as np
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from redisvl.index import AsyncSearchIndex
-from redisvl.query import CountQuery, FilterQuery, VectorQuery
+from redisvl.query import CountQuery, FilterQuery
 
 from arxivsearch import config
-from arxivsearch.db import utils
+from arxivsearch.db import facets, pagination, sharding, utils, vectors
 from arxivsearch.schema.models import (
+    BaseRequest,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    FacetsResponse,
+    FusedPaperSimilarityRequest,
+    FusedRequest,
+    FusedSearchResponse,
+    FusedTextSimilarityRequest,
     PaperSimilarityRequest,
     SearchResponse,
     UserTextSimilarityRequest,
     VectorSearchResponse,
 )
-from arxivsearch.utils.embeddings import Embeddings
+from arxivsearch.utils import fusion, serialization
+from arxivsearch.utils.cache import ResponseCache
+from arxivsearch.utils.embeddings import Embeddings, ProviderNotEnabled
+from arxivsearch.utils.executor import EmbeddingQueueFull
+from arxivsearch.utils.metrics import set_label, stage, timed
+from arxivsearch.utils.model_server import ModelServerUnavailable
 
 logger = logging.getLogger(__name__)
 
 
-# Initialize the API router
-router = APIRouter()
+# Initialize the API router, every route tracks the shards missing from its
+# results when the index is sharded
+router = APIRouter(dependencies=[Depends(sharding.track_failed_shards)])
 
 embeddings = Embeddings()
 
+response_cache = ResponseCache(
+    redis_client=utils.get_async_client() if config.RESPONSE_CACHE_REDIS else None
+)
+
+
+def canonical_request(
+    similarity_request: Union[BaseRequest, FusedRequest],
+) -> Dict[str, Any]:
+    """Request parameters with the filter in canonical form, so equivalent
+    requests share a response cache entry."""
+    years, categories = utils.normalize_filter(
+        similarity_request.years, similarity_request.categories
+    )
+    return {
+        **similarity_request.model_dump(mode="json"),
+        "years": years,
+        "categories": categories,
+    }
+
+
+async def cached_response(
+    index: AsyncSearchIndex, request: Request, endpoint: str, params: Dict[str, Any]
+) -> Tuple[Optional[str], Optional[Response]]:
+    """
+    Look up a cached response for a request.
+
+    Returns:
+        The cache key to store the response under, None when the response
+        cache is disabled, and the cached response, None on a miss.
+    """
+    if not config.RESPONSE_CACHE_ENABLED:
+        return None, None
+    media_type = serialization.media_type(request)
+    with stage("response_cache"):
+        version = await utils.get_index_version(index)
+        key = response_cache.key(
+            version, endpoint, {**params, "media_type": media_type}
+        )
+        body = await response_cache.get(key)
+    if body is None:
+        return key, None
+    return key, Response(body, media_type=media_type, headers={"X-Cache": "hit"})
+
+
+def flag_partial(response: Response) -> Response:
+    """Name the shards missing from a response in the X-Partial-Results
+    header."""
+    failed = sharding.failed_shards()
+    if failed:
+        response.headers["X-Partial-Results"] = ",".join(failed)
+    return response
+
+
+async def cache_response(key: Optional[str], response: Response) -> Response:
+    """Store a response computed after a cache miss, unless results of some
+    shards are missing from it."""
+    if sharding.failed_shards():
+        return flag_partial(response)
+    if key is not None:
+        await response_cache.set(key, response.body)
+        response.headers["X-Cache"] = "miss"
+    return response
+
 
 @router.get("/", response_model=SearchResponse)
 async def get_papers(
-    index: AsyncSearchIndex = Depends(utils.get_async_index),
+    request: Request,
+    index: AsyncSearchIndex = Depends(utils.get_read_index),
     limit: int = Query(default=20, description="Maximum number of papers to return."),
     skip: int = Query(
         default=0, description="Number of papers to skip for pagination."
@@ -38,9 +118,26 @@ async def get_papers(
     categories: str = Query(
         default="", description="Comma-separated string of categories to filter papers."
     ),
+    compact: bool = Query(
+        default=False,
+        description="Return only the paper fields shown in the UI, without embeddings.",
+    ),
+    cursor: Optional[str] = Query(
+        default=None,
+        description=(
+            'Cursor pagination token: "*" for the first page, then the '
+            "next_cursor of the previous page. skip is ignored."
+        ),
+    ),
 ):
     """Fetch and return papers with optional filtering by years and categories.
 
+    Offset pagination with skip gets slower with every page. Passing a
+    cursor instead pages through the results in paper_key order at a
+    constant cost per page, each response carrying the next_cursor to
+    continue with, None on the last page. Cursors hold no server state and
+    only continue the years, categories and compact they were issued for.
+
     Args:
         limit (int, optional): Maximum number of papers to return.
             Defaults to 20.
@@ -50,29 +147,176 @@ async def get_papers(
             Defaults to "".
         categories (str, optional): Comma-separated string of categories to
             filter papers. Defaults to "".
+        compact (bool, optional): Skip embeddings and abstracts.
+            Defaults to False.
+        cursor (str, optional): Cursor pagination token. Defaults to None.
 
     Returns:
         SearchResponse: Pydantic model containing papers and total count.
     """
     # Build queries
-    filter_expression = utils.build_filter_expression(
-        years.split(","), categories.split(",")
+    years_list, categories_list = years.split(","), categories.split(",")
+    filter_expression = utils.build_filter_expression(years_list, categories_list)
+    return_fields = serialization.COMPACT_FIELDS if compact else []
+
+    if cursor is not None:
+        try:
+            total_count, (result_papers, next_cursor) = await asyncio.gather(
+                timed("count", facets.count_papers(index, years_list, categories_list)),
+                timed(
+                    "search",
+                    pagination.read_page(
+                        index, filter_expression, limit, cursor, return_fields
+                    ),
+                ),
+            )
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        with stage("serialize"):
+            response = serialization.render(
+                serialization.search_content(
+                    SearchResponse,
+                    total_count,
+                    result_papers,
+                    compact,
+                    next_cursor=next_cursor,
+                ),
+                request,
+            )
+        return flag_partial(response)
+
+    normalized_years, normalized_categories = utils.normalize_filter(
+        years_list, categories_list
+    )
+    key, cached = await cached_response(
+        index,
+        request,
+        "papers",
+        {
+            "limit": limit,
+            "skip": skip,
+            "years": normalized_years,
+            "categories": normalized_categories,
+            "compact": compact,
+        },
+    )
+    if cached is not None:
+        return cached
+
+    # compact responses do not even read the embeddings from Redis
+    filter_query = FilterQuery(
+        return_fields=return_fields, filter_expression=filter_expression
     )
-    filter_query = FilterQuery(return_fields=[], filter_expression=filter_expression)
     filter_query.paging(skip, limit)
-    count_query = CountQuery(filter_expression)
 
     # Execute searches
     total_count, result_papers = await asyncio.gather(
-        index.query(count_query), index.query(filter_query)
+        timed("count", facets.count_papers(index, years_list, categories_list)),
+        timed("search", index.query(filter_query)),
+    )
+    with stage("serialize"):
+        response = serialization.render(
+            serialization.search_content(
+                SearchResponse, total_count, result_papers, compact
+            ),
+            request,
+        )
+    return await cache_response(key, response)
+
+
+@router.get("/export")
+async def export_papers(
+    index: AsyncSearchIndex = Depends(utils.get_async_index),
+    years: str = Query(
+        default="", description="Comma-separated string of years to filter papers."
+    ),
+    categories: str = Query(
+        default="", description="Comma-separated string of categories to filter papers."
+    ),
+):
+    """Stream every paper matching a filter as newline delimited JSON,
+    without embeddings. Papers are read through an FT.AGGREGATE cursor, so
+    memory use and per-page cost stay flat for any export size. Answers 503
+    when Redis cannot open a cursor.
+
+    Args:
+        years (str, optional): Comma-separated string of years to filter papers.
+            Defaults to "".
+        categories (str, optional): Comma-separated string of categories to
+            filter papers. Defaults to "".
+
+    Returns:
+        StreamingResponse: One JSON paper per line.
+    """
+    filter_expression = utils.build_filter_expression(
+        years.split(","), categories.split(",")
+    )
+    pages = pagination.scan_papers(
+        index,
+        filter_expression,
+        config.EXPORT_BATCH_SIZE,
+        return_fields=serialization.EXPORT_FIELDS,
+    )
+
+    # read the first page before responding, so a cursor Redis cannot open
+    # fails the request rather than the stream
+    try:
+        first: List[Dict[str, Any]] = await anext(pages, [])
+    except pagination.CursorUnavailable as e:
+        logger.warning(f"Export cursor unavailable: {e}")
+        raise HTTPException(status_code=503, detail="Export temporarily unavailable")
+
+    async def lines():
+        try:
+            if first:
+                yield serialization.ndjson(first)
+            async for papers in pages:
+                yield serialization.ndjson(papers)
+        finally:
+            await pages.aclose()
+
+    return StreamingResponse(lines(), media_type=serialization.NDJSON_MEDIA_TYPE)
+
+
+@router.get("/facets", response_model=FacetsResponse)
+async def get_facets(
+    request: Request,
+    index: AsyncSearchIndex = Depends(utils.get_read_index),
+    years: str = Query(
+        default="", description="Comma-separated string of years to filter papers."
+    ),
+    categories: str = Query(
+        default="", description="Comma-separated string of categories to filter papers."
+    ),
+):
+    """Return paper counts per year and per category, optionally scoped by
+    a year and category filter.
+
+    Args:
+        years (str, optional): Comma-separated string of years to filter papers.
+            Defaults to "".
+        categories (str, optional): Comma-separated string of categories to
+            filter papers. Defaults to "".
+
+    Returns:
+        FacetsResponse: Pydantic model containing the total and facet counts.
+    """
+    result = await timed(
+        "facets", facets.get_facets(index, years.split(","), categories.split(","))
     )
-    return SearchResponse(total=total_count, papers=result_papers)
+    with stage("serialize"):
+        return serialization.render(result, request)
 
 
 @router.post("/vector_search/by_paper", response_model=VectorSearchResponse)
 async def find_papers_by_paper(
     similarity_request: PaperSimilarityRequest,
-    index: AsyncSearchIndex = Depends(utils.get_async_index),
+    request: Request,
+    index: AsyncSearchIndex = Depends(utils.get_read_index),
+    compact: bool = Query(
+        default=False,
+        description="Return only the paper fields shown in the UI, without embeddings.",
+    ),
 ):
     """
     Find and return papers similar to a given paper based on vector
@@ -82,40 +326,64 @@ async def find_papers_by_paper(
         PaperSimilarityRequest: Similarity request object
             containing paper_id, provider, number_of_results, years, and
             categories for filtering.
+        compact (bool, optional): Skip abstracts. Defaults to False.
 
     Returns:
         VectorSearchResponse: Pydantic model with paper content.
     """
 
-    # Fetch paper vector from the HASH, cast to numpy array
-    paper = await index.fetch(similarity_request.paper_id)
-    paper_vector = np.frombuffer(
-        paper[similarity_request.provider.value], dtype=np.float32
+    set_label("provider", similarity_request.provider.value)
+    key, response = await cached_response(
+        index,
+        request,
+        "by_paper",
+        {**canonical_request(similarity_request), "compact": compact},
     )
-    # Build filter expression
-    filter_expression = utils.build_filter_expression(
-        similarity_request.years, similarity_request.categories
-    )
-    # Create queries
-    paper_similarity_query = VectorQuery(
-        vector=paper_vector,
-        vector_field_name=similarity_request.provider.value,
-        num_results=similarity_request.number_of_results,
-        return_fields=config.RETURN_FIELDS,
-        filter_expression=filter_expression,
+    if response is not None:
+        return response
+
+    # Fetch only the provider vector field from the HASH
+    paper_vector = await timed(
+        "vector_lookup",
+        vectors.get_paper_vector(
+            index, similarity_request.paper_id, similarity_request.provider.value
+        ),
     )
-    count_query = CountQuery(filter_expression)
+    if paper_vector is None:
+        raise HTTPException(
+            status_code=404, detail=f"Paper {similarity_request.paper_id} not found"
+        )
+    # Create query
+    paper_similarity_query = utils.build_vector_query(paper_vector, similarity_request)
     # Execute searches
     total_count, result_papers = await asyncio.gather(
-        index.query(count_query), index.query(paper_similarity_query)
+        timed(
+            "count",
+            facets.count_papers(
+                index, similarity_request.years, similarity_request.categories
+            ),
+        ),
+        timed("knn", index.query(paper_similarity_query)),
     )
-    return VectorSearchResponse(total=total_count, papers=result_papers)
+    with stage("serialize"):
+        response = serialization.render(
+            serialization.search_content(
+                VectorSearchResponse, total_count, result_papers, compact
+            ),
+            request,
+        )
+    return await cache_response(key, response)
 
 
 @router.post("/vector_search/by_text", response_model=VectorSearchResponse)
 async def find_papers_by_text(
     similarity_request: UserTextSimilarityRequest,
-    index: AsyncSearchIndex = Depends(utils.get_async_index),
+    request: Request,
+    index: AsyncSearchIndex = Depends(utils.get_read_index),
+    compact: bool = Query(
+        default=False,
+        description="Return only the paper fields shown in the UI, without embeddings.",
+    ),
 ):
     """
     Find and return papers similar to user-provided text based on
@@ -125,30 +393,358 @@ async def find_papers_by_text(
         UserTextSimilarityRequest: Similarity request
             object containing user_text, provider, number_of_results, years,
             and categories for filtering.
+        compact (bool, optional): Skip abstracts. Defaults to False.
 
     Returns:
         VectorSearchResponse: Pydantic model with paper content.
     """
 
-    # Build filter expression
-    filter_expression = utils.build_filter_expression(
-        similarity_request.years, similarity_request.categories
-    )
-    # Check available paper count and create vector from user text
-    count_query = CountQuery(filter_expression)
-    query_vector = await embeddings.get(
-        provider=similarity_request.provider.value, text=similarity_request.user_text
+    set_label("provider", similarity_request.provider.value)
+    key, response = await cached_response(
+        index,
+        request,
+        "by_text",
+        {
+            **canonical_request(similarity_request),
+            "compact": compact,
+            # the query vector depends on the model, not just the text
+            "model": embeddings.model_name(similarity_request.provider.value),
+        },
     )
+    if response is not None:
+        return response
+
+    # Create vector from user text
+    try:
+        query_vector = await embeddings.get(
+            provider=similarity_request.provider.value,
+            text=similarity_request.user_text,
+        )
+    except ProviderNotEnabled as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (EmbeddingQueueFull, ModelServerUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Embedding request timed out")
     # Assemble vector query
-    paper_similarity_query = VectorQuery(
-        vector=query_vector,
-        vector_field_name=similarity_request.provider.value,
-        num_results=similarity_request.number_of_results,
-        return_fields=config.RETURN_FIELDS,
-        filter_expression=filter_expression,
-    )
+    paper_similarity_query = utils.build_vector_query(query_vector, similarity_request)
     # Execute searches
     total_count, result_papers = await asyncio.gather(
-        index.query(count_query), index.query(paper_similarity_query)
+        timed(
+            "count",
+            facets.count_papers(
+                index, similarity_request.years, similarity_request.categories
+            ),
+        ),
+        timed("knn", index.query(paper_similarity_query)),
     )
-    return VectorSearchResponse(total=total_count, papers=result_papers)
+    with stage("serialize"):
+        response = serialization.render(
+            serialization.search_content(
+                VectorSearchResponse, total_count, result_papers, compact
+            ),
+            request,
+        )
+    return await cache_response(key, response)
+
+
+@router.post("/vector_search/batch", response_model=BatchSearchResponse)
+async def find_papers_batch(
+    batch_request: BatchSearchRequest,
+    request: Request,
+    index: AsyncSearchIndex = Depends(utils.get_read_index),
+    compact: bool = Query(
+        default=False,
+        description="Return only the paper fields shown in the UI, without embeddings.",
+    ),
+):
+    """
+    Run many by-text and by-paper similarity searches in one request.
+
+    All texts for a provider are embedded in one batched call, all paper
+    vectors are read in one pipeline and all KNN and count queries run in
+    one more pipeline.
+
+    Args:
+        BatchSearchRequest: Batch request object containing a list of
+            UserTextSimilarityRequest and PaperSimilarityRequest items.
+        compact (bool, optional): Skip abstracts. Defaults to False.
+
+    Returns:
+        BatchSearchResponse: Pydantic model with one VectorSearchResponse per
+            item, in request order.
+    """
+    items = batch_request.queries
+    text_items: Dict[str, List[Tuple[int, UserTextSimilarityRequest]]] = defaultdict(
+        list
+    )
+    paper_items: List[Tuple[int, PaperSimilarityRequest]] = []
+    for i, item in enumerate(items):
+        if isinstance(item, UserTextSimilarityRequest):
+            text_items[item.provider.value].append((i, item))
+        else:
+            paper_items.append((i, item))
+
+    # Embed texts per provider and fetch paper vectors concurrently
+    providers = list(text_items)
+    try:
+        *embedded, paper_vectors = await asyncio.gather(
+            *[
+                timed(
+                    "embed",
+                    embeddings.get_many(
+                        provider, [item.user_text for _, item in text_items[provider]]
+                    ),
+                )
+                for provider in providers
+            ],
+            timed(
+                "vector_lookup",
+                vectors.get_paper_vectors(
+                    index,
+                    [(item.paper_id, item.provider.value) for _, item in paper_items],
+                ),
+            ),
+        )
+    except ProviderNotEnabled as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (EmbeddingQueueFull, ModelServerUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Embedding request timed out")
+
+    query_vectors = dict(zip([i for i, _ in paper_items], paper_vectors))
+    for provider, provider_vectors in zip(providers, embedded):
+        query_vectors.update(
+            zip([i for i, _ in text_items[provider]], provider_vectors)
+        )
+
+    missing = [item.paper_id for i, item in paper_items if query_vectors[i] is None]
+    if missing:
+        raise HTTPException(
+            status_code=404, detail=f"Papers not found: {', '.join(missing)}"
+        )
+
+    # Resolve counts from the caches, the rest run as CountQuery
+    with stage("count"):
+        counts = await asyncio.gather(
+            *[facets.lookup_count(index, item.years, item.categories) for item in items]
+        )
+    uncounted = {
+        utils.normalize_filter(item.years, item.categories): item
+        for item, count in zip(items, counts)
+        if count is None
+    }
+    queries = [
+        utils.build_vector_query(query_vectors[i], item) for i, item in enumerate(items)
+    ]
+    queries += [
+        CountQuery(utils.build_filter_expression(list(years), list(categories)))
+        for years, categories in uncounted
+    ]
+    results = await timed("knn", utils.run_queries(index, queries))
+
+    computed = dict(zip(uncounted, results[len(items) :]))
+    if not sharding.failed_shards():
+        for (years, categories), count in computed.items():
+            await facets.remember_count(index, list(years), list(categories), count)
+
+    with stage("serialize"):
+        responses = [
+            serialization.search_content(
+                VectorSearchResponse,
+                (
+                    count
+                    if count is not None
+                    else computed[utils.normalize_filter(item.years, item.categories)]
+                ),
+                result_papers,
+                compact,
+            )
+            for item, count, result_papers in zip(items, counts, results)
+        ]
+        if compact:
+            response = serialization.render({"results": responses}, request)
+        else:
+            # without compact, search_content validated every response
+            results = cast(List[VectorSearchResponse], responses)
+            response = serialization.render(
+                BatchSearchResponse(results=results), request
+            )
+    return flag_partial(response)
+
+
+async def fused_search(
+    index: AsyncSearchIndex,
+    request: Request,
+    fused_request: FusedRequest,
+    query_vectors: List[Any],
+    compact: bool,
+) -> Response:
+    """
+    Run the KNN query of every provider of a fused request and the filter
+    count in one pipeline, then fuse the rankings.
+    """
+    providers = [provider.value for provider in fused_request.providers]
+    num_results = fused_request.number_of_results * config.FUSION_CANDIDATE_FACTOR
+    queries = [
+        utils.build_vector_query(vector, fused_request, provider, num_results)
+        for provider, vector in zip(providers, query_vectors)
+    ]
+    with stage("count"):
+        total_count = await facets.lookup_count(
+            index, fused_request.years, fused_request.categories
+        )
+    if total_count is None:
+        queries.append(
+            CountQuery(
+                utils.build_filter_expression(
+                    fused_request.years, fused_request.categories
+                )
+            )
+        )
+    results = await timed("knn", utils.run_queries(index, queries))
+    if total_count is None:
+        total_count = results.pop()
+        if not sharding.failed_shards():
+            await facets.remember_count(
+                index, fused_request.years, fused_request.categories, total_count
+            )
+
+    with stage("fusion"):
+        result_papers = fusion.fuse(
+            dict(zip(providers, results)),
+            method=fused_request.fusion.value,
+            weights={
+                provider.value: weight
+                for provider, weight in fused_request.weights.items()
+            },
+            k=fused_request.rrf_k,
+            limit=fused_request.number_of_results,
+        )
+    with stage("serialize"):
+        return serialization.render(
+            serialization.search_content(
+                FusedSearchResponse, total_count, result_papers, compact
+            ),
+            request,
+        )
+
+
+@router.post("/vector_search/fused/by_text", response_model=FusedSearchResponse)
+async def find_papers_by_text_fused(
+    fused_request: FusedTextSimilarityRequest,
+    request: Request,
+    index: AsyncSearchIndex = Depends(utils.get_read_index),
+    compact: bool = Query(
+        default=False,
+        description="Return only the paper fields shown in the UI, without embeddings.",
+    ),
+):
+    """
+    Find papers similar to user-provided text with several providers at
+    once, fusing their rankings.
+
+    The text is embedded by all providers concurrently and their KNN
+    queries run in one pipeline, so the request takes about as long as the
+    slowest provider.
+
+    Args:
+        FusedTextSimilarityRequest: Fused request object containing
+            user_text, providers, fusion method and weights,
+            number_of_results, years, and categories for filtering.
+        compact (bool, optional): Skip abstracts. Defaults to False.
+
+    Returns:
+        FusedSearchResponse: Pydantic model with paper content and the
+            fused score, ranks and distances of each paper.
+    """
+
+    set_label("provider", "fused")
+    key, response = await cached_response(
+        index,
+        request,
+        "fused_by_text",
+        {
+            **canonical_request(fused_request),
+            "compact": compact,
+            "models": [
+                embeddings.model_name(provider.value)
+                for provider in fused_request.providers
+            ],
+        },
+    )
+    if response is not None:
+        return response
+
+    try:
+        query_vectors = await asyncio.gather(
+            *[
+                embeddings.get(provider=provider.value, text=fused_request.user_text)
+                for provider in fused_request.providers
+            ]
+        )
+    except ProviderNotEnabled as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (EmbeddingQueueFull, ModelServerUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Embedding request timed out")
+
+    response = await fused_search(index, request, fused_request, query_vectors, compact)
+    return await cache_response(key, response)
+
+
+@router.post("/vector_search/fused/by_paper", response_model=FusedSearchResponse)
+async def find_papers_by_paper_fused(
+    fused_request: FusedPaperSimilarityRequest,
+    request: Request,
+    index: AsyncSearchIndex = Depends(utils.get_read_index),
+    compact: bool = Query(
+        default=False,
+        description="Return only the paper fields shown in the UI, without embeddings.",
+    ),
+):
+    """
+    Find papers similar to a given paper with several providers at once,
+    fusing their rankings. The paper vectors of all providers are read in
+    one pipeline and the KNN queries run in another.
+
+    Args:
+        FusedPaperSimilarityRequest: Fused request object containing
+            paper_id, providers, fusion method and weights,
+            number_of_results, years, and categories for filtering.
+        compact (bool, optional): Skip abstracts. Defaults to False.
+
+    Returns:
+        FusedSearchResponse: Pydantic model with paper content and the
+            fused score, ranks and distances of each paper.
+    """
+
+    set_label("provider", "fused")
+    key, response = await cached_response(
+        index,
+        request,
+        "fused_by_paper",
+        {**canonical_request(fused_request), "compact": compact},
+    )
+    if response is not None:
+        return response
+
+    query_vectors = await timed(
+        "vector_lookup",
+        vectors.get_paper_vectors(
+            index,
+            [
+                (fused_request.paper_id, provider.value)
+                for provider in fused_request.providers
+            ],
+        ),
+    )
+    if any(vector is None for vector in query_vectors):
+        raise HTTPException(
+            status_code=404, detail=f"Paper {fused_request.paper_id} not found"
+        )
+
+    response = await fused_search(index, request, fused_request, query_vectors, compact)
+    return await cache_response(key, response)
@@ -0,0 +1,297 @@
+"""
+End-to-end load benchmark for the search API.
+
+Drives the app in-process through the ASGI transport, or a running server
+with --url, at a fixed concurrency with a weighted mix of endpoints,
+providers and filter selectivities. Query papers, years and categories are
+sampled from the index itself. Reports requests per second and p50/p95/p99
+latency per endpoint and writes the results as JSON for comparison across
+commits.
+
+Run offline against a local Redis with deterministic stub embeddings:
+
+    EMBEDDING_STUB=true python -m arxivsearch.benchmarks.api \\
+        --concurrency 32 --duration 30 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from arxivsearch import config
+
+ENDPOINTS = ("papers", "by_paper", "by_text")
+SELECTIVITIES = ("none", "year", "category", "both")
+
+
+def parse_weights(value: str, choices: Tuple[str, ...]) -> Dict[str, float]:
+    """Parse "a=3,b=1" into weights, rejecting unknown keys."""
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in choices:
+            raise argparse.ArgumentTypeError(f"{name} is not one of {choices}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class Workload:
+    """Generates random requests from papers sampled out of the index."""
+
+    def __init__(
+        self,
+        papers: List[Dict[str, Any]],
+        endpoints: Dict[str, float],
+        providers: Dict[str, float],
+        selectivities: Dict[str, float],
+        number_of_results: int,
+        seed: int,
+    ):
+        if not papers:
+            raise ValueError("The index returned no papers to sample queries from")
+        self.papers = papers
+        self.endpoints = endpoints
+        self.providers = providers
+        self.selectivities = selectivities
+        self.number_of_results = number_of_results
+        self.random = random.Random(seed)
+
+    def choose(self, weights: Dict[str, float]) -> str:
+        return self.random.choices(list(weights), list(weights.values()))[0]
+
+    def filters(self) -> Tuple[List[str], List[str]]:
+        """Year and category filters taken from a random paper so that the
+        filtered result set is never empty."""
+        paper = self.random.choice(self.papers)
+        selectivity = self.choose(self.selectivities)
+        years = [paper["year"]] if selectivity in ("year", "both") else []
+        categories = (
+            [self.random.choice(paper["categories"].split("|"))]
+            if selectivity in ("category", "both")
+            else []
+        )
+        return years, categories
+
+    def next(self) -> Tuple[str, str, str, Dict[str, Any]]:
+        """Return (endpoint, method, path, payload) for the next request."""
+        endpoint = self.choose(self.endpoints)
+        years, categories = self.filters()
+        if endpoint == "papers":
+            params = {
+                "years": ",".join(years),
+                "categories": ",".join(categories),
+                "limit": self.number_of_results,
+            }
+            return endpoint, "GET", "papers/", params
+
+        paper = self.random.choice(self.papers)
+        body: Dict[str, Any] = {
+            "provider": self.choose(self.providers),
+            "years": years,
+            "categories": categories,
+            "number_of_results": self.number_of_results,
+        }
+        if endpoint == "by_paper":
+            body["paper_id"] = paper["paper_id"]
+            return endpoint, "POST", "papers/vector_search/by_paper", body
+        body["user_text"] = paper["title"]
+        return endpoint, "POST", "papers/vector_search/by_text", body
+
+
+async def sample_papers(client: httpx.AsyncClient, count: int) -> List[Dict]:
+    response = await client.get("papers/", params={"limit": count})
+    response.raise_for_status()
+    return response.json()["papers"]
+
+
+async def send(
+    client: httpx.AsyncClient, method: str, path: str, payload: Dict[str, Any]
+) -> int:
+    if method == "GET":
+        response = await client.get(path, params=payload)
+    else:
+        response = await client.post(path, json=payload)
+    return response.status_code
+
+
+async def drive(
+    client: httpx.AsyncClient,
+    workload: Workload,
+    concurrency: int,
+    duration: Optional[float],
+    requests: Optional[int],
+    warmup: int,
+) -> Tuple[List[Tuple[str, int, float]], float]:
+    """
+    Run requests from concurrency workers until duration seconds pass or
+    the request budget is spent. Returns (endpoint, status, latency seconds)
+    samples and the measured wall time.
+    """
+    for _ in range(warmup):
+        _, method, path, payload = workload.next()
+        await send(client, method, path, payload)
+
+    samples: List[Tuple[str, int, float]] = []
+    remaining = {"requests": requests}
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    async def worker():
+        while True:
+            if deadline and time.perf_counter() >= deadline:
+                return
+            if remaining["requests"] is not None:
+                if remaining["requests"] <= 0:
+                    return
+                remaining["requests"] -= 1
+            endpoint, method, path, payload = workload.next()
+            sent_at = time.perf_counter()
+            try:
+                status = await send(client, method, path, payload)
+            except httpx.HTTPError:
+                status = 0
+            samples.append((endpoint, status, time.perf_counter() - sent_at))
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples: List[Tuple[str, int, float]], elapsed: float) -> Dict:
+    """Requests per second, error count and latency percentiles (in
+    milliseconds) per endpoint and overall."""
+    groups: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+    for endpoint, status, latency in samples:
+        groups[endpoint].append((status, latency))
+        groups["all"].append((status, latency))
+
+    summary = {}
+    for endpoint, group in sorted(groups.items()):
+        latencies = np.array([latency for _, latency in group]) * 1000
+        summary[endpoint] = {
+            "requests": len(group),
+            "errors": sum(1 for status, _ in group if not 200 <= status < 300),
+            "rps": round(len(group) / elapsed, 1),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+            "mean_ms": round(float(latencies.mean()), 2),
+        }
+    return summary
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    async with AsyncExitStack() as stack:
+        if args.url:
+            target = args.url
+            transport = None
+        else:
+            from asgi_lifespan import LifespanManager
+
+            from arxivsearch.main import app
+
+            await stack.enter_async_context(LifespanManager(app=app))
+            target = "asgi"
+            transport = httpx.ASGITransport(app=app)  # type: ignore
+
+        base_url = (args.url or "http://bench").rstrip("/") + config.API_V1_STR + "/"
+        client = await stack.enter_async_context(
+            httpx.AsyncClient(
+                transport=transport,
+                base_url=base_url,
+                timeout=args.timeout,
+                limits=httpx.Limits(max_connections=args.concurrency),
+            )
+        )
+        workload = Workload(
+            await sample_papers(client, args.sample),
+            args.mix,
+            args.providers,
+            args.selectivity,
+            args.number_of_results,
+            args.seed,
+        )
+        samples, elapsed = await drive(
+            client,
+            workload,
+            args.concurrency,
+            args.duration,
+            args.requests,
+            args.warmup,
+        )
+
+    return {
+        "commit": git_commit(),
+        "target": target,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "embedding_stub": config.EMBEDDING_STUB,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 2),
+        "mix": args.mix,
+        "providers": args.providers,
+        "selectivity": args.selectivity,
+        "endpoints": summarize(samples, elapsed),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load benchmark for the search API.")
+    parser.add_argument(
+        "--url", help="Base URL of a running server, e.g. http://localhost:8888"
+    )
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument(
+        "--mix",
+        type=lambda v: parse_weights(v, ENDPOINTS),
+        default="papers=1,by_paper=1,by_text=1",
+        help="Endpoint weights",
+    )
+    parser.add_argument(
+        "--providers",
+        type=lambda v: parse_weights(v, ("huggingface", "openai", "cohere")),
+        default="huggingface=1,openai=1,cohere=1",
+        help="Provider weights for vector searches",
+    )
+    parser.add_argument(
+        "--selectivity",
+        type=lambda v: parse_weights(v, SELECTIVITIES),
+        default="none=1,year=1,category=1,both=1",
+        help="Filter weights: no filter, one year, one category or both",
+    )
+    parser.add_argument("--number-of-results", type=int, default=15)
+    parser.add_argument("--sample", type=int, default=200, help="Papers to sample")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results to this JSON file")
+    args = parser.parse_args()
+    if args.requests:
+        args.duration = None
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results["endpoints"], indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
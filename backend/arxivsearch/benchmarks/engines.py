@@ -0,0 +1,177 @@
+"""
+Compare the in-process NumPy engine with Redis on the same dataset.
+
+The dataset is loaded into a LocalSearchIndex and into a scratch Redis
+index, then the same random vector, count and filter queries are replayed
+against both. Reports p50/p99 latency per engine and query type, and the
+recall@k of Redis HNSW results against the exact local results. The
+scratch Redis index is dropped afterwards.
+
+    python -m arxivsearch.benchmarks.engines --limit 1000 --queries 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import BaseQuery, CountQuery, FilterQuery
+
+from arxivsearch import config
+from arxivsearch.db.dataset import iter_papers
+from arxivsearch.db.load import write_async
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.utils import (
+    HNSWVectorQuery,
+    build_filter_expression,
+    get_async_client,
+    get_schema,
+    indexing_complete,
+)
+from arxivsearch.utils.vectors import encode_vector
+
+
+def percentiles(latencies: List[float]) -> Dict[str, float]:
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+def make_queries(
+    papers: List[Dict[str, Any]], providers: List[str], count: int, k: int, seed: int
+) -> List[Dict[str, BaseQuery]]:
+    """Random vector, count and filter queries with filters taken from
+    dataset papers."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        paper = rng.choice(papers)
+        years = [paper["year"]] if rng.random() < 0.5 else []
+        categories = (
+            [rng.choice(paper["categories"].split(","))] if rng.random() < 0.5 else []
+        )
+        filter_expression = build_filter_expression(years, categories)
+        provider = rng.choice(providers)
+        datatype = config.VECTOR_DATATYPES[provider]
+        filter_query = FilterQuery(
+            return_fields=[], filter_expression=filter_expression
+        )
+        filter_query.paging(0, 20)
+        queries.append(
+            {
+                "vector": HNSWVectorQuery(
+                    vector=encode_vector(rng.choice(papers)[provider], datatype),
+                    vector_field_name=provider,
+                    dtype=datatype,
+                    num_results=k,
+                    return_fields=["paper_id"],
+                    filter_expression=filter_expression,
+                ),
+                "count": CountQuery(filter_expression),
+                "filter": filter_query,
+            }
+        )
+    return queries
+
+
+async def replay(index: Any, queries: List[Dict[str, BaseQuery]]) -> Dict:
+    latencies: Dict[str, List[float]] = {kind: [] for kind in queries[0]}
+    ids = []
+    for query_set in queries:
+        for kind, query in query_set.items():
+            start = time.perf_counter()
+            result = await index.query(query)
+            latencies[kind].append(time.perf_counter() - start)
+            if kind == "vector":
+                ids.append({doc["paper_id"] for doc in result})
+    return {"latencies": latencies, "ids": ids}
+
+
+async def wait_for_indexing(index: AsyncSearchIndex):
+    while not await indexing_complete(index):
+        await asyncio.sleep(0.1)
+
+
+async def run(args: argparse.Namespace) -> Dict:
+    papers = list(itertools.islice(iter_papers(args.dataset), args.limit))
+    queries = make_queries(papers, args.providers, args.queries, args.k, args.seed)
+
+    local = LocalSearchIndex(get_schema())
+    await local.create()
+    start = time.perf_counter()
+    await write_async(local, [dict(paper) for paper in papers])
+    local_load = time.perf_counter() - start
+
+    schema = get_schema()
+    schema.index.name = f"{schema.index.name}-engine-bench"
+    schema.index.prefix = f"{schema.index.prefix}-engine-bench"
+    remote = AsyncSearchIndex(schema, redis_client=get_async_client())
+    await remote.create(overwrite=True, drop=True)
+    try:
+        start = time.perf_counter()
+        await write_async(remote, [dict(paper) for paper in papers])
+        await wait_for_indexing(remote)
+        remote_load = time.perf_counter() - start
+
+        results = {
+            "local": await replay(local, queries),
+            "redis": await replay(remote, queries),
+        }
+    finally:
+        await remote.delete(drop=True)
+
+    hits = sum(
+        len(exact & approximate)
+        for exact, approximate in zip(results["local"]["ids"], results["redis"]["ids"])
+    )
+    expected = sum(len(exact) for exact in results["local"]["ids"])
+    return {
+        "papers": len(papers),
+        "queries": len(queries),
+        "providers": args.providers,
+        f"redis_recall@{args.k}": round(hits / max(expected, 1), 4),
+        "engines": {
+            engine: {
+                "load_s": round(load, 2),
+                **{
+                    kind: percentiles(latencies)
+                    for kind, latencies in results[engine]["latencies"].items()
+                },
+            }
+            for engine, load in (("local", local_load), ("redis", remote_load))
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the local NumPy engine with Redis."
+    )
+    parser.add_argument(
+        "--dataset",
+        default=os.path.join(config.DATA_LOCATION, config.DEFAULT_DATASET),
+        help="JSON or JSON-lines dataset",
+    )
+    parser.add_argument(
+        "--providers", default="huggingface,openai,cohere", type=lambda v: v.split(",")
+    )
+    parser.add_argument("-k", type=int, default=15, help="Neighbours per query")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=None, help="Max papers to load")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
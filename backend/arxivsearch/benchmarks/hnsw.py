@@ -0,0 +1,193 @@
+"""
+Sweep HNSW build and query parameters against a running Redis.
+
+For every (M, EF_CONSTRUCTION) pair a scratch index holding one provider's
+dataset vectors is built, every EF_RUNTIME value is replayed for a held-out
+query set, and recall@k against exact cosine KNN, p50/p99 query latency and
+index memory are reported. Scratch indexes are dropped afterwards.
+
+    python -m arxivsearch.benchmarks.hnsw --provider openai \\
+        --m 8,16,32 --ef-construction 100,200 --ef-runtime 10,50,100
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+from redis import Redis
+from redisvl.index import SearchIndex
+
+from arxivsearch import config
+from arxivsearch.benchmarks.precision import recall, top_k
+from arxivsearch.db.dataset import read_vectors
+from arxivsearch.db.utils import HNSWVectorQuery
+from arxivsearch.utils.vectors import encode_vector
+
+
+def build_index(
+    client: Redis,
+    vectors: np.ndarray,
+    datatype: str,
+    m: int,
+    ef_construction: int,
+    batch_size: int = 1000,
+) -> SearchIndex:
+    """Create a scratch index with the given parameters, load the vectors
+    and wait until they are all indexed."""
+    name = f"hnsw-sweep-m{m}-efc{ef_construction}"
+    index = SearchIndex.from_dict(
+        {
+            "index": {"name": name, "prefix": name, "storage_type": "hash"},
+            "fields": [
+                {
+                    "name": "vector",
+                    "type": "vector",
+                    "attrs": {
+                        "dims": vectors.shape[1],
+                        "datatype": datatype,
+                        "algorithm": "hnsw",
+                        "distance_metric": "cosine",
+                        "m": m,
+                        "ef_construction": ef_construction,
+                    },
+                }
+            ],
+        },
+        redis_client=client,
+    )
+    index.create(overwrite=True, drop=True)
+
+    for start in range(0, len(vectors), batch_size):
+        pipe = client.pipeline(transaction=False)
+        for i, vector in enumerate(vectors[start : start + batch_size], start):
+            pipe.hset(index.key(str(i)), "vector", encode_vector(vector, datatype))
+        pipe.execute()
+
+    while True:
+        info = index.info()
+        if int(info["num_docs"]) >= len(vectors) and not int(info["indexing"]):
+            return index
+        time.sleep(0.1)
+
+
+def replay(
+    index: SearchIndex,
+    queries: np.ndarray,
+    datatype: str,
+    k: int,
+    ef_runtime: int,
+) -> Dict:
+    """Run every query with the given EF_RUNTIME, returning the retrieved
+    ids and per-query latencies in milliseconds."""
+    ids: List[List[int]] = []
+    latencies: List[float] = []
+    for vector in queries:
+        query = HNSWVectorQuery(
+            vector=encode_vector(vector, datatype),
+            vector_field_name="vector",
+            dtype=datatype,
+            num_results=k,
+            return_fields=[],
+            ef_runtime=ef_runtime,
+        )
+        start = time.perf_counter()
+        results = index.query(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        ids.append([int(result["id"].rsplit(":", 1)[-1]) for result in results])
+    return {"ids": ids, "latencies": latencies}
+
+
+def sweep(
+    client: Redis,
+    path: str,
+    provider: str,
+    m_values: List[int],
+    ef_construction_values: List[int],
+    ef_runtime_values: List[int],
+    k: int,
+    queries: int,
+    limit: int,
+) -> List[Dict]:
+    vectors = read_vectors(path, provider, limit)
+    if len(vectors) <= queries:
+        raise ValueError(f"Need more than {queries} vectors, found {len(vectors)}")
+    corpus, query_vectors = vectors[:-queries], vectors[-queries:]
+    k = min(k, len(corpus))
+    expected = top_k(corpus, query_vectors, k)
+    datatype = config.VECTOR_DATATYPES[provider]
+
+    rows = []
+    for m in m_values:
+        for ef_construction in ef_construction_values:
+            start = time.perf_counter()
+            index = build_index(client, corpus, datatype, m, ef_construction)
+            build_seconds = time.perf_counter() - start
+            memory_mb = float(index.info()["vector_index_sz_mb"])
+            try:
+                for ef_runtime in ef_runtime_values:
+                    result = replay(index, query_vectors, datatype, k, ef_runtime)
+                    actual = np.array(
+                        [ids + [-1] * (k - len(ids)) for ids in result["ids"]]
+                    )
+                    rows.append(
+                        {
+                            "m": m,
+                            "ef_construction": ef_construction,
+                            "ef_runtime": ef_runtime,
+                            f"recall@{k}": round(recall(expected, actual), 4),
+                            "p50_ms": round(
+                                float(np.percentile(result["latencies"], 50)), 3
+                            ),
+                            "p99_ms": round(
+                                float(np.percentile(result["latencies"], 99)), 3
+                            ),
+                            "index_mb": round(memory_mb, 2),
+                            "build_s": round(build_seconds, 2),
+                        }
+                    )
+                    print(json.dumps(rows[-1]), flush=True)
+            finally:
+                index.delete(drop=True)
+    return rows
+
+
+def int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Sweep HNSW parameters and report recall, latency and memory."
+    )
+    parser.add_argument(
+        "--dataset",
+        default=os.path.join(config.DATA_LOCATION, config.DEFAULT_DATASET),
+        help="JSON, JSON-lines or binary dataset",
+    )
+    parser.add_argument("--provider", default=config.DEFAULT_PROVIDER)
+    parser.add_argument("--m", type=int_list, default=[8, 16, 32])
+    parser.add_argument("--ef-construction", type=int_list, default=[100, 200])
+    parser.add_argument("--ef-runtime", type=int_list, default=[10, 50, 100, 200])
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--queries", type=int, default=100, help="Held-out queries")
+    parser.add_argument("--limit", type=int, default=None, help="Max papers to read")
+    parser.add_argument("--output", help="Also write all rows to this JSON file")
+    args = parser.parse_args()
+
+    rows = sweep(
+        Redis.from_url(config.REDIS_URL),
+        args.dataset,
+        args.provider,
+        args.m,
+        args.ef_construction,
+        args.ef_runtime,
+        args.k,
+        args.queries,
+        args.limit,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,105 @@
+"""
+Measure the recall and memory trade-off of reduced-precision vector storage.
+
+Every datatype encodes the dataset vectors the way the loader would, decodes
+them again and runs exact cosine KNN for a held-out set of query papers.
+Recall@k is measured against float32 results, so it isolates the loss due
+to precision from the approximation of the HNSW index itself.
+
+    python -m arxivsearch.benchmarks.precision --provider huggingface -k 10
+"""
+
+import argparse
+import json
+import os
+from typing import Dict
+
+import numpy as np
+
+from arxivsearch import config
+from arxivsearch.db.dataset import read_vectors
+from arxivsearch.utils.vectors import DATATYPES, decode_vector, encode_vector
+
+BYTES_PER_COMPONENT = {"float32": 4, "float16": 2, "bfloat16": 2, "int8": 1}
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k most cosine-similar corpus rows for each query."""
+    scores = normalize(queries) @ normalize(corpus).T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(-scores, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+def recall(expected: np.ndarray, actual: np.ndarray) -> float:
+    hits = sum(len(set(e) & set(a)) for e, a in zip(expected, actual))
+    return hits / expected.size
+
+
+def index_bytes_per_vector(dims: int, datatype: str, m: int) -> int:
+    """
+    Estimated HNSW memory per vector: the vector itself plus the 2*M
+    neighbour ids of the bottom layer (upper layers add roughly 1/M of that).
+    """
+    links = 2 * m * 4 * (1 + 1 / max(m, 1))
+    return int(dims * BYTES_PER_COMPONENT[datatype] + links)
+
+
+def run(path: str, provider: str, k: int, queries: int, limit: int, m: int) -> Dict:
+    vectors = read_vectors(path, provider, limit)
+    if len(vectors) <= queries:
+        raise ValueError(f"Need more than {queries} vectors, found {len(vectors)}")
+    corpus, query_vectors = vectors[:-queries], vectors[-queries:]
+    k = min(k, len(corpus))
+    expected = top_k(corpus, query_vectors, k)
+
+    results = []
+    for datatype in DATATYPES:
+        decoded = np.stack(
+            [decode_vector(encode_vector(v, datatype), datatype) for v in corpus]
+        )
+        query_decoded = np.stack(
+            [decode_vector(encode_vector(v, datatype), datatype) for v in query_vectors]
+        )
+        per_vector = index_bytes_per_vector(vectors.shape[1], datatype, m)
+        results.append(
+            {
+                "datatype": datatype,
+                f"recall@{k}": round(
+                    recall(expected, top_k(decoded, query_decoded, k)), 4
+                ),
+                "vector_bytes": vectors.shape[1] * BYTES_PER_COMPONENT[datatype],
+                "index_mb_per_million": round(per_vector * 1e6 / 2**20, 1),
+            }
+        )
+    return {
+        "provider": provider,
+        "papers": len(corpus),
+        "queries": len(query_vectors),
+        "dims": int(vectors.shape[1]),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark recall and memory of vector storage datatypes."
+    )
+    parser.add_argument(
+        "--dataset",
+        default=os.path.join(config.DATA_LOCATION, config.DEFAULT_DATASET),
+        help="JSON, JSON-lines or binary dataset",
+    )
+    parser.add_argument("--provider", default=config.DEFAULT_PROVIDER)
+    parser.add_argument("-k", type=int, default=10, help="Neighbours per query")
+    parser.add_argument("--queries", type=int, default=100, help="Held-out queries")
+    parser.add_argument("--limit", type=int, default=None, help="Max papers to read")
+    parser.add_argument("--m", type=int, default=16, help="HNSW M of the index")
+    args = parser.parse_args()
+    report = run(args.dataset, args.provider, args.k, args.queries, args.limit, args.m)
+    print(json.dumps(report, indent=2))
@@ -0,0 +1,126 @@
+"""
+Measure the cost of encoding search responses.
+
+Compares the former path (build the response model, then let FastAPI
+validate it again against response_model and encode it with
+jsonable_encoder) with validating once and encoding with pydantic-core,
+and with compact responses encoded with orjson or msgpack.
+
+    python -m arxivsearch.benchmarks.serialization --results 15
+"""
+
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from arxivsearch.schema.models import SearchResponse, VectorSearchResponse
+from arxivsearch.utils import serialization
+
+DIMS = {"huggingface": 768, "openai": 1536, "cohere": 1024}
+
+
+def vector_rows(count: int) -> List[Dict]:
+    """Result rows as returned by a KNN query."""
+    return [
+        {
+            "id": f"paper:{i}",
+            "paper_id": f"2101.{i:05d}",
+            "authors": "Jane Doe, John Doe, Alan Smithee",
+            "categories": "cs.LG|cs.AI|stat.ML",
+            "year": "2021",
+            "title": "On the Benchmarking of Response Serialization in Search APIs",
+            "vector_distance": f"{0.1 + i / 100:.6f}",
+        }
+        for i in range(count)
+    ]
+
+
+def filter_rows(count: int) -> List[Dict]:
+    """Result rows as returned by a FilterQuery without return fields, with
+    every embedding read as a string."""
+    rng = np.random.default_rng(0)
+    rows = vector_rows(count)
+    for row in rows:
+        del row["vector_distance"]
+        for provider, dims in DIMS.items():
+            vector = rng.standard_normal(dims).astype(np.float32).tobytes()
+            row[provider] = vector.decode("utf-8", "ignore")
+    return rows
+
+
+def run_sync(coroutine):
+    """Run a coroutine that never suspends, without event loop overhead."""
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("Coroutine suspended")
+
+
+def revalidated(model, rows: List[Dict]) -> Callable[[], bytes]:
+    field = create_response_field(name="Response_benchmark", type_=model)
+
+    def encode() -> bytes:
+        content = model(total=1000, papers=rows)
+        data = run_sync(serialize_response(field=field, response_content=content))
+        return JSONResponse(data).body
+
+    return encode
+
+
+def validated_once(model, rows: List[Dict]) -> Callable[[], bytes]:
+    return lambda: model(total=1000, papers=rows).model_dump_json().encode()
+
+
+def compact_json(rows: List[Dict]) -> Callable[[], bytes]:
+    return lambda: serialization.dumps(serialization.compact_response(1000, rows))
+
+
+def compact_msgpack(rows: List[Dict]) -> Callable[[], bytes]:
+    return lambda: serialization.msgpack.packb(  # type: ignore
+        serialization.compact_response(1000, rows)
+    )
+
+
+def measure(encode: Callable[[], bytes], repeat: int) -> Dict:
+    size = len(encode())
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encode()
+        timings.append(time.perf_counter() - start)
+    return {
+        "median_us": round(float(np.median(timings)) * 1e6, 1),
+        "bytes": size,
+    }
+
+
+def run(results: int, repeat: int) -> Dict:
+    report = {}
+    for name, model, rows in (
+        ("vector_search", VectorSearchResponse, vector_rows(results)),
+        ("get_papers", SearchResponse, filter_rows(results)),
+    ):
+        paths = {
+            "response_model": revalidated(model, rows),
+            "validate_once": validated_once(model, rows),
+            "compact_json": compact_json(rows),
+        }
+        if serialization.HAS_MSGPACK:
+            paths["compact_msgpack"] = compact_msgpack(rows)
+        report[name] = {path: measure(encode, repeat) for path, encode in paths.items()}
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark response serialization.")
+    parser.add_argument("--results", type=int, default=15, help="Papers per response")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(run(args.results, args.repeat), indent=2))
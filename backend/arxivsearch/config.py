@@ -11,7 +11,25 @@ DEFAULT_DATASET = os.environ.get("DEFAULT_DATASET", "arxiv-papers-1000.json")
 S3_DATA_URL = "https://arxiv-search.s3.us-east-2.amazonaws.com/arxiv-papers-1000.json"
 DATA_LOCATION = os.environ.get("DATA_LOCATION", "../data")
 DEPLOYMENT_ENV = os.environ.get("DEPLOYMENT", "dev")
-WRITE_CONCURRENCY = os.environ.get("WRITE_CONCURRENCY", 150)
+# "redis" searches Redis, "local" loads the dataset into an exact in-process
+# NumPy engine at startup (small corpora, CI and edge deployments)
+SEARCH_ENGINE = os.environ.get("SEARCH_ENGINE", "redis").lower()
+# Loader pipeline: papers are parsed LOAD_READ_SIZE characters at a time,
+# converted in chunks of LOAD_CHUNK_SIZE, buffered in a queue of at most
+# LOAD_QUEUE_SIZE chunks and written by WRITE_CONCURRENCY concurrent writers
+WRITE_CONCURRENCY = os.environ.get("WRITE_CONCURRENCY", 4)
+LOAD_CHUNK_SIZE = os.environ.get("LOAD_CHUNK_SIZE", 500)
+LOAD_QUEUE_SIZE = os.environ.get("LOAD_QUEUE_SIZE", 4)
+LOAD_READ_SIZE = int(os.environ.get("LOAD_READ_SIZE", 1 << 20))
+LOAD_PROGRESS_INTERVAL = float(os.environ.get("LOAD_PROGRESS_INTERVAL", 5))
+# "incremental" diffs the dataset against the index by content hash and
+# resumes crashed loads, "rebuild" drops the index and loads from scratch
+LOAD_MODE = os.environ.get("LOAD_MODE", "incremental").lower()
+# The default dataset is a complete snapshot, delete papers missing from it
+LOAD_DELETE_MISSING = os.environ.get("LOAD_DELETE_MISSING", "true").lower() == "true"
+MAX_BATCH_QUERIES = int(os.environ.get("MAX_BATCH_QUERIES", 500))
+# Papers read per cursor page by the NDJSON export
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 1000))
 RETURN_FIELDS = [
     "paper_id",
     "authors",
@@ -29,6 +47,40 @@ if REDIS_PASSWORD:
     REDIS_URL = f"redis://:{REDIS_PASSWORD}@{REDIS_HOST}:{REDIS_PORT}"
 else:
     REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}"
+# Read replicas, comma-separated redis:// URLs. Search routes read from them in
+# turn, writes, cursors and caches stay on the primary
+REDIS_REPLICA_URLS = [
+    url.strip()
+    for url in os.environ.get("REDIS_REPLICA_URLS", "").split(",")
+    if url.strip()
+]
+# Connection pool per Redis node: callers wait up to REDIS_POOL_TIMEOUT seconds
+# for one of REDIS_MAX_CONNECTIONS connections instead of opening more
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
+REDIS_POOL_TIMEOUT = float(os.environ.get("REDIS_POOL_TIMEOUT", 5))
+REDIS_SOCKET_TIMEOUT = float(os.environ.get("REDIS_SOCKET_TIMEOUT", 10))
+REDIS_CONNECT_TIMEOUT = float(os.environ.get("REDIS_CONNECT_TIMEOUT", 2))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", 30))
+# Commands failing with connection errors or timeouts are retried up to
+# REDIS_RETRIES times, with jittered exponential backoff from
+# REDIS_RETRY_BACKOFF_BASE up to REDIS_RETRY_BACKOFF_CAP seconds
+REDIS_RETRIES = int(os.environ.get("REDIS_RETRIES", 3))
+REDIS_RETRY_BACKOFF_BASE = float(os.environ.get("REDIS_RETRY_BACKOFF_BASE", 0.05))
+REDIS_RETRY_BACKOFF_CAP = float(os.environ.get("REDIS_RETRY_BACKOFF_CAP", 1))
+# Sharded index: comma-separated redis:// URLs of the nodes papers are spread
+# over by a hash of their paper_id. Queries run on every shard and are merged.
+# REDIS_URL still holds index versions, caches, checkpoints and the facet table
+REDIS_SHARD_URLS = [
+    url.strip()
+    for url in os.environ.get("REDIS_SHARD_URLS", "").split(",")
+    if url.strip()
+]
+# Seconds to wait for each shard, and whether to answer with the results of the
+# other shards, flagged with an X-Partial-Results header, when some fail
+SHARD_TIMEOUT = float(os.environ.get("SHARD_TIMEOUT", 2))
+SHARD_PARTIAL_RESULTS = (
+    os.environ.get("SHARD_PARTIAL_RESULTS", "true").lower() == "true"
+)
 
 
 # Model Providers
@@ -42,3 +94,143 @@ OPENAI_EMBEDDING_MODEL = os.environ.get(
 COHERE_EMBEDDING_MODEL = os.environ.get(
     "COHERE_EMBEDDING_MODEL", "embed-multilingual-v3.0"
 )
+
+# Providers that can embed query text, the others are never initialized
+EMBEDDING_PROVIDERS = [
+    provider.strip().lower()
+    for provider in os.environ.get(
+        "EMBEDDING_PROVIDERS", "huggingface,openai,cohere"
+    ).split(",")
+    if provider.strip()
+]
+# Load models and run a dummy embedding and KNN query per provider at startup,
+# before /readyz reports the worker ready
+WARMUP = os.environ.get("WARMUP", "true").lower() == "true"
+# Seconds between indexing progress checks while waiting to become ready
+READY_POLL_INTERVAL = float(os.environ.get("READY_POLL_INTERVAL", 1))
+# Failed warmups are retried with backoff, up to this many seconds apart
+WARMUP_RETRY_MAX_DELAY = float(os.environ.get("WARMUP_RETRY_MAX_DELAY", 30))
+
+# Replace every provider with a deterministic local stub (offline benchmarks)
+EMBEDDING_STUB = os.environ.get("EMBEDDING_STUB", "false").lower() == "true"
+
+# Embedding cache
+EMBEDDING_CACHE_PREFIX = os.environ.get("EMBEDDING_CACHE_PREFIX", "embedcache")
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 4096))
+EMBEDDING_CACHE_TTL = int(os.environ.get("EMBEDDING_CACHE_TTL", 3600))
+EMBEDDING_CACHE_REDIS = (
+    os.environ.get("EMBEDDING_CACHE_REDIS", str(SEARCH_ENGINE == "redis")).lower()
+    == "true"
+)
+EMBEDDING_CACHE_REDIS_TTL = int(os.environ.get("EMBEDDING_CACHE_REDIS_TTL", 86400))
+
+# Search response cache, keyed by index version and canonical request
+RESPONSE_CACHE_ENABLED = (
+    os.environ.get("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+)
+RESPONSE_CACHE_PREFIX = os.environ.get("RESPONSE_CACHE_PREFIX", "respcache")
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+RESPONSE_CACHE_TTL = int(os.environ.get("RESPONSE_CACHE_TTL", 60))
+RESPONSE_CACHE_REDIS = (
+    os.environ.get("RESPONSE_CACHE_REDIS", str(SEARCH_ENGINE == "redis")).lower()
+    == "true"
+)
+RESPONSE_CACHE_REDIS_TTL = int(os.environ.get("RESPONSE_CACHE_REDIS_TTL", 600))
+
+# Embedding execution
+# "process" runs the HuggingFace model in worker processes, "thread" in-process,
+# "server" in one model server shared by every API worker
+HF_EMBEDDING_BACKEND = os.environ.get("HF_EMBEDDING_BACKEND", "process")
+EMBEDDING_PROCESS_WORKERS = int(os.environ.get("EMBEDDING_PROCESS_WORKERS", 1))
+EMBEDDING_THREAD_WORKERS = int(os.environ.get("EMBEDDING_THREAD_WORKERS", 8))
+EMBEDDING_MAX_PENDING = int(os.environ.get("EMBEDDING_MAX_PENDING", 64))
+EMBEDDING_TIMEOUT = float(os.environ.get("EMBEDDING_TIMEOUT", 10))
+
+# Shared model server (HF_EMBEDDING_BACKEND=server): texts from all workers are
+# batched together, up to MODEL_SERVER_BATCH_SIZE per MODEL_SERVER_THREADS call
+MODEL_SERVER_SOCKET = os.environ.get(
+    "MODEL_SERVER_SOCKET", "/tmp/arxivsearch-embeddings.sock"
+)
+MODEL_SERVER_BATCH_SIZE = int(os.environ.get("MODEL_SERVER_BATCH_SIZE", 64))
+MODEL_SERVER_BATCH_WAIT_MS = float(os.environ.get("MODEL_SERVER_BATCH_WAIT_MS", 2))
+MODEL_SERVER_THREADS = int(os.environ.get("MODEL_SERVER_THREADS", 1))
+# batches queued for inference before the server rejects requests (503)
+MODEL_SERVER_MAX_PENDING = int(os.environ.get("MODEL_SERVER_MAX_PENDING", 32))
+
+# Offline embedding of new papers (arxivsearch.db.embed): papers are embedded
+# EMBED_WINDOW_SIZE at a time, each provider in batches of
+# <PROVIDER>_EMBED_BATCH_SIZE with up to <PROVIDER>_EMBED_CONCURRENCY batches
+# in flight and at most <PROVIDER>_EMBED_RPM requests per minute (0 for no
+# limit). HuggingFace batches run in EMBED_HF_WORKERS processes.
+EMBED_WINDOW_SIZE = int(os.environ.get("EMBED_WINDOW_SIZE", 1024))
+EMBED_HF_WORKERS = int(os.environ.get("EMBED_HF_WORKERS", os.cpu_count() or 1))
+EMBED_MAX_RETRIES = int(os.environ.get("EMBED_MAX_RETRIES", 5))
+EMBED_PROVIDER_LIMITS = {
+    provider: {
+        "batch_size": int(
+            os.environ.get(f"{provider.upper()}_EMBED_BATCH_SIZE", batch_size)
+        ),
+        "concurrency": int(
+            os.environ.get(f"{provider.upper()}_EMBED_CONCURRENCY", concurrency)
+        ),
+        "rpm": int(os.environ.get(f"{provider.upper()}_EMBED_RPM", rpm)),
+    }
+    for provider, batch_size, concurrency, rpm in (
+        ("huggingface", 64, EMBED_HF_WORKERS, 0),
+        ("openai", 256, 4, 3000),
+        ("cohere", 96, 4, 1000),
+    )
+}
+
+# Embedding micro-batching
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+EMBEDDING_BATCH_WAIT_MS = float(os.environ.get("EMBEDDING_BATCH_WAIT_MS", 2))
+
+# Index version and count caching
+INDEX_VERSION_TTL = float(os.environ.get("INDEX_VERSION_TTL", 1))
+COUNT_CACHE_SIZE = int(os.environ.get("COUNT_CACHE_SIZE", 4096))
+FACETS_CACHE_SIZE = int(os.environ.get("FACETS_CACHE_SIZE", 1024))
+PAPER_VECTOR_CACHE_SIZE = int(os.environ.get("PAPER_VECTOR_CACHE_SIZE", 2048))
+PRECOMPUTE_FACETS = os.environ.get("PRECOMPUTE_FACETS", "true").lower() == "true"
+
+# Vector storage precision per provider: float32, float16 or bfloat16
+VECTOR_DATATYPES = {
+    "huggingface": os.environ.get("HUGGINGFACE_VECTOR_DTYPE", "float32").lower(),
+    "openai": os.environ.get("OPENAI_VECTOR_DTYPE", "float32").lower(),
+    "cohere": os.environ.get("COHERE_VECTOR_DTYPE", "float32").lower(),
+}
+# Also store an int8 scalar-quantized copy of every vector, and optionally
+# run KNN queries against those copies
+INT8_VECTORS = os.environ.get("INT8_VECTORS", "false").lower() == "true"
+QUERY_INT8_VECTORS = (
+    INT8_VECTORS and os.environ.get("QUERY_INT8_VECTORS", "false").lower() == "true"
+)
+
+# HNSW parameters per provider vector field, overriding db/schema/index.yaml
+# when set, e.g. OPENAI_HNSW_M=32 or COHERE_HNSW_EF_RUNTIME=50
+HNSW_PARAMS = {
+    provider: {
+        param: int(os.environ[f"{provider.upper()}_HNSW_{param.upper()}"])
+        for param in ("m", "ef_construction", "ef_runtime")
+        if f"{provider.upper()}_HNSW_{param.upper()}" in os.environ
+    }
+    for provider in ("huggingface", "openai", "cohere")
+}
+# Upper bound for the per-request ef_runtime override
+MAX_EF_RUNTIME = int(os.environ.get("MAX_EF_RUNTIME", 1000))
+
+# Multi-provider fused search: every provider returns
+# FUSION_CANDIDATE_FACTOR x number_of_results candidates before fusion, and
+# reciprocal rank fusion uses FUSION_RRF_K as its rank constant
+FUSION_CANDIDATE_FACTOR = int(os.environ.get("FUSION_CANDIDATE_FACTOR", 2))
+FUSION_RRF_K = int(os.environ.get("FUSION_RRF_K", 60))
+
+# Static files are served from memory, with gzip/brotli variants of
+# compressible files of at least STATIC_COMPRESS_MIN_SIZE bytes. Files larger
+# than STATIC_MAX_FILE_SIZE bytes are streamed from disk
+STATIC_MAX_FILE_SIZE = int(os.environ.get("STATIC_MAX_FILE_SIZE", 4 * 1024 * 1024))
+STATIC_COMPRESS_MIN_SIZE = int(os.environ.get("STATIC_COMPRESS_MIN_SIZE", 256))
+
+# Request instrumentation: Server-Timing header and Prometheus /metrics
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "false").lower() == "true"
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "false").lower() == "true"
@@ -0,0 +1,180 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO
+
+import numpy as np
+
+from arxivsearch import config
+from arxivsearch.schema.models import Provider
+
+logger = logging.getLogger(__name__)
+
+METADATA_FILE = "metadata.jsonl"
+
+
+def iter_json_array(f: TextIO, read_size: int = config.LOAD_READ_SIZE) -> Iterator[Any]:
+    """
+    Incrementally parse a JSON array, yielding one element at a time while
+    buffering at most read_size characters plus the current element.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof, opened = "", 0, False, False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            buffer, pos = f.read(read_size), 0
+            eof = not buffer
+            continue
+
+        if not opened:
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array")
+            opened = True
+            pos += 1
+            continue
+
+        if buffer[pos] == "]":
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            end = None
+        # the element may continue past the end of the buffer
+        if end is None or (end == len(buffer) and not eof):
+            if eof:
+                raise ValueError(f"Invalid JSON array element at offset {pos}")
+            more = f.read(read_size)
+            eof = not more
+            buffer, pos = buffer[pos:] + more, 0
+            continue
+
+        yield obj
+        pos = end
+
+
+def iter_papers(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Stream papers from a JSON array or JSON-lines (.jsonl) dataset file.
+    """
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from iter_json_array(f)
+
+
+class BinaryDataset:
+    """
+    Binary papers dataset stored as a directory with one float32 ``.npy``
+    matrix per provider (row i belongs to paper i) and a ``metadata.jsonl``
+    sidecar holding the remaining paper fields.
+
+    Vector matrices are memory-mapped, and iterating the dataset yields
+    records whose vectors are zero-copy memoryviews over the mapped rows, so
+    they can be handed straight to Redis HSET payloads.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.vectors = {
+            provider.value: np.load(
+                os.path.join(path, f"{provider.value}.npy"), mmap_mode="r"
+            )
+            for provider in Provider
+        }
+        lengths = {len(matrix) for matrix in self.vectors.values()}
+        if len(lengths) != 1:
+            raise ValueError(f"Vector matrices in {path} have different lengths")
+        self.length = lengths.pop()
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        with open(os.path.join(self.path, METADATA_FILE), "r") as f:
+            for row, line in enumerate(f):
+                paper = json.loads(line)
+                for provider, matrix in self.vectors.items():
+                    # byte-formatted view so len() is the payload size
+                    paper[provider] = memoryview(matrix[row]).cast("B")
+                yield paper
+
+
+def write_binary_dataset(papers: Iterable[Dict[str, Any]], count: int, path: str):
+    """
+    Write papers to the binary dataset layout read by BinaryDataset.
+
+    Args:
+        papers (Iterable[Dict[str, Any]]): Papers with provider vectors as
+            lists of floats, in dataset order.
+        count (int): Number of papers, used to size the vector matrices.
+        path (str): Output directory.
+    """
+    os.makedirs(path, exist_ok=True)
+    matrices: Dict[str, np.memmap] = {}
+    written = 0
+
+    with open(os.path.join(path, METADATA_FILE), "w") as f:
+        for row, paper in enumerate(papers):
+            for provider in Provider:
+                vector = np.asarray(paper.pop(provider.value), dtype=np.float32)
+                if provider.value not in matrices:
+                    matrices[provider.value] = np.lib.format.open_memmap(
+                        os.path.join(path, f"{provider.value}.npy"),
+                        mode="w+",
+                        dtype=np.float32,
+                        shape=(count, len(vector)),
+                    )
+                matrices[provider.value][row] = vector
+            f.write(json.dumps(paper) + "\n")
+            written += 1
+
+    if written != count:
+        raise ValueError(f"Expected {count} papers but wrote {written}")
+    for matrix in matrices.values():
+        matrix.flush()
+
+
+def convert_json_dataset(source: str, path: str):
+    """
+    Convert a JSON or JSON-lines papers dataset to the binary format. The
+    source is streamed twice, once to count papers and once to write them,
+    so memory use does not depend on the dataset size.
+    """
+    count = sum(1 for _ in iter_papers(source))
+    logger.info(f"Converting {count} papers from {source} to {path}")
+    write_binary_dataset(iter_papers(source), count, path)
+    logger.info("Conversion complete")
+
+
+def read_vectors(path: str, provider: str, limit: Optional[int] = None) -> np.ndarray:
+    """
+    Read the first limit vectors of a provider from a JSON, JSON-lines or
+    binary dataset as a float32 matrix.
+    """
+    if os.path.isdir(path):
+        return np.array(BinaryDataset(path).vectors[provider][:limit])
+    papers = itertools.islice(iter_papers(path), limit)
+    return np.array([paper[provider] for paper in papers], dtype=np.float32)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Convert a JSON papers dataset to the binary dataset format."
+    )
+    parser.add_argument("source", help="JSON or JSON-lines dataset file")
+    parser.add_argument("destination", help="Output dataset directory")
+    args = parser.parse_args()
+    convert_json_dataset(args.source, args.destination)
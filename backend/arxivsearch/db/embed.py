@@ -0,0 +1,303 @@
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+from redisvl.utils.vectorize import CohereTextVectorizer, OpenAITextVectorizer
+
+from arxivsearch import config
+from arxivsearch.db.dataset import convert_json_dataset, iter_papers
+from arxivsearch.db.utils import get_schema
+from arxivsearch.schema.models import Provider
+from arxivsearch.utils.embeddings import StubVectorizer, preprocess_text
+from arxivsearch.utils.executor import (
+    EmbeddingExecutor,
+    hf_embed_many,
+    hf_process_executor,
+    thread_executor,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def document_text(paper: Dict[str, Any]) -> str:
+    """Text embedded for a paper: its preprocessed title and abstract."""
+    return preprocess_text(f"{paper.get('title', '')} {paper.get('abstract', '')}")
+
+
+def missing_vector(paper: Dict[str, Any], provider: str) -> bool:
+    vector = paper.get(provider)
+    return vector is None or len(vector) == 0
+
+
+class RateLimiter:
+    """Space requests evenly to stay under a requests per minute limit."""
+
+    def __init__(self, rpm: int):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class ProviderEmbedder:
+    """
+    Fill in the missing vectors of one provider in batches, with a bounded
+    number of batches in flight, a request rate limit and exponential
+    backoff on failures, and keep throughput statistics.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        embed_batch: Callable[[List[str]], Awaitable[List[List[float]]]],
+        batch_size: int,
+        concurrency: int,
+        rpm: int = 0,
+        max_retries: int = config.EMBED_MAX_RETRIES,
+    ):
+        self.provider = provider
+        self.embed_batch = embed_batch
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.limiter = RateLimiter(rpm)
+        self.max_retries = max_retries
+        self.papers = 0
+        self.seconds = 0.0
+        self.retries = 0
+
+    async def _embed(self, texts: List[str]) -> List[List[float]]:
+        attempt = 0
+        async with self.semaphore:
+            while True:
+                await self.limiter.wait()
+                try:
+                    return await self.embed_batch(texts)
+                except Exception as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = min(2**attempt, 60)
+                    logger.warning(
+                        f"{self.provider} batch failed ({e}), retrying in {delay}s"
+                    )
+                    attempt += 1
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+
+    async def fill(self, papers: List[Dict[str, Any]]) -> int:
+        """
+        Embed the papers without a vector for this provider, in place.
+
+        Returns:
+            int: Number of papers embedded.
+        """
+        todo = [paper for paper in papers if missing_vector(paper, self.provider)]
+        if not todo:
+            return 0
+        start = time.monotonic()
+        texts = [document_text(paper) for paper in todo]
+        batches = await asyncio.gather(
+            *[
+                self._embed(texts[i : i + self.batch_size])
+                for i in range(0, len(texts), self.batch_size)
+            ]
+        )
+        for paper, vector in zip(todo, itertools.chain.from_iterable(batches)):
+            paper[self.provider] = np.asarray(vector, dtype=np.float32).tolist()
+        self.papers += len(todo)
+        self.seconds += time.monotonic() - start
+        return len(todo)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "papers": self.papers,
+            "seconds": round(self.seconds, 3),
+            "papers_per_second": (
+                round(self.papers / self.seconds, 1) if self.seconds else 0.0
+            ),
+            "retries": self.retries,
+        }
+
+
+class DocumentEmbeddings:
+    """
+    Provider embedders configured for bulk document embedding rather than
+    queries: HuggingFace inference runs in EMBED_HF_WORKERS processes,
+    OpenAI batches are concurrent async requests and Cohere batches run on
+    threads with the search_document input type. Executors have no call
+    timeout, long batches are expected.
+    """
+
+    def __init__(self, providers: List[str]):
+        self.executors: List[EmbeddingExecutor] = []
+        self.embedders = {
+            provider: ProviderEmbedder(
+                provider,
+                self._batch_function(provider),
+                **config.EMBED_PROVIDER_LIMITS[provider],
+            )
+            for provider in providers
+        }
+
+    def _executor(self, executor: EmbeddingExecutor) -> EmbeddingExecutor:
+        self.executors.append(executor)
+        return executor
+
+    def _batch_function(
+        self, provider: str
+    ) -> Callable[[List[str]], Awaitable[List[List[float]]]]:
+        limits = config.EMBED_PROVIDER_LIMITS[provider]
+        executor_limits = {"max_pending": limits["concurrency"], "timeout": None}
+        if config.EMBEDDING_STUB:
+            vectorizer = StubVectorizer(get_schema().fields[provider].attrs.dims)
+            executor = self._executor(thread_executor(provider, 1, **executor_limits))
+            return functools.partial(executor.run, vectorizer.embed_many)
+
+        if provider == Provider.huggingface.value:
+            executor = self._executor(
+                hf_process_executor(
+                    config.SENTENCE_TRANSFORMER_MODEL,
+                    config.EMBED_HF_WORKERS,
+                    **executor_limits,
+                )
+            )
+            return functools.partial(executor.run, hf_embed_many)
+        elif provider == Provider.openai.value:
+            vectorizer = OpenAITextVectorizer(model=config.OPENAI_EMBEDDING_MODEL)
+            return functools.partial(
+                vectorizer.aembed_many, batch_size=limits["batch_size"]
+            )
+        elif provider == Provider.cohere.value:
+            vectorizer = CohereTextVectorizer(model=config.COHERE_EMBEDDING_MODEL)
+            executor = self._executor(
+                thread_executor(provider, limits["concurrency"], **executor_limits)
+            )
+            return functools.partial(
+                executor.run,
+                vectorizer.embed_many,
+                input_type="search_document",
+                batch_size=limits["batch_size"],
+            )
+        raise ValueError(f"Unknown embedding provider {provider}")
+
+    async def fill(self, papers: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Embed missing vectors of every provider concurrently."""
+        counts = await asyncio.gather(
+            *[embedder.fill(papers) for embedder in self.embedders.values()]
+        )
+        return dict(zip(self.embedders, counts))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: embedder.stats() for name, embedder in self.embedders.items()}
+
+    def shutdown(self):
+        for executor in self.executors:
+            executor.shutdown()
+
+
+def completed_rows(path: str) -> int:
+    """
+    Count the papers already written to an output file, truncating a last
+    line left incomplete by a crash so that the run can append after it.
+    """
+    if not os.path.exists(path):
+        return 0
+    rows, end = 0, 0
+    with open(path, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            rows += 1
+            end += len(line)
+    if end != os.path.getsize(path):
+        logger.warning(f"Truncating incomplete last line of {path}")
+        with open(path, "r+b") as f:
+            f.truncate(end)
+    return rows
+
+
+async def embed_dataset(
+    source: str,
+    destination: str,
+    providers: Optional[List[str]] = None,
+    window_size: int = config.EMBED_WINDOW_SIZE,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute the missing provider vectors of a papers dataset.
+
+    Papers are read from source, embedded EMBED_WINDOW_SIZE at a time with
+    every provider working concurrently, and appended to destination as
+    JSON lines once a window is complete. A run that fails resumes after
+    the papers already in destination. Papers that already carry a vector
+    keep it.
+
+    Args:
+        source (str): JSON or JSON-lines dataset of paper metadata,
+            optionally with some vectors.
+        destination (str): JSON-lines output dataset.
+        providers (List[str], optional): Providers to embed. Defaults to
+            all providers.
+        window_size (int, optional): Papers embedded between writes.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: Throughput statistics per provider.
+    """
+    if not destination.endswith(".jsonl"):
+        raise ValueError("The destination must be a .jsonl file")
+    providers = providers or [provider.value for provider in Provider]
+    done = completed_rows(destination)
+    if done:
+        logger.info(f"Resuming after {done} papers already in {destination}")
+    papers = itertools.islice(iter_papers(source), done, None)
+
+    embeddings = DocumentEmbeddings(providers)
+    try:
+        with open(destination, "a") as f:
+            while window := list(itertools.islice(papers, window_size)):
+                await embeddings.fill(window)
+                f.write("".join(json.dumps(paper) + "\n" for paper in window))
+                f.flush()
+                os.fsync(f.fileno())
+                done += len(window)
+                logger.info(f"{done} papers embedded: {embeddings.stats()}")
+    finally:
+        embeddings.shutdown()
+    return embeddings.stats()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(
+        description="Compute missing embeddings of a papers dataset."
+    )
+    parser.add_argument("source", help="JSON or JSON-lines dataset file")
+    parser.add_argument("destination", help="JSON-lines output dataset")
+    parser.add_argument(
+        "--providers",
+        default=",".join(provider.value for provider in Provider),
+        help="Comma-separated providers to embed",
+    )
+    parser.add_argument(
+        "--binary", help="Also convert the output to a binary dataset directory"
+    )
+    args = parser.parse_args()
+    stats = asyncio.run(
+        embed_dataset(args.source, args.destination, args.providers.split(","))
+    )
+    for provider, provider_stats in stats.items():
+        logger.info(f"{provider}: {provider_stats}")
+    if args.binary:
+        convert_json_dataset(args.destination, args.binary)
@@ -0,0 +1,277 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from redis.commands.search import reducers
+from redis.commands.search.aggregation import AggregateRequest
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import CountQuery
+
+from arxivsearch import config
+from arxivsearch.db import utils
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.sharding import ShardedSearchIndex, failed_shards
+from arxivsearch.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+# filter counts keyed by (index version, normalized filter)
+_count_cache = LRUCache(maxsize=config.COUNT_CACHE_SIZE)
+
+# facet counts keyed by (index version, normalized filter)
+_facets_cache = LRUCache(maxsize=config.FACETS_CACHE_SIZE)
+
+# precomputed facet tables by index name, with the index version they match
+_facet_tables: Dict[str, Dict] = {}
+
+
+def facets_key(index: AsyncSearchIndex) -> str:
+    return f"{index.schema.index.name}:facets"
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+async def aggregate_combinations(
+    index: AsyncSearchIndex, filter_expression: str = "*"
+) -> List[Dict]:
+    """
+    Count papers per distinct (year, raw categories string) combination with
+    a single FT.AGGREGATE. Exact per-year and per-category counts can be
+    derived from these rows, because every paper contributes to exactly one.
+    """
+    if isinstance(index, LocalSearchIndex):
+        return index.combinations(filter_expression)
+    if isinstance(index, ShardedSearchIndex):
+        # papers live on a single shard, so the rows simply add up. Facet
+        # counts are cached, so every shard must answer, without the query
+        # timeout: building the facet table aggregates the whole corpus
+        shards = await asyncio.gather(
+            *[
+                aggregate_combinations(shard, filter_expression)
+                for shard in index.shards
+            ]
+        )
+        return [row for rows in shards for row in rows]
+    request = (
+        AggregateRequest(str(filter_expression))
+        .load("@year", "@categories")
+        .group_by(["@year", "@categories"], reducers.count().alias("count"))
+        .dialect(2)
+    )
+    result = await utils.aggregate(
+        utils.index_client(index), index.schema.index.name, request
+    )
+    combinations = []
+    for row in result.rows:
+        fields = dict(zip(map(_decode, row[::2]), map(_decode, row[1::2])))
+        combinations.append(
+            {
+                "year": fields.get("year", ""),
+                "categories": [
+                    category.strip()
+                    for category in fields.get("categories", "").split("|")
+                    if category.strip()
+                ],
+                "count": int(fields["count"]),
+            }
+        )
+    return combinations
+
+
+def tabulate(combinations: List[Dict]) -> Dict[str, int]:
+    """
+    Reduce aggregation rows to a flat table of counts keyed by lowercased
+    "year|category", with "year|" for year totals, "|category" for category
+    totals and "|" for the overall total.
+    """
+    table: Dict[str, int] = defaultdict(int)
+    for row in combinations:
+        year = row["year"].lower()
+        table["|"] += row["count"]
+        table[f"{year}|"] += row["count"]
+        for category in {category.lower() for category in row["categories"]}:
+            table[f"|{category}"] += row["count"]
+            table[f"{year}|{category}"] += row["count"]
+    return dict(table)
+
+
+async def build_facet_table(index: AsyncSearchIndex):
+    """
+    Precompute year x category counts for the current index version and
+    store them in Redis so every API worker can answer common filter counts
+    without a CountQuery.
+    """
+    version = await utils.get_index_version(index)
+    table = tabulate(await aggregate_combinations(index))
+    await utils.get_async_client().set(
+        facets_key(index), json.dumps({"version": version, "table": table})
+    )
+    _facet_tables[index.schema.index.name] = {"version": version, "table": table}
+    logger.info(f"Facet table built for index version {version}")
+
+
+async def ensure_facet_table(index: AsyncSearchIndex) -> bool:
+    """
+    Build the facet table for the current index version unless it already
+    exists. Counts of a partially indexed index would be wrong, so nothing
+    is built while indexing is still running.
+
+    Returns:
+        bool: Whether the facet table is up to date.
+    """
+    if isinstance(index, LocalSearchIndex) or await get_facet_table(index):
+        return True
+    if not await utils.indexing_complete(index):
+        return False
+    await build_facet_table(index)
+    return True
+
+
+async def get_facet_table(index: AsyncSearchIndex) -> Optional[Dict[str, int]]:
+    """Return the precomputed facet table if it matches the index version."""
+    if isinstance(index, LocalSearchIndex):
+        # exact counts are a bitmap sum for the local engine
+        return None
+    name = index.schema.index.name
+    version = await utils.get_index_version(index)
+    cached = _facet_tables.get(name)
+    if cached is not None and cached["version"] == version:
+        return cached["table"]
+    raw = await utils.get_async_client().get(facets_key(index))
+    stored = json.loads(raw) if raw else {}
+    if stored.get("version") != version:
+        # not built for this version yet, another worker may build it, so
+        # the miss is not remembered
+        return None
+    _facet_tables[name] = {"version": version, "table": stored["table"]}
+    return stored["table"]
+
+
+def count_from_table(
+    table: Dict[str, int], years: tuple, categories: tuple
+) -> Optional[int]:
+    """
+    Answer a normalized filter count from the facet table. Papers have a
+    single year but possibly several categories, so filters on more than
+    one category cannot be answered exactly and return None.
+    """
+    if len(categories) > 1:
+        return None
+    category = categories[0] if categories else ""
+    if not years:
+        return table.get(f"|{category}", 0)
+    return sum(table.get(f"{year}|{category}", 0) for year in years)
+
+
+async def lookup_count(
+    index: AsyncSearchIndex, years: List[str], categories: List[str]
+) -> Optional[int]:
+    """
+    Count papers matching a filter without querying the search index, from
+    the count cache or the precomputed facet table. Returns None when the
+    count has to be computed with a CountQuery.
+    """
+    normalized = utils.normalize_filter(years, categories)
+    version = await utils.get_index_version(index)
+
+    count = _count_cache.get((version, normalized))
+    if count is None and config.PRECOMPUTE_FACETS:
+        table = await get_facet_table(index)
+        if table is not None:
+            count = count_from_table(table, *normalized)
+            if count is not None:
+                _count_cache.set((version, normalized), count)
+    return count
+
+
+async def remember_count(
+    index: AsyncSearchIndex, years: List[str], categories: List[str], count: int
+):
+    """Cache a count computed with a CountQuery."""
+    normalized = utils.normalize_filter(years, categories)
+    version = await utils.get_index_version(index)
+    _count_cache.set((version, normalized), count)
+
+
+async def count_papers(
+    index: AsyncSearchIndex, years: List[str], categories: List[str]
+) -> int:
+    """
+    Count papers matching a year/category filter, served from the count
+    cache or the precomputed facet table when possible.
+
+    Args:
+        index (AsyncSearchIndex): Search index to count against.
+        years (list): Years to filter on, empty for any year.
+        categories (list): Categories to filter on, empty for any category.
+
+    Returns:
+        int: Number of matching papers.
+    """
+    count = await lookup_count(index, years, categories)
+    if count is None:
+        count = await index.query(
+            CountQuery(utils.build_filter_expression(years, categories))
+        )
+        if not failed_shards():
+            await remember_count(index, years, categories, count)
+    return count
+
+
+async def get_facets(
+    index: AsyncSearchIndex, years: List[str], categories: List[str]
+) -> Dict:
+    """
+    Per-year and per-category paper counts within a year/category filter,
+    computed with a single aggregation and cached per index version.
+
+    Args:
+        index (AsyncSearchIndex): Search index to aggregate over.
+        years (list): Years to filter on, empty for any year.
+        categories (list): Categories to filter on, empty for any category.
+
+    Returns:
+        Dict: Total matching papers plus year and category counts, each
+            sorted by descending count.
+    """
+    normalized = utils.normalize_filter(years, categories)
+    version = await utils.get_index_version(index)
+    key = (version, normalized)
+
+    result = _facets_cache.get(key)
+    if result is not None:
+        return result
+
+    total = 0
+    year_counts: Dict[str, int] = defaultdict(int)
+    category_counts: Dict[str, int] = defaultdict(int)
+    normalized_years, normalized_categories = normalized
+    filter_expression = utils.build_filter_expression(
+        list(normalized_years), list(normalized_categories)
+    )
+    for row in await aggregate_combinations(index, filter_expression):
+        total += row["count"]
+        year_counts[row["year"]] += row["count"]
+        for category in set(row["categories"]):
+            category_counts[category] += row["count"]
+
+    def ranked(counts: Dict[str, int]) -> List[Dict]:
+        return [
+            {"value": value, "count": count}
+            for value, count in sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+        ]
+
+    result = {
+        "total": total,
+        "years": ranked(year_counts),
+        "categories": ranked(category_counts),
+    }
+    _facets_cache.set(key, result)
+    # the total doubles as the count for this filter
+    _count_cache.set(key, result["total"])
+    return result
@@ -0,0 +1,200 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from redisvl.index import AsyncSearchIndex
+
+from arxivsearch.db import pagination
+from arxivsearch.db.utils import PaperPipelines, get_async_client
+
+logger = logging.getLogger(__name__)
+
+
+def hashes_key(index: AsyncSearchIndex) -> str:
+    """HASH of paper_id to the content hash of the stored paper."""
+    return f"{index.schema.index.name}:ingest:hashes"
+
+
+def checkpoint_key(index: AsyncSearchIndex) -> str:
+    """HASH of source fingerprint to the offset and status of its ingest.
+
+    Every source keeps its own checkpoint, so ingesting a delta does not
+    make the next start reload the snapshot ingested before it."""
+    return f"{index.schema.index.name}:ingest:checkpoints"
+
+
+def seen_key(index: AsyncSearchIndex, source: str) -> str:
+    """SET of paper ids read by the ingest of a snapshot source."""
+    digest = hashlib.sha1(source.encode()).hexdigest()
+    return f"{index.schema.index.name}:ingest:seen:{digest}"
+
+
+def content_hash(paper: Dict[str, Any]) -> str:
+    """
+    Digest of a preprocessed paper, covering every field with vectors as
+    their stored bytes. A change of storage datatype changes the digest, so
+    re-encoded vectors are rewritten.
+    """
+    digest = hashlib.sha1()
+    for name in sorted(paper):
+        value = paper[name]
+        if isinstance(value, str):
+            value = value.encode()
+        elif not isinstance(value, (bytes, memoryview)):
+            value = str(value).encode()
+        digest.update(name.encode())
+        digest.update(b"\x00")
+        digest.update(len(value).to_bytes(8, "little"))
+        digest.update(value)
+    return digest.hexdigest()
+
+
+def fingerprint(path: str) -> str:
+    """
+    Identify a dataset by path, size and modification time, so a finished
+    ingest of the same file is not repeated and a changed file is not
+    resumed from a stale offset. Directories (binary datasets) combine the
+    stats of their files.
+    """
+    path = os.path.abspath(path)
+    if os.path.isdir(path):
+        stats = sorted(
+            (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in os.scandir(path)
+            if entry.is_file()
+        )
+    else:
+        stat = os.stat(path)
+        stats = [(os.path.basename(path), stat.st_size, stat.st_mtime_ns)]
+    digest = hashlib.sha1(repr(stats).encode()).hexdigest()
+    return f"{path}:{digest}"
+
+
+class Checkpoint:
+    """
+    Progress of an ingest run, stored in Redis.
+
+    Chunks are written concurrently and may finish out of order, so the
+    stored offset only advances over the contiguous prefix of finished
+    chunks. A resumed run restarts from that offset. Chunks finished after
+    it are read again, but writes are idempotent so they only cost the
+    hash comparison.
+    """
+
+    def __init__(self, index: AsyncSearchIndex, source: str, offset: int = 0):
+        self.index = index
+        self.source = source
+        self.offset = offset
+        self._next = 0
+        self._finished: Dict[int, int] = {}
+
+    @classmethod
+    async def read(cls, index: AsyncSearchIndex, source: str) -> Dict[str, Any]:
+        """Offset and status of the last ingest of source, empty if none."""
+        state = await get_async_client().hget(checkpoint_key(index), source)
+        return json.loads(state) if state else {}
+
+    async def save(self, status: str = "running"):
+        await get_async_client().hset(
+            checkpoint_key(self.index),
+            self.source,
+            json.dumps({"offset": self.offset, "status": status}),
+        )
+
+    async def done(self, number: int, size: int):
+        """Record that chunk number, of size papers, has been written."""
+        self._finished[number] = size
+        advanced = False
+        while self._next in self._finished:
+            self.offset += self._finished.pop(self._next)
+            self._next += 1
+            advanced = True
+        if advanced:
+            await self.save()
+
+
+async def reset(index: AsyncSearchIndex):
+    """Forget content hashes and checkpoints, e.g. before a rebuild."""
+    client = get_async_client()
+    seen = [
+        key
+        async for key in client.scan_iter(
+            match=f"{index.schema.index.name}:ingest:seen:*"
+        )
+    ]
+    await client.delete(hashes_key(index), checkpoint_key(index), *seen)
+
+
+async def upsert_chunk(
+    index: AsyncSearchIndex, chunk: List[Dict[str, Any]], seen: Optional[str] = None
+) -> int:
+    """
+    Write the papers of a chunk whose content changed and delete tombstoned
+    ones, with one round trip to read the stored hashes and one to write
+    (per shard for a sharded index). With seen, the SET of a snapshot
+    ingest, the paper ids are also added to it for delete_missing.
+
+    Returns:
+        int: Number of papers written or deleted.
+    """
+    client = get_async_client()
+    ids = [paper["paper_id"] for paper in chunk]
+    stored, digests = await asyncio.gather(
+        client.hmget(hashes_key(index), ids),
+        asyncio.to_thread(
+            lambda: [
+                None if paper.get("deleted") else content_hash(paper) for paper in chunk
+            ]
+        ),
+    )
+
+    pipes = PaperPipelines(index)
+    if seen is not None:
+        pipes.primary().sadd(seen, *ids)
+    changed = 0
+    for paper, previous, digest in zip(chunk, stored, digests):
+        if digest is None:
+            pipes.paper(paper["paper_id"]).delete(index.key(paper["paper_id"]))
+            pipes.primary().hdel(hashes_key(index), paper["paper_id"])
+            changed += 1
+            continue
+        if previous is not None and previous.decode() == digest:
+            continue
+        pipes.paper(paper["paper_id"]).hset(index.key(paper["paper_id"]), mapping=paper)
+        pipes.primary().hset(hashes_key(index), paper["paper_id"], digest)
+        changed += 1
+    await pipes.execute()
+    return changed
+
+
+async def delete_missing(index: AsyncSearchIndex, seen: str, batch_size: int) -> int:
+    """
+    Delete indexed papers missing from seen, the SET of papers read by a
+    snapshot ingest. The index is scanned with a cursor, so
+    papers written before content hashes were tracked are found too.
+
+    Returns:
+        int: Number of deleted papers.
+    """
+    client = get_async_client()
+    # collect first, deleting under the live cursor could skip papers
+    missing: List[str] = []
+    async for papers in pagination.scan_papers(
+        index, "*", batch_size, return_fields=["paper_id"]
+    ):
+        ids = [paper["paper_id"] for paper in papers if paper.get("paper_id")]
+        if ids:
+            present = await client.smismember(seen, ids)
+            missing += [id for id, read in zip(ids, present) if not read]
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start : start + batch_size]
+        pipes = PaperPipelines(index)
+        for id in batch:
+            pipes.paper(id).delete(index.key(id))
+        pipes.primary().hdel(hashes_key(index), *batch)
+        await pipes.execute()
+    return len(missing)
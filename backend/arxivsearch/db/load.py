@@ -1,107 +1,337 @@
+import argparse
 import asyncio
-import json
+import functools
+import itertools
 import logging
 import os
-from typing import Any, Dict, List
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional
 
-import numpy as np
 import requests
 from redisvl.index import AsyncSearchIndex
 
 from arxivsearch import config
-from arxivsearch.db.utils import get_async_index, get_schema
+from arxivsearch.db import ingest
+from arxivsearch.db.dataset import BinaryDataset, iter_papers
+from arxivsearch.db.facets import ensure_facet_table
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.pagination import paper_key
+from arxivsearch.db.utils import (
+    PaperPipelines,
+    bump_index_version,
+    get_async_client,
+    get_async_index,
+    get_schema,
+)
 from arxivsearch.schema.models import Provider
+from arxivsearch.utils.vectors import encode_vector, int8_field
 
 logger = logging.getLogger(__name__)
 
 
-def read_from_s3(path):
-    res = requests.get(config.S3_DATA_URL)
-    data = res.json()
-
-    if os.path.isdir(config.DATA_LOCATION):
-        logger.info(f"Writing s3 file to {path}")
-        with open(path, "w") as f:
-            json.dump(data, f)
-    else:
+def download_from_s3(path: str) -> str:
+    """
+    Stream the S3 dataset to disk without holding it in memory. Falls back
+    to a temporary file when the data directory does not exist.
+    """
+    if not os.path.isdir(config.DATA_LOCATION):
         logger.warning(
-            f"Data directory {config.DATA_LOCATION} not found. Skipping write of S3 data"
+            f"Data directory {config.DATA_LOCATION} not found. Downloading S3 data to a temporary file"
         )
-    return data
+        path = os.path.join(tempfile.gettempdir(), os.path.basename(path))
 
+    logger.info(f"Downloading s3 file to {path}")
+    with requests.get(config.S3_DATA_URL, stream=True) as res:
+        res.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in res.iter_content(chunk_size=config.LOAD_READ_SIZE):
+                f.write(chunk)
+    return path
 
-def read_paper_json() -> List[Dict[str, Any]]:
+
+def dataset_path() -> str:
     """
-    Load JSON array of arXiv papers and embeddings.
+    Local path of the default dataset, downloading it from S3 first if it
+    is not available locally.
     """
-    logger.info("Loading papers dataset from disk")
     path = os.path.join(config.DATA_LOCATION, config.DEFAULT_DATASET)
-    try:
-        with open(path, "r") as f:
-            data = json.load(f)
-    except:
+    if not os.path.exists(path):
         logger.info(f"Failed to read {path} => getting from s3")
-        data = read_from_s3(path)
+        path = download_from_s3(path)
+    return path
 
-    return data
+
+def stream_paper_json(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Stream arXiv papers and embeddings from disk, the default dataset unless
+    a path is given. A directory dataset is read as the binary format from
+    arxivsearch.db.dataset.
+    """
+    path = path or dataset_path()
+    if os.path.isdir(path):
+        logger.info(f"Streaming binary papers dataset from {path}")
+        return iter(BinaryDataset(path))
+
+    logger.info(f"Streaming papers dataset from {path}")
+    return iter_papers(path)
 
 
-async def write_async(index: AsyncSearchIndex, papers: list):
+def preprocess_paper(paper: dict) -> dict:
     """
-    Write arXiv paper records to Redis asynchronously.
+    Convert a raw dataset record into the HASH layout of the index. Vectors
+    are encoded with the configured storage datatype of their field, and
+    float32 buffers bound for float32 fields are passed through without
+    copying. Records marked "deleted" are tombstones of papers removed
+    upstream and keep only their id.
+    """
+    if paper.get("deleted"):
+        return {"paper_id": paper["id"], "deleted": True}
+    for provider_vector in Provider:
+        vector = paper[provider_vector]
+        datatype = config.VECTOR_DATATYPES[provider_vector.value]
+        if config.INT8_VECTORS:
+            paper[int8_field(provider_vector.value)] = encode_vector(vector, "int8")
+        if datatype != "float32" or not isinstance(vector, (bytes, memoryview)):
+            paper[provider_vector] = encode_vector(vector, datatype)
+    paper["paper_id"] = paper.pop("id")
+    paper["paper_key"] = paper_key(paper["paper_id"])
+    paper["categories"] = paper["categories"].replace(",", "|")
+    return paper
+
+
+def iter_chunks(papers: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """
+    Group raw papers into preprocessed chunks of at most size records.
+    """
+    papers = iter(papers)
+    while chunk := list(itertools.islice(papers, size)):
+        yield [preprocess_paper(paper) for paper in chunk]
+
+
+async def write_chunk(index: AsyncSearchIndex, chunk: List[dict]) -> int:
+    """
+    Write a chunk of preprocessed papers in a single pipelined round trip
+    per Redis node. Tombstones are skipped, there is nothing to delete in a fresh index.
+
+    Returns:
+        int: Number of papers written.
     """
+    chunk = [paper for paper in chunk if not paper.get("deleted")]
+    if isinstance(index, LocalSearchIndex):
+        await index.load(chunk, id_field="paper_id")
+        return len(chunk)
+    pipes = PaperPipelines(index)
+    for paper in chunk:
+        pipes.paper(paper["paper_id"]).hset(index.key(paper["paper_id"]), mapping=paper)
+    await pipes.execute()
+    return len(chunk)
 
-    async def preprocess_paper(paper: dict) -> dict:
-        for provider_vector in Provider:
-            paper[provider_vector] = np.array(
-                paper[provider_vector], dtype=np.float32
-            ).tobytes()
-        paper["paper_id"] = paper.pop("id")
-        paper["categories"] = paper["categories"].replace(",", "|")
-        return paper
 
+async def write_async(
+    index: AsyncSearchIndex,
+    papers: Iterable[dict],
+    write: Callable[[AsyncSearchIndex, List[dict]], Awaitable[int]] = write_chunk,
+    checkpoint: Optional[ingest.Checkpoint] = None,
+) -> int:
+    """
+    Write arXiv paper records to Redis asynchronously.
+
+    Papers are parsed and converted in chunks of LOAD_CHUNK_SIZE on a worker
+    thread while up to WRITE_CONCURRENCY chunks are written concurrently.
+    The bounded queue between the two stages applies backpressure, so peak
+    memory is proportional to the chunk size rather than the dataset size.
+
+    Args:
+        index (AsyncSearchIndex): Index to write to.
+        papers (Iterable[dict]): Raw dataset records.
+        write (callable, optional): Writes a chunk and returns the number of
+            papers changed. Defaults to write_chunk.
+        checkpoint (ingest.Checkpoint, optional): Notified of every written
+            chunk. Defaults to None.
+
+    Returns:
+        int: Number of papers changed.
+    """
     logger.info("Loading papers dataset to Redis")
 
-    _ = await index.load(
-        data=papers,
-        preprocess=preprocess_paper,
-        concurrency=int(config.WRITE_CONCURRENCY),
-        id_field="id",
+    chunk_size = int(config.LOAD_CHUNK_SIZE)
+    concurrency = int(config.WRITE_CONCURRENCY)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=int(config.LOAD_QUEUE_SIZE))
+    chunks = iter_chunks(papers, chunk_size)
+    progress: Dict[str, int] = {"papers": 0, "changed": 0}
+    start = logged_at = time.monotonic()
+
+    async def produce():
+        number = 0
+        while chunk := await asyncio.to_thread(next, chunks, None):
+            await queue.put((number, chunk))
+            number += 1
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def consume():
+        nonlocal logged_at
+        while item := await queue.get():
+            number, chunk = item
+            progress["changed"] += await write(index, chunk)
+            if checkpoint is not None:
+                await checkpoint.done(number, len(chunk))
+            progress["papers"] += len(chunk)
+            now = time.monotonic()
+            if now - logged_at >= config.LOAD_PROGRESS_INTERVAL:
+                logged_at = now
+                logger.info(
+                    f"{progress['papers']} papers loaded "
+                    f"({progress['papers'] / (now - start):.0f} papers/s)"
+                )
+
+    tasks = [asyncio.create_task(produce())]
+    tasks += [asyncio.create_task(consume()) for _ in range(concurrency)]
+    completed = False
+    try:
+        await asyncio.gather(*tasks)
+        completed = True
+    finally:
+        for task in tasks:
+            task.cancel()
+        # invalidate cached counts and facets, even after a partial write,
+        # but keep them when nothing changed
+        if progress["changed"] or not completed:
+            await bump_index_version(index)
+
+    elapsed = time.monotonic() - start
+    logger.info(
+        f"All papers loaded: {progress['papers']} papers in {elapsed:.1f}s "
+        f"({progress['papers'] / max(elapsed, 1e-9):.0f} papers/s), "
+        f"{progress['changed']} changed"
+    )
+    return progress["changed"]
+
+
+async def ingest_async(
+    index: AsyncSearchIndex, path: str, delete_missing: bool = False
+) -> Dict[str, Any]:
+    """
+    Incrementally ingest a dataset file into an existing index.
+
+    Papers are compared by content hash with what was last written, so only
+    new and changed papers are written, and tombstones ("deleted": true)
+    delete papers. Progress is checkpointed in Redis per file: a crashed run
+    of the same file resumes where it stopped, and a finished one is not
+    repeated, even after other files were ingested since. Running it again
+    is always safe.
+
+    Args:
+        index (AsyncSearchIndex): Index to ingest into.
+        path (str): JSON or binary dataset, a full snapshot or a delta.
+        delete_missing (bool, optional): The dataset is a complete snapshot,
+            delete indexed papers it does not contain. Defaults to False.
+
+    Returns:
+        Dict[str, Any]: Run summary with the papers changed and deleted,
+            and whether the run was skipped as already complete.
+    """
+    source = ingest.fingerprint(path)
+    state = await ingest.Checkpoint.read(index, source)
+    if state.get("status") == "complete":
+        logger.info(f"{path} was already ingested, skipping")
+        return {"skipped": True, "changed": 0, "deleted": 0}
+
+    seen = ingest.seen_key(index, source) if delete_missing else None
+    offset = int(state.get("offset", 0))
+    if offset:
+        logger.info(f"Resuming ingest of {path} after {offset} papers")
+    elif seen is not None:
+        # a new run, forget the papers read by an earlier one
+        await get_async_client().delete(seen)
+    checkpoint = ingest.Checkpoint(index, source, offset)
+    await checkpoint.save()
+
+    papers = itertools.islice(stream_paper_json(path), offset, None)
+    changed = await write_async(
+        index,
+        papers,
+        functools.partial(ingest.upsert_chunk, seen=seen),
+        checkpoint,
     )
 
-    logger.info("All papers loaded")
+    deleted = 0
+    if seen is not None:
+        deleted = await ingest.delete_missing(index, seen, int(config.LOAD_CHUNK_SIZE))
+        if deleted:
+            logger.info(f"Deleted {deleted} papers missing from {path}")
+            await bump_index_version(index)
+        await get_async_client().delete(seen)
+    await checkpoint.save("complete")
+    return {"skipped": False, "changed": changed, "deleted": deleted}
+
+
+async def load_local_index() -> LocalSearchIndex:
+    """
+    Create the in-process search engine and load the dataset into it.
+    """
+    index = LocalSearchIndex(get_schema())
+    await index.create()
+    await write_async(index=index, papers=stream_paper_json())
+    return index
 
 
 async def load_data():
+    if config.SEARCH_ENGINE == "local":
+        logger.info("Local search engine loads the dataset at startup, skipping")
+        return
+
     # Load schema specs and create index in Redis
     index = await get_async_index()
 
     # Load dataset and create index
     try:
-        # Check if index exists
-        if await index.exists() and len((await index.search("*")).docs) > 0:
-            # if running local and not seeing logger logs make sure index isn't already created
-            logger.info("Index and data already exists, skipping load")
-        else:
+        path = dataset_path()
+        if config.LOAD_MODE == "rebuild" or not await index.exists():
             logger.info("Creating new index")
-            await index.create(overwrite=True)
-            papers = read_paper_json()
-            await write_async(index=index, papers=papers)
+            await index.create(overwrite=True, drop=config.LOAD_MODE == "rebuild")
+            await ingest.reset(index)
+        # a no-op when this dataset was already loaded, a resume after a
+        # crash and a diff when the dataset changed
+        await ingest_async(index, path, delete_missing=config.LOAD_DELETE_MISSING)
     except Exception as e:
         logger.exception(
             "An exception occurred while trying to load the index and dataset"
         )
         raise
 
-    # Wait for any indexing to finish
-    while True:
-        info = await index.info()
-        if info["percent_indexed"] == "1":
-            logger.info("Indexing is complete!")
-            break
-        logger.info(f"{info['percent_indexed']} indexed...")
-        await asyncio.sleep(5)
+    # The API reports ready once indexing completes and builds the facet
+    # table then if it could not be built here, so do not wait for it
+    if config.PRECOMPUTE_FACETS and not await ensure_facet_table(index):
+        logger.info("Indexing in progress, the API will build the facet table")
+
+
+async def ingest_files(paths: List[str], delete_missing: bool):
+    index = await get_async_index()
+    if not await index.exists():
+        await index.create()
+    for path in paths:
+        summary = await ingest_async(index, path, delete_missing=delete_missing)
+        logger.info(f"{path}: {summary}")
+    if config.PRECOMPUTE_FACETS:
+        await ensure_facet_table(index)
 
 
 if __name__ == "__main__":
-    asyncio.run(load_data())
+    parser = argparse.ArgumentParser(
+        description="Load the default dataset, or ingest dataset files "
+        "(e.g. daily deltas) incrementally."
+    )
+    parser.add_argument("paths", nargs="*", help="JSON or binary dataset files")
+    parser.add_argument(
+        "--delete-missing",
+        action="store_true",
+        help="The files are a complete snapshot, delete papers they do not contain",
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.paths:
+        asyncio.run(ingest_files(args.paths, args.delete_missing))
+    else:
+        asyncio.run(load_data())
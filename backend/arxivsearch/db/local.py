@@ -0,0 +1,366 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from redisvl.query import BaseQuery, CountQuery, FilterQuery, VectorQuery
+from redisvl.schema import IndexSchema
+
+from arxivsearch.utils.vectors import decode_vector, encode_vector
+
+# tag clause of a filter expression, e.g. @categories:{cs\.LG|math\-ph}
+_TAG_CLAUSE = re.compile(r"@(\w+):\{((?:[^}\\]|\\.)*)\}")
+_ESCAPE = re.compile(r"\\(.)")
+
+
+class LocalSearchIndex:
+    """
+    Exact in-process search engine exposing the subset of the
+    AsyncSearchIndex surface used by the API (load, fetch and query for
+    FilterQuery, CountQuery and VectorQuery).
+
+    Vectors are kept as one contiguous float32 matrix per provider field and
+    KNN is a brute-force cosine scan with argpartition top-k, so results are
+    exact. Tag filters are evaluated against boolean bitmaps precomputed per
+    tag value. Only conjunctions of tag clauses, as produced by
+    build_filter_expression, are supported.
+
+    The matrices and bitmaps are rebuilt lazily on the first query after a
+    write. int8 copies of provider fields are not kept, queries against them
+    are answered from the full-precision field.
+    """
+
+    def __init__(self, schema: IndexSchema):
+        self.schema = schema
+        self.vector_fields = {
+            name: field.attrs.datatype.value.lower()
+            for name, field in schema.fields.items()
+            if field.type == "vector" and field.attrs.datatype.value != "INT8"
+        }
+        self.tag_fields = {
+            name: field.attrs.separator
+            for name, field in schema.fields.items()
+            if field.type == "tag"
+        }
+        self.sortable_fields = [
+            name
+            for name, field in schema.fields.items()
+            if field.type == "numeric" and field.attrs.sortable
+        ]
+        self.version = 0
+        self._created = False
+        self.clear()
+
+    def clear(self):
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._docs: List[Dict[str, str]] = []
+        self._vectors: Dict[str, List[np.ndarray]] = {
+            field: [] for field in self.vector_fields
+        }
+        self._matrices: Dict[str, np.ndarray] = {}
+        self._inv_norms: Dict[str, np.ndarray] = {}
+        self._bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        self._sort_values: Dict[str, np.ndarray] = {}
+        self._dirty = True
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def key(self, id: str) -> str:
+        index = self.schema.index
+        return f"{index.prefix}{index.key_separator}{id}" if index.prefix else id
+
+    async def exists(self) -> bool:
+        return self._created
+
+    async def create(self, overwrite: bool = False, drop: bool = False):
+        if overwrite and drop:
+            self.clear()
+        self._created = True
+
+    async def delete(self, drop: bool = True):
+        self.clear()
+        self._created = False
+
+    async def disconnect(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
+
+    async def load(
+        self, data: Iterable[Dict[str, Any]], id_field: str = "paper_id"
+    ) -> List[str]:
+        """
+        Add or replace records. Vector fields may be lists of floats or
+        buffers encoded with the field datatype, as written to Redis.
+
+        Returns:
+            List[str]: Keys of the loaded records.
+        """
+        keys = []
+        for record in data:
+            id = str(record[id_field])
+            doc = {
+                name: value if isinstance(value, str) else str(value)
+                for name, value in record.items()
+                if name not in self.schema.fields
+                or self.schema.fields[name].type != "vector"
+            }
+            row = self._rows.get(id)
+            if row is None:
+                row = self._rows[id] = len(self._ids)
+                self._ids.append(id)
+                self._docs.append(doc)
+                for vectors in self._vectors.values():
+                    vectors.append(None)  # type: ignore
+            else:
+                self._docs[row] = doc
+            for field, datatype in self.vector_fields.items():
+                value = record.get(field)
+                if isinstance(value, (bytes, memoryview)):
+                    vector = decode_vector(value, datatype)
+                else:
+                    vector = np.asarray(value, dtype=np.float32)
+                self._vectors[field][row] = vector
+            keys.append(self.key(id))
+        self._dirty = True
+        return keys
+
+    def _build(self):
+        """Rebuild the vector matrices and tag bitmaps after writes."""
+        size = len(self._ids)
+        for field, vectors in self._vectors.items():
+            matrix = (
+                np.ascontiguousarray(np.stack(vectors), dtype=np.float32)
+                if vectors
+                else np.zeros((0, self.schema.fields[field].attrs.dims), np.float32)
+            )
+            norms = np.linalg.norm(matrix, axis=1)
+            self._matrices[field] = matrix
+            self._inv_norms[field] = np.divide(
+                1.0, norms, out=np.zeros_like(norms), where=norms > 0
+            )
+
+        for field, separator in self.tag_fields.items():
+            rows = defaultdict(list)
+            for row, doc in enumerate(self._docs):
+                for value in doc.get(field, "").split(separator):
+                    if value.strip():
+                        rows[value.strip().lower()].append(row)
+            bitmaps = {}
+            for value, matches in rows.items():
+                bitmap = np.zeros(size, dtype=bool)
+                bitmap[matches] = True
+                bitmaps[value] = bitmap
+            self._bitmaps[field] = bitmaps
+
+        for field in self.sortable_fields:
+            # records without the field never match a range
+            self._sort_values[field] = np.array(
+                [float(doc.get(field, "nan")) for doc in self._docs], dtype=np.float64
+            )
+        self._dirty = False
+
+    def _mask(self, filter_expression: Any) -> Optional[np.ndarray]:
+        """Rows matching a filter expression, or None for no filter."""
+        text = str(filter_expression) if filter_expression is not None else "*"
+        mask = None
+        for field, values in _TAG_CLAUSE.findall(text):
+            bitmaps = self._bitmaps.get(field)
+            if bitmaps is None:
+                raise ValueError(f"{field} is not a tag field of the index")
+            clause = np.zeros(len(self._ids), dtype=bool)
+            for value in values.split("|"):
+                bitmap = bitmaps.get(_ESCAPE.sub(r"\1", value).strip().lower())
+                if bitmap is not None:
+                    clause |= bitmap
+            mask = clause if mask is None else mask & clause
+        if _TAG_CLAUSE.sub("", text).strip("()* "):
+            raise ValueError(f"Unsupported filter for the local engine: {text}")
+        return mask
+
+    def _field(self, name: str) -> str:
+        """Resolve a queried vector field, mapping int8 copies to the full
+        precision field they were quantized from."""
+        if name in self.vector_fields:
+            return name
+        base = name.removesuffix("_int8")
+        if base in self.vector_fields:
+            return base
+        raise ValueError(f"{name} is not a vector field of the index")
+
+    def _document(self, row: int, return_fields: List[str]) -> Dict[str, Any]:
+        doc = self._docs[row]
+        if not return_fields:
+            # like FT.SEARCH on a HASH, return every field with vectors as
+            # their stored payload decoded to str
+            document = {"id": self.key(self._ids[row]), **doc}
+            for field, datatype in self.vector_fields.items():
+                payload = encode_vector(self._matrices[field][row], datatype)
+                document[field] = payload.decode("utf-8", "ignore")
+            return document
+        return {
+            "id": self.key(self._ids[row]),
+            **{field: doc[field] for field in return_fields if field in doc},
+        }
+
+    def vector(self, id: str, field: str) -> Optional[np.ndarray]:
+        """Return the float32 vector stored for a record, or None."""
+        row = self._rows.get(id)
+        if row is None:
+            return None
+        return self._vectors[self._field(field)][row]
+
+    def combinations(self, filter_expression: Any = "*") -> List[Dict]:
+        """Count records per distinct (year, categories) combination, in the
+        shape returned by facets.aggregate_combinations."""
+        if self._dirty:
+            self._build()
+        mask = self._mask(filter_expression)
+        rows: Iterable[int] = range(len(self._ids))
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+        counts: Dict[tuple, int] = defaultdict(int)
+        for row in rows:
+            doc = self._docs[row]
+            counts[(doc.get("year", ""), doc.get("categories", ""))] += 1
+        return [
+            {
+                "year": year,
+                "categories": [c.strip() for c in categories.split("|") if c.strip()],
+                "count": count,
+            }
+            for (year, categories), count in counts.items()
+        ]
+
+    def scan(
+        self,
+        filter_expression: Any,
+        after: int,
+        count: int,
+        return_fields: List[str],
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """
+        Keyset page of the records matching a filter, in insertion order.
+
+        Args:
+            filter_expression: Filter the records must match.
+            after (int): Row of the last record of the previous page, -1 for
+                the first page.
+            count (int): Maximum number of records to return.
+            return_fields (List[str]): Fields to return, all when empty.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Optional[int]]: The page and the row
+                to continue after, or None when the scan is complete.
+        """
+        if self._dirty:
+            self._build()
+        mask = self._mask(filter_expression)
+        start = after + 1
+        if mask is None:
+            rows = np.arange(start, len(self._ids))
+        else:
+            rows = start + np.flatnonzero(mask[start:])
+        page = rows[:count]
+        documents = [self._document(int(row), return_fields) for row in page]
+        return documents, int(page[-1]) if len(rows) > count else None
+
+    def sorted_page(
+        self,
+        filter_expression: Any,
+        field: str,
+        start: float,
+        count: int,
+        return_fields: List[str],
+    ) -> List[Dict[str, Any]]:
+        """
+        Records matching a filter whose sortable numeric field is at least
+        start, by ascending field value, like FT.SEARCH with a numeric range
+        and SORTBY.
+
+        Args:
+            filter_expression: Filter the records must match.
+            field (str): Sortable numeric field to order by.
+            start (float): Lowest field value to return.
+            count (int): Maximum number of records to return.
+            return_fields (List[str]): Fields to return, all when empty.
+
+        Returns:
+            List[Dict[str, Any]]: The matching records.
+        """
+        if self._dirty:
+            self._build()
+        if field not in self._sort_values:
+            raise ValueError(f"{field} is not a sortable numeric field of the index")
+        values = self._sort_values[field]
+        matches = values >= start
+        mask = self._mask(filter_expression)
+        rows = np.flatnonzero(matches if mask is None else matches & mask)
+        rows = rows[np.argsort(values[rows], kind="stable")][:count]
+        return [self._document(int(row), return_fields) for row in rows]
+
+    async def fetch(self, id: str) -> Optional[Dict[str, Any]]:
+        row = self._rows.get(id)
+        if row is None:
+            return None
+        return {
+            **self._docs[row],
+            **{
+                field: encode_vector(vectors[row], self.vector_fields[field])
+                for field, vectors in self._vectors.items()
+            },
+        }
+
+    async def query(self, query: BaseQuery) -> Any:
+        """Run a CountQuery, FilterQuery or VectorQuery, returning results in
+        the same shape as AsyncSearchIndex.query."""
+        if self._dirty:
+            self._build()
+        mask = self._mask(query._filter_expression)  # type: ignore
+
+        if isinstance(query, CountQuery):
+            return len(self._ids) if mask is None else int(mask.sum())
+
+        if isinstance(query, FilterQuery):
+            rows = np.arange(len(self._ids)) if mask is None else np.flatnonzero(mask)
+            rows = rows[query._offset : query._offset + query._num]
+            return [self._document(row, query._return_fields) for row in rows]
+
+        if isinstance(query, VectorQuery):
+            return self._knn(query, mask)
+
+        raise ValueError(f"Unsupported query type {type(query).__name__}")
+
+    def _knn(self, query: VectorQuery, mask: Optional[np.ndarray]) -> List[Dict]:
+        field = self._field(query._vector_field_name)
+        vector = query._vector
+        if isinstance(vector, (bytes, memoryview)):
+            vector = decode_vector(vector, query._dtype)
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+
+        matrix, inv_norms = self._matrices[field], self._inv_norms[field]
+        candidates = np.arange(len(matrix)) if mask is None else np.flatnonzero(mask)
+        if mask is not None:
+            matrix, inv_norms = matrix[candidates], inv_norms[candidates]
+        k = min(query._num_results, len(candidates))
+        if k == 0:
+            return []
+
+        scores = (matrix @ vector) * inv_norms / (norm or 1.0)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        top = top[query._offset : query._offset + query._num]
+
+        results = []
+        for i in top:
+            document = self._document(int(candidates[i]), query._return_fields)
+            document[query.DISTANCE_ID] = float(1 - scores[i])
+            results.append(document)
+        return results
@@ -0,0 +1,281 @@
+import base64
+import binascii
+import hashlib
+import json
+import logging
+from typing import (
+    Any,
+    AsyncGenerator,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from redis.commands.search.aggregation import AggregateRequest, Cursor
+from redis.exceptions import ResponseError
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import FilterQuery
+from redisvl.query.filter import FilterExpression, Num
+
+from arxivsearch.db import utils
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.sharding import ShardedSearchIndex
+
+logger = logging.getLogger(__name__)
+
+
+# cursor token that starts a new scan
+START = "*"
+
+# sortable numeric field pages are ordered by, see paper_key
+KEY_FIELD = "paper_key"
+
+
+class InvalidCursor(ValueError):
+    """Raised for cursor tokens that are malformed or were issued by another
+    index or for another query."""
+
+
+class CursorUnavailable(Exception):
+    """Raised when Redis cannot open a server side cursor for an export,
+    e.g. when the index already has the maximum number of cursors open."""
+
+
+def paper_key(paper_id: str) -> int:
+    """
+    Sort key of a paper for keyset pagination: the first 52 bits of a SHA-1
+    of its id, exact as a Redis NUMERIC value. It only depends on the id, so
+    it is the same on every shard and after every reload.
+    """
+    return int(hashlib.sha1(str(paper_id).encode()).hexdigest()[:13], 16)
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Pack scan state into an opaque, URL safe token."""
+    payload = json.dumps(state, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Dict[str, Any]:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Malformed cursor")
+    if not isinstance(state, dict):
+        raise InvalidCursor("Malformed cursor")
+    return state
+
+
+def query_fingerprint(filter_expression: Any, return_fields: List[str]) -> str:
+    """Digest of the filter and fields of a scan, so a token is only
+    accepted for the query it was issued for."""
+    payload = json.dumps([str(filter_expression), return_fields])
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+async def _keyset_page(
+    index: AsyncSearchIndex,
+    filter_expression: Any,
+    start: int,
+    count: int,
+    return_fields: List[str],
+) -> List[Dict[str, Any]]:
+    # papers with a paper_key of at least start, in paper_key order
+    if isinstance(index, ShardedSearchIndex):
+        pages = await index.fan_out(
+            lambda shard: _keyset_page(
+                shard, filter_expression, start, count, return_fields
+            )
+        )
+        papers = [paper for page in pages for paper in page]
+        papers.sort(key=lambda paper: (int(paper[KEY_FIELD]), paper["paper_id"]))
+        return papers[:count]
+    if isinstance(index, LocalSearchIndex):
+        return index.sorted_page(
+            filter_expression, KEY_FIELD, start, count, return_fields
+        )
+    if not isinstance(filter_expression, FilterExpression):
+        filter_expression = FilterExpression(str(filter_expression))
+    query = FilterQuery(
+        filter_expression=filter_expression & (Num(KEY_FIELD) >= start),
+        return_fields=return_fields,
+        num_results=count,
+        sort_by=KEY_FIELD,
+    )
+    return await index.query(query)
+
+
+async def read_page(
+    index: AsyncSearchIndex,
+    filter_expression: Any,
+    count: int,
+    cursor: str = START,
+    return_fields: Optional[List[str]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Read one page of the papers matching a filter, continuing a scan.
+
+    Pages are keyset pages in paper_key order: a page is the first count
+    papers with a paper_key of at least the last one returned, so every page
+    costs the same however deep the scan is, and no state is kept on the
+    server. The token carries that paper_key and the papers already
+    returned with it. The filter and fields always come from the caller,
+    and a token is only accepted with the filter and fields of the first
+    page.
+
+    Args:
+        index (AsyncSearchIndex): Search index to scan.
+        filter_expression: Filter the papers must match.
+        count (int): Maximum number of papers in the page.
+        cursor (str, optional): START, or the token returned with the
+            previous page. Defaults to START.
+        return_fields (List[str], optional): Fields to return, all fields
+            when empty.
+
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str]]: The papers and the token
+            of the next page, or None when the scan is complete.
+
+    Raises:
+        InvalidCursor: If the token is malformed, or was issued by another
+            index or for another filter or set of fields.
+    """
+    name = index.schema.index.name
+    return_fields = return_fields or []
+    fingerprint = query_fingerprint(filter_expression, return_fields)
+    start, seen = 0, []
+    if cursor != START:
+        state = decode_cursor(cursor)
+        if state.get("index") != name:
+            raise InvalidCursor("Cursor was issued by another index")
+        if state.get("query") != fingerprint:
+            raise InvalidCursor("Cursor was issued for another query")
+        after, ids = state.get("after"), state.get("seen")
+        if not isinstance(after, int) or not isinstance(ids, list):
+            raise InvalidCursor("Malformed cursor")
+        start, seen = after, ids
+
+    # the id and sort key are needed to continue after the page
+    fields = (
+        list(dict.fromkeys(return_fields + ["paper_id", KEY_FIELD]))
+        if return_fields
+        else []
+    )
+    # papers sharing the sort key of the previous page's last paper come back
+    # with it, read enough to fill the page without them
+    papers = await _keyset_page(
+        index, filter_expression, start, count + len(seen) + 1, fields
+    )
+    papers = [
+        paper
+        for paper in papers
+        if not (int(paper[KEY_FIELD]) == start and paper["paper_id"] in seen)
+    ]
+    more = len(papers) > count
+    papers = papers[:count]
+    if not more:
+        return papers, None
+    last = int(papers[-1][KEY_FIELD])
+    if last != start:
+        seen = []
+    seen = seen + [
+        paper["paper_id"] for paper in papers if int(paper[KEY_FIELD]) == last
+    ]
+    return papers, encode_cursor(
+        {"index": name, "query": fingerprint, "after": last, "seen": seen}
+    )
+
+
+def _decode_row(row: List) -> Dict[str, str]:
+    # vectors are binary, decode like FT.SEARCH does for HASH fields
+    return {
+        key.decode(): value.decode("utf-8", "ignore")
+        for key, value in zip(row[::2], row[1::2])
+    }
+
+
+async def _aggregate_pages(
+    index: AsyncSearchIndex,
+    filter_expression: Any,
+    batch_size: int,
+    return_fields: List[str],
+) -> AsyncGenerator[List[Dict[str, Any]], None]:
+    # FT.AGGREGATE WITHCURSOR on the primary, whatever index is scanned: the
+    # cursor only exists on the node that opened it
+    client = utils.primary_client(index)
+    name = index.schema.index.name
+    fields = [f"@{field}" for field in return_fields]
+    request: Union[AggregateRequest, Cursor] = (
+        AggregateRequest(str(filter_expression))
+        .load(*fields)
+        .cursor(count=batch_size)
+        .dialect(2)
+    )
+    try:
+        result = await utils.aggregate(client, name, request)
+    except ResponseError as e:
+        raise CursorUnavailable(str(e)) from e
+    cid = result.cursor.cid if result.cursor else 0
+    try:
+        while True:
+            papers = [_decode_row(row) for row in result.rows]
+            if papers:
+                yield papers
+            # a cursor id of 0 means the scan is complete
+            if not cid:
+                return
+            request = Cursor(cid)
+            request.count = batch_size
+            result = await utils.aggregate(client, name, request)
+            cid = result.cursor.cid if result.cursor else 0
+    finally:
+        if cid:
+            try:
+                await client.execute_command("FT.CURSOR", "DEL", name, cid)
+            except ResponseError as e:
+                logger.debug(f"Could not delete cursor: {e}")
+
+
+async def scan_papers(
+    index: AsyncSearchIndex,
+    filter_expression: Any,
+    batch_size: int,
+    return_fields: Optional[List[str]] = None,
+) -> AsyncGenerator[List[Dict[str, Any]], None]:
+    """
+    Yield every paper matching a filter, a page of at most batch_size papers
+    at a time, for bulk export.
+
+    On Redis the scan is an FT.AGGREGATE WITHCURSOR, whose server side
+    cursor is released if the consumer stops early. Shards are scanned one
+    after the other. The local engine scans in insertion order.
+
+    Raises:
+        CursorUnavailable: If Redis cannot open a cursor, before any page.
+    """
+    return_fields = return_fields or []
+    if isinstance(index, ShardedSearchIndex):
+        for shard in index.shards:
+            async for papers in scan_papers(
+                shard, filter_expression, batch_size, return_fields
+            ):
+                yield papers
+        return
+    if isinstance(index, LocalSearchIndex):
+        after: Optional[int] = -1
+        while after is not None:
+            papers, after = index.scan(
+                filter_expression, after, batch_size, return_fields
+            )
+            if papers:
+                yield papers
+        return
+    pages = _aggregate_pages(index, filter_expression, batch_size, return_fields)
+    try:
+        async for papers in pages:
+            yield papers
+    finally:
+        await pages.aclose()
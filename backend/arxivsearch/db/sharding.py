@@ -0,0 +1,184 @@
+import asyncio
+import contextlib
+import logging
+import zlib
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import BaseQuery, CountQuery
+from redisvl.query.query import BaseVectorQuery
+
+from arxivsearch import config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# names of the shards missing from the results of the current request
+_failed_shards: ContextVar[Optional[List[str]]] = ContextVar(
+    "failed_shards", default=None
+)
+
+
+async def track_failed_shards():
+    """
+    Collect the shards that fail while answering the current request, see
+    failed_shards. Use it as a route dependency: it must run in the request
+    task, before the queries fan out.
+    """
+    _failed_shards.set([])
+
+
+def failed_shards() -> List[str]:
+    """Shards left out of the results of the current request."""
+    # a shard may fail several queries of the same request
+    return list(dict.fromkeys(_failed_shards.get() or []))
+
+
+class ShardedSearchIndex:
+    """
+    Search index spread over several Redis nodes, exposing the subset of
+    the AsyncSearchIndex surface used by the API.
+
+    Papers are assigned to a shard by a CRC32 of their paper_id, so the
+    same paper always lands on the same node and every shard indexes
+    roughly the same number of papers. Each shard is a complete index with
+    the same schema. Queries run on every shard concurrently and are merged:
+    KNN results by vector_distance into a global top k, counts summed and
+    filter results concatenated in shard order.
+
+    A shard that fails or does not answer within SHARD_TIMEOUT is left out
+    and reported by failed_shards when SHARD_PARTIAL_RESULTS is set, as long
+    as another shard answered. Otherwise its error is raised.
+    """
+
+    def __init__(
+        self,
+        shards: List[AsyncSearchIndex],
+        timeout: Optional[float] = config.SHARD_TIMEOUT,
+        partial_results: bool = config.SHARD_PARTIAL_RESULTS,
+    ):
+        if not shards:
+            raise ValueError("A sharded index needs at least one shard")
+        self.shards = shards
+        self.schema = shards[0].schema
+        self.timeout = timeout
+        self.partial_results = partial_results
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+    def shard_number(self, paper_id: str) -> int:
+        return zlib.crc32(str(paper_id).encode()) % len(self.shards)
+
+    def shard_for(self, paper_id: str) -> AsyncSearchIndex:
+        """Shard holding a paper."""
+        return self.shards[self.shard_number(paper_id)]
+
+    def partition(self, papers: Iterable[Dict[str, Any]]) -> List[tuple]:
+        """Group papers by shard, as (shard, papers) pairs."""
+        groups: Dict[int, List[Dict[str, Any]]] = {}
+        for paper in papers:
+            groups.setdefault(self.shard_number(paper["paper_id"]), []).append(paper)
+        return [(self.shards[number], group) for number, group in groups.items()]
+
+    def key(self, id: str) -> str:
+        return self.shards[0].key(id)
+
+    async def fan_out(
+        self, call: Callable[[AsyncSearchIndex], Awaitable[T]]
+    ) -> List[T]:
+        """
+        Run call on every shard concurrently, each within the shard timeout.
+
+        Args:
+            call: Coroutine function run with each shard.
+
+        Returns:
+            List[T]: Results of the shards that answered, in shard order.
+        """
+        results = await asyncio.gather(
+            *[asyncio.wait_for(call(shard), self.timeout) for shard in self.shards],
+            return_exceptions=True,
+        )
+        errors = [
+            (number, result)
+            for number, result in enumerate(results)
+            if isinstance(result, BaseException)
+        ]
+        if not errors:
+            return results  # type: ignore
+        if not self.partial_results or len(errors) == len(self.shards):
+            raise errors[0][1]
+
+        failed = _failed_shards.get()
+        for number, error in errors:
+            logger.warning(f"Shard {number} failed: {type(error).__name__} {error}")
+            if failed is not None:
+                failed.append(f"shard{number}")
+        return [result for result in results if not isinstance(result, BaseException)]
+
+    @contextlib.contextmanager
+    def _widened(self, queries: List[BaseQuery]):
+        # every shard returns the first offset + num results, so that the
+        # merged results can be paged
+        paging = [(query._offset, query._num) for query in queries]
+        for query, (offset, num) in zip(queries, paging):
+            if offset:
+                query.paging(0, offset + num)
+        try:
+            yield paging
+        finally:
+            for query, (offset, num) in zip(queries, paging):
+                query.paging(offset, num)
+
+    @staticmethod
+    def merge(query: BaseQuery, results: List[Any], offset: int, num: int) -> Any:
+        """Merge the results of a query on several shards."""
+        if isinstance(query, CountQuery):
+            return sum(results)
+        documents = [document for result in results for document in result]
+        if isinstance(query, BaseVectorQuery):
+            documents.sort(key=lambda document: float(document["vector_distance"]))
+        return documents[offset : offset + num]
+
+    async def query(self, query: BaseQuery) -> Any:
+        with self._widened([query]) as paging:
+            results = await self.fan_out(lambda shard: shard.query(query))
+        return self.merge(query, results, *paging[0])
+
+    async def query_many(
+        self,
+        queries: List[BaseQuery],
+        run: Callable[[AsyncSearchIndex, List[BaseQuery]], Awaitable[List[Any]]],
+    ) -> List[Any]:
+        """Run several queries on every shard with run, e.g. in one pipeline
+        per shard, and merge the results of each query."""
+        with self._widened(queries) as paging:
+            results = await self.fan_out(lambda shard: run(shard, queries))
+        return [
+            self.merge(query, [result[i] for result in results], *paging[i])
+            for i, query in enumerate(queries)
+        ]
+
+    # index management waits for every shard, without the query timeout
+
+    async def exists(self) -> bool:
+        return all(await asyncio.gather(*[shard.exists() for shard in self.shards]))
+
+    async def create(self, overwrite: bool = False, drop: bool = False):
+        await asyncio.gather(*[shard.create(overwrite, drop) for shard in self.shards])
+
+    async def delete(self, drop: bool = True):
+        await asyncio.gather(*[shard.delete(drop) for shard in self.shards])
+
+    async def disconnect(self):
+        for shard in self.shards:
+            await shard.disconnect()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.disconnect()
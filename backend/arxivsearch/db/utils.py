@@ -1,33 +1,401 @@
+import asyncio
+import itertools
 import logging
 import os
-from typing import List
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, Union, cast
 
+from redis import asyncio as aredis
+from redis.asyncio.retry import Retry
+from redis.backoff import EqualJitterBackoff
+from redis.commands.search.aggregation import AggregateRequest, AggregateResult, Cursor
+from redis.commands.search.result import Result
+from redis.exceptions import ConnectionError, TimeoutError
 from redisvl.index import AsyncSearchIndex
+from redisvl.index.index import process_results
+from redisvl.query import BaseQuery, VectorQuery
 from redisvl.query.filter import FilterExpression, Tag
 from redisvl.schema import IndexSchema
+from redisvl.schema.fields import VectorDataType
 
 from arxivsearch import config
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.sharding import ShardedSearchIndex
+from arxivsearch.schema.models import BaseRequest, FusedRequest
+from arxivsearch.utils.vectors import encode_vector, int8_field
 
 logger = logging.getLogger(__name__)
 
 
-# global search index
+# global search index and redis clients
 _global_index = None
+_global_client = None
+_read_clients: Optional[List[aredis.Redis]] = None
+_read_indexes: Optional[List[AsyncSearchIndex]] = None
+_shard_clients: List[aredis.Redis] = []
+_read_turn = itertools.count()
+
+# last index version read from each Redis node, keyed by client id
+_index_versions: Dict[int, Dict[str, float]] = {}
 
 
 def get_schema() -> IndexSchema:
     dir_path = os.path.dirname(os.path.realpath(__file__)) + "/schema"
     file_path = os.path.join(dir_path, "index.yaml")
-    return IndexSchema.from_yaml(file_path)
+    schema = IndexSchema.from_yaml(file_path)
+
+    # Apply the configured storage precision and HNSW parameters to each
+    # provider vector field
+    for provider, datatype in config.VECTOR_DATATYPES.items():
+        attrs = schema.fields[provider].attrs
+        attrs.datatype = VectorDataType(datatype.upper())
+        for param, value in config.HNSW_PARAMS[provider].items():
+            setattr(attrs, param, value)
+        if config.INT8_VECTORS:
+            schema.add_field(
+                {
+                    "name": int8_field(provider),
+                    "type": "vector",
+                    "attrs": {**attrs.model_dump(), "datatype": "int8"},
+                }
+            )
+    return schema
 
 
 async def get_async_index():
     global _global_index
     if not _global_index:
-        _global_index = AsyncSearchIndex(get_schema(), redis_url=config.REDIS_URL)
+        if config.SEARCH_ENGINE == "local":
+            # imported here because the loader depends on this module
+            from arxivsearch.db.load import load_local_index
+
+            _global_index = await load_local_index()
+        elif config.REDIS_SHARD_URLS:
+            _global_index = ShardedSearchIndex(
+                [
+                    AsyncSearchIndex(get_schema(), redis_client=client)
+                    for client in get_shard_clients()
+                ]
+            )
+        else:
+            _global_index = AsyncSearchIndex(
+                get_schema(), redis_client=get_async_client()
+            )
     return _global_index
 
 
+async def get_read_index():
+    """
+    Search index for read-only routes. With REDIS_REPLICA_URLS set, each
+    call returns the index bound to the next replica in turn, otherwise the
+    primary index. Sharded indexes always read from their shards.
+    """
+    global _read_indexes
+    index = await get_async_index()
+    if not config.REDIS_REPLICA_URLS or not isinstance(index, AsyncSearchIndex):
+        return index
+    if _read_indexes is None:
+        _read_indexes = [
+            AsyncSearchIndex(index.schema, redis_client=client)
+            for client in get_read_clients()
+        ]
+    return _read_indexes[next(_read_turn) % len(_read_indexes)]
+
+
+# state of the get_connection call running in the current task
+_pending: ContextVar[Optional[Dict[str, bool]]] = ContextVar("pending", default=None)
+
+
+class MeteredConnectionPool(aredis.BlockingConnectionPool):
+    """
+    Blocking connection pool that counts its connections, the callers
+    waiting for a free connection and those that gave up after the pool
+    timeout. The counts are kept as connections are made, handed out and
+    released, rather than read from the pool's internal lists.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.created = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.wait_timeouts = 0
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self.created += 1
+        return connection
+
+    async def release(self, connection):
+        pending = _pending.get()
+        if pending is not None:
+            # get_connection hands back a connection that failed to connect
+            pending["taken"] = True
+        else:
+            self.in_use -= 1
+        await super().release(connection)
+
+    async def get_connection(self, *args, **kwargs):
+        full = not self.can_get_connection()
+        self.waiting += full
+        pending = {"taken": False}
+        token = _pending.set(pending)
+        try:
+            connection = await super().get_connection(*args, **kwargs)
+        except ConnectionError:
+            # a caller that never got a connection gave up on the pool
+            # timeout, one that did failed to connect
+            if full and not pending["taken"]:
+                self.wait_timeouts += 1
+            raise
+        finally:
+            _pending.reset(token)
+            self.waiting -= full
+        self.in_use += 1
+        return connection
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max": self.max_connections,
+            "in_use": self.in_use,
+            "available": self.created - self.in_use,
+            "waiting": self.waiting,
+            "wait_timeouts": self.wait_timeouts,
+        }
+
+
+def connection_pool(url: str) -> MeteredConnectionPool:
+    """Connection pool for a Redis node, sized, timed out and retried as
+    configured."""
+    return MeteredConnectionPool.from_url(
+        url,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        timeout=config.REDIS_POOL_TIMEOUT,
+        socket_timeout=config.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=config.REDIS_CONNECT_TIMEOUT,
+        health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(
+            EqualJitterBackoff(
+                cap=config.REDIS_RETRY_BACKOFF_CAP,
+                base=config.REDIS_RETRY_BACKOFF_BASE,
+            ),
+            config.REDIS_RETRIES,
+        ),
+        retry_on_error=[ConnectionError, TimeoutError],
+    )
+
+
+def get_async_client() -> aredis.Redis:
+    """Shared async Redis client of the primary, for writes and helpers that
+    bypass the search index."""
+    global _global_client
+    if not _global_client:
+        _global_client = aredis.Redis(connection_pool=connection_pool(config.REDIS_URL))
+    return _global_client
+
+
+def get_read_clients() -> List[aredis.Redis]:
+    """Clients of the read replicas, or only the primary without replicas."""
+    global _read_clients
+    if _read_clients is None:
+        _read_clients = [
+            aredis.Redis(connection_pool=connection_pool(url))
+            for url in config.REDIS_REPLICA_URLS
+        ] or [get_async_client()]
+    return _read_clients
+
+
+def get_read_client() -> aredis.Redis:
+    """Client for read-only commands, taking the replicas in turn."""
+    clients = get_read_clients()
+    return clients[next(_read_turn) % len(clients)]
+
+
+def get_shard_clients() -> List[aredis.Redis]:
+    """Clients of the REDIS_SHARD_URLS nodes, reusing the primary client for
+    a shard on the primary."""
+    if not _shard_clients:
+        _shard_clients.extend(
+            (
+                get_async_client()
+                if url == config.REDIS_URL
+                else aredis.Redis(connection_pool=connection_pool(url))
+            )
+            for url in config.REDIS_SHARD_URLS
+        )
+    return _shard_clients
+
+
+def index_client(index: AsyncSearchIndex) -> aredis.Redis:
+    """Client of the Redis node a (shard) index lives on."""
+    return index.client or get_async_client()
+
+
+def node_client(index: AsyncSearchIndex) -> aredis.Redis:
+    """Client of the node an index reads from: its replica for a replica
+    index, otherwise the primary. Version stamps and the lookups cached
+    under them are read from this node, so they stay consistent."""
+    client = getattr(index, "client", None)
+    if client is not None and any(client is replica for replica in _read_clients or []):
+        return client
+    return get_async_client()
+
+
+def primary_client(index: AsyncSearchIndex) -> aredis.Redis:
+    """
+    Client of the node an index lives on, the primary rather than a replica,
+    for server side state such as FT.AGGREGATE cursors: later reads must
+    reach the same node, and read indexes take the replicas in turn.
+    """
+    client = index.client
+    if client is None or any(client is replica for replica in _read_clients or []):
+        return get_async_client()
+    return client
+
+
+async def aggregate(
+    client: aredis.Redis, name: str, request: Union[AggregateRequest, Cursor]
+) -> AggregateResult:
+    """Run FT.AGGREGATE with an async client. The redis type stubs only
+    describe the sync search commands, whose results are not awaitable."""
+    return await cast(Awaitable[AggregateResult], client.ft(name).aggregate(request))
+
+
+def paper_client(
+    index: AsyncSearchIndex, paper_id: str, default: Optional[aredis.Redis] = None
+) -> aredis.Redis:
+    """
+    Client of the Redis node holding a paper: its shard for a sharded index,
+    otherwise default (e.g. a replica for reads) or the primary.
+    """
+    if isinstance(index, ShardedSearchIndex):
+        return index_client(index.shard_for(paper_id))
+    return default or get_async_client()
+
+
+class PaperPipelines:
+    """
+    Non-transactional pipelines per Redis node, for writes to paper keys
+    that may live on different shards next to writes to the primary. Without
+    shards every command goes to a single pipeline on the primary.
+    """
+
+    def __init__(self, index: AsyncSearchIndex):
+        self.index = index
+        self._pipes: Dict[int, Any] = {}
+
+    def _pipe(self, client: aredis.Redis):
+        if id(client) not in self._pipes:
+            self._pipes[id(client)] = client.pipeline(transaction=False)
+        return self._pipes[id(client)]
+
+    def primary(self):
+        return self._pipe(get_async_client())
+
+    def paper(self, paper_id: str):
+        return self._pipe(paper_client(self.index, paper_id))
+
+    async def execute(self):
+        await asyncio.gather(*[pipe.execute() for pipe in self._pipes.values()])
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """Utilization of the primary and replica connection pools."""
+    stats = {"primary": get_async_client().connection_pool.stats()}
+    for i, client in enumerate(get_read_clients()):
+        if client is not _global_client:
+            stats[f"replica{i}"] = client.connection_pool.stats()
+    for i, client in enumerate(_shard_clients):
+        if client is not _global_client:
+            stats[f"shard{i}"] = client.connection_pool.stats()
+    return stats
+
+
+async def close_clients():
+    """Close every client and disconnect its connection pool."""
+    global _global_index, _global_client, _read_clients, _read_indexes
+    clients = [_global_client, *(_read_clients or []), *_shard_clients]
+    for client in {id(c): c for c in clients if c is not None}.values():
+        # clients built on an explicit pool leave it open by default
+        await client.aclose(close_connection_pool=True)
+    # Redis indexes hold the closed clients, the in-process index holds none
+    if not isinstance(_global_index, LocalSearchIndex):
+        _global_index = None
+    _global_client, _read_clients, _read_indexes = None, None, None
+    _shard_clients.clear()
+    _index_versions.clear()
+
+
+def version_key(index: AsyncSearchIndex) -> str:
+    return f"{index.schema.index.name}:version"
+
+
+async def get_index_version(index: AsyncSearchIndex) -> int:
+    """
+    Return the index version stamp, which is bumped on every write to the
+    index. Caches of query results include the version in their keys so
+    that loads and deletes invalidate them. The stamp is re-read from Redis
+    at most every INDEX_VERSION_TTL seconds.
+
+    A replica index reads the stamp from its own replica, so results of a
+    replica lagging behind a load are cached under the version they were
+    computed at, not the newer one of the primary.
+    """
+    if isinstance(index, LocalSearchIndex):
+        return index.version
+    client = node_client(index)
+    cached = _index_versions.setdefault(
+        id(client), {"value": 0, "checked_at": float("-inf")}
+    )
+    now = time.monotonic()
+    if now - cached["checked_at"] >= config.INDEX_VERSION_TTL:
+        value = await client.get(version_key(index))
+        cached.update(value=int(value or 0), checked_at=now)
+    return int(cached["value"])
+
+
+async def bump_index_version(index: AsyncSearchIndex) -> int:
+    """Mark the index contents as changed."""
+    if isinstance(index, LocalSearchIndex):
+        index.version += 1
+        return index.version
+    client = get_async_client()
+    version = await client.incr(version_key(index))
+    _index_versions[id(client)] = {"value": version, "checked_at": time.monotonic()}
+    return version
+
+
+async def indexing_complete(index: AsyncSearchIndex) -> bool:
+    """Whether the search index has finished indexing its documents."""
+    if isinstance(index, LocalSearchIndex):
+        return True
+    if isinstance(index, ShardedSearchIndex):
+        return all(
+            await asyncio.gather(*[indexing_complete(shard) for shard in index.shards])
+        )
+    info = await index.info()
+    return float(info["percent_indexed"]) >= 1 and not int(info["indexing"])
+
+
+def normalize_filter(
+    years: List[str], categories: List[str]
+) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Canonical, hashable form of a year/category filter: empty values are
+    dropped, duplicates removed and values sorted. Tag matching is case
+    insensitive, so values are lowercased.
+    """
+    return (
+        tuple(sorted({str(year).strip().lower() for year in years if year})),
+        tuple(
+            sorted(
+                {str(category).strip().lower() for category in categories if category}
+            )
+        ),
+    )
+
+
 def build_filter_expression(
     years: List[str], categories: List[str]
 ) -> FilterExpression:
@@ -51,3 +419,123 @@ def build_filter_expression(
         str(category) for category in categories if category
     ]
     return year_filter & category_filter
+
+
+class HNSWVectorQuery(VectorQuery):
+    """VectorQuery that can override the EF_RUNTIME of an HNSW field for a
+    single query, trading latency for recall."""
+
+    EF_RUNTIME_PARAM: str = "ef_runtime"
+
+    def __init__(self, *args, ef_runtime: Optional[int] = None, **kwargs):
+        self._ef_runtime = ef_runtime
+        super().__init__(*args, **kwargs)
+
+    def _build_query_string(self) -> str:
+        query_string = super()._build_query_string()
+        if not self._ef_runtime:
+            return query_string
+        suffix = f" AS {self.DISTANCE_ID}]"
+        return (
+            query_string[: -len(suffix)]
+            + f" EF_RUNTIME ${self.EF_RUNTIME_PARAM}"
+            + suffix
+        )
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        params = super().params
+        if self._ef_runtime:
+            params[self.EF_RUNTIME_PARAM] = self._ef_runtime
+        return params
+
+
+def build_vector_query(
+    vector: Any,
+    request: Union[BaseRequest, FusedRequest],
+    provider: Optional[str] = None,
+    num_results: Optional[int] = None,
+) -> HNSWVectorQuery:
+    """
+    Construct the KNN query for a similarity request.
+
+    The query vector is encoded with the storage datatype of the provider
+    field, or quantized to int8 when QUERY_INT8_VECTORS targets the int8
+    copies instead. A request ef_runtime overrides the EF_RUNTIME of the
+    HNSW field for this query.
+
+    Args:
+        vector: Query vector for the requested provider.
+        request (BaseRequest): Similarity request with provider, number of
+            results, years and categories.
+        provider (str, optional): Provider to query instead of the request
+            provider, required for fused requests. Defaults to None.
+        num_results (int, optional): Number of results instead of the
+            request number_of_results. Defaults to None.
+
+    Returns:
+        HNSWVectorQuery: KNN query against the provider vector field.
+
+    Raises:
+        ValueError: If no provider is given for a fused request.
+    """
+    if provider is None:
+        if not isinstance(request, BaseRequest):
+            raise ValueError("A provider is required for fused requests")
+        provider = request.provider.value
+    if config.QUERY_INT8_VECTORS:
+        field, datatype = int8_field(provider), "int8"
+    else:
+        field, datatype = provider, config.VECTOR_DATATYPES[provider]
+    return HNSWVectorQuery(
+        vector=encode_vector(vector, datatype),
+        vector_field_name=field,
+        dtype=datatype,
+        num_results=num_results or request.number_of_results,
+        return_fields=config.RETURN_FIELDS,
+        filter_expression=build_filter_expression(request.years, request.categories),
+        ef_runtime=request.ef_runtime,
+    )
+
+
+async def run_queries(index: AsyncSearchIndex, queries: List[BaseQuery]) -> List[Any]:
+    """
+    Execute several queries against the index in one pipelined round trip.
+
+    Args:
+        index (AsyncSearchIndex): Search index to query.
+        queries (List[BaseQuery]): RedisVL queries to run.
+
+    Returns:
+        List[Any]: Processed results in query order, as AsyncSearchIndex.query
+            would return them.
+    """
+    if not queries:
+        return []
+    if isinstance(index, LocalSearchIndex):
+        return [await index.query(query) for query in queries]
+    if isinstance(index, ShardedSearchIndex):
+        return await index.query_many(queries, run_queries)
+
+    client = index.client or get_read_client()
+    # the redis type stubs have no async search pipeline
+    search: Any = client.ft(index.schema.index.name)
+    pipe = search.pipeline(transaction=False)
+    for query in queries:
+        await pipe.search(query, query_params=query.params)
+    responses = await pipe.execute()
+
+    return [
+        process_results(
+            # fields are decoded as UTF-8, as the queries built here ask for
+            Result(
+                response,
+                not query._no_content,
+                has_payload=query._with_payloads,
+                with_scores=query._with_scores,
+            ),
+            query=query,
+            storage_type=index.schema.index.storage_type,
+        )
+        for query, response in zip(queries, responses)
+    ]
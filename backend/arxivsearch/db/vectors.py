@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from redisvl.index import AsyncSearchIndex
+
+from arxivsearch import config
+from arxivsearch.db import utils
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.utils.cache import LRUCache
+from arxivsearch.utils.vectors import decode_vector
+
+logger = logging.getLogger(__name__)
+
+
+# hot paper vectors keyed by (index version, paper_id, provider)
+_vector_cache = LRUCache(maxsize=config.PAPER_VECTOR_CACHE_SIZE)
+
+
+async def get_paper_vector(
+    index: AsyncSearchIndex, paper_id: str, provider: str
+) -> Optional[np.ndarray]:
+    """
+    Fetch a single provider embedding of a paper. Only the requested HASH
+    field is read from Redis and decoded from its storage datatype to
+    float32, and vectors are cached per index version so rewriting papers
+    invalidates them.
+
+    Args:
+        index (AsyncSearchIndex): Search index the paper belongs to.
+        paper_id (str): Id of the paper.
+        provider (str): Provider whose vector field to read.
+
+    Returns:
+        Optional[np.ndarray]: The paper vector, or None if the paper does
+            not exist.
+    """
+    if isinstance(index, LocalSearchIndex):
+        return index.vector(paper_id, provider)
+    key = (await utils.get_index_version(index), paper_id, provider)
+    vector = _vector_cache.get(key)
+    if vector is not None:
+        return vector
+
+    client = utils.paper_client(index, paper_id, utils.node_client(index))
+    buffer = await client.hget(index.key(paper_id), provider)
+    if buffer is None:
+        return None
+    vector = decode_vector(buffer, config.VECTOR_DATATYPES[provider])
+    _vector_cache.set(key, vector)
+    return vector
+
+
+async def get_paper_vectors(
+    index: AsyncSearchIndex, lookups: List[Tuple[str, str]]
+) -> List[Optional[np.ndarray]]:
+    """
+    Fetch many (paper_id, provider) vectors, reading all cache misses in a
+    single pipelined round trip per Redis node.
+
+    Args:
+        index (AsyncSearchIndex): Search index the papers belong to.
+        lookups (List[Tuple[str, str]]): Paper ids and providers to read.
+
+    Returns:
+        List[Optional[np.ndarray]]: Vectors in lookup order, None for papers
+            that do not exist.
+    """
+    if isinstance(index, LocalSearchIndex):
+        return [index.vector(*lookup) for lookup in lookups]
+    version = await utils.get_index_version(index)
+    results = [_vector_cache.get((version, *lookup)) for lookup in lookups]
+    missing = [i for i, vector in enumerate(results) if vector is None]
+    if not missing:
+        return results
+
+    # one pipeline per Redis node holding papers, sent concurrently
+    read_client = utils.node_client(index)
+    pipes: Dict[int, Tuple[Any, List[int]]] = {}
+    for i in missing:
+        paper_id, provider = lookups[i]
+        client = utils.paper_client(index, paper_id, read_client)
+        pipe, positions = pipes.setdefault(
+            id(client), (client.pipeline(transaction=False), [])
+        )
+        pipe.hget(index.key(paper_id), provider)
+        positions.append(i)
+    buffers = await asyncio.gather(*[pipe.execute() for pipe, _ in pipes.values()])
+    for (_, positions), node_buffers in zip(pipes.values(), buffers):
+        for i, buffer in zip(positions, node_buffers):
+            if buffer is not None:
+                provider = lookups[i][1]
+                results[i] = decode_vector(buffer, config.VECTOR_DATATYPES[provider])
+                _vector_cache.set((version, *lookups[i]), results[i])
+    return results
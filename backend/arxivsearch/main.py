@@ -1,16 +1,20 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 import uvicorn
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from starlette.middleware.cors import CORSMiddleware
 
 from arxivsearch import config
 from arxivsearch.api.main import api_router
-from arxivsearch.db.utils import get_async_index
-from arxivsearch.spa import SinglePageApplication
+from arxivsearch.api.routes import health, metrics
+from arxivsearch.api.routes.papers import embeddings
+from arxivsearch.db.utils import close_clients, get_async_index
+from arxivsearch.spa import CachedStaticFiles, SinglePageApplication
+from arxivsearch.utils import model_server
+from arxivsearch.utils.metrics import TimingMiddleware, registry
 
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -21,7 +25,12 @@ logging.basicConfig(
 async def lifespan(app: FastAPI):
     index = await get_async_index()
     async with index:
+        # readiness is reported by /readyz while the worker warms up
+        warmup = asyncio.create_task(health.warmup(index))
         yield
+        warmup.cancel()
+    embeddings.shutdown()
+    await close_clients()
 
 
 app = FastAPI(
@@ -39,14 +48,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-stage request timing, only installed when reported somewhere
+if config.SERVER_TIMING or config.METRICS_ENABLED:
+    app.add_middleware(
+        TimingMiddleware,
+        path_prefix=config.API_V1_STR,
+        server_timing=config.SERVER_TIMING,
+        metrics=registry if config.METRICS_ENABLED else None,
+    )
+
 # Routers
 app.include_router(
     api_router,
     prefix=config.API_V1_STR,
 )
+app.include_router(health.router)
+if config.METRICS_ENABLED:
+    app.include_router(metrics.router)
 
 # static image files
-app.mount("/data", StaticFiles(directory="data"), name="data")
+app.mount("/data", CachedStaticFiles(directory="data"), name="data")
 
 ## mount the built GUI react files into the static dir to be served.
 current_file = Path(__file__)
@@ -67,6 +88,9 @@ def main():
             }
         )
 
+    if config.HF_EMBEDDING_BACKEND == "server":
+        # one model shared by every worker, instead of a copy per worker
+        model_server.start_process()
     uvicorn.run("arxivsearch.main:app", **server_attr)
 
 
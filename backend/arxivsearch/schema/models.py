@@ -1,6 +1,9 @@
 from enum import Enum
+from typing import Annotated, Any, Optional, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from arxivsearch import config
 
 
 class Provider(str, Enum):
@@ -17,6 +20,48 @@ class BaseRequest(BaseModel):
     provider: Provider
     number_of_results: int = 15
     search_type: str = "KNN"
+    # HNSW candidate list size for this query, defaults to the index setting
+    ef_runtime: Optional[int] = Field(default=None, ge=1, le=config.MAX_EF_RUNTIME)
+
+
+class Fusion(str, Enum):
+    """Rank fusion method of multi-provider searches"""
+
+    rrf = "rrf"
+    weighted = "weighted"
+
+
+class FusedRequest(BaseModel):
+    categories: list[str]
+    years: list[str]
+    providers: list[Provider] = Field(
+        default_factory=lambda: list(Provider), min_length=1
+    )
+    number_of_results: int = 15
+    fusion: Fusion = Fusion.rrf
+    # weight per provider, 1 for providers left out
+    weights: dict[Provider, Annotated[float, Field(ge=0)]] = Field(default_factory=dict)
+    rrf_k: int = Field(default=config.FUSION_RRF_K, ge=1)
+    ef_runtime: Optional[int] = Field(default=None, ge=1, le=config.MAX_EF_RUNTIME)
+
+    @field_validator("providers")
+    @classmethod
+    def unique_providers(cls, providers: list[Provider]) -> list[Provider]:
+        return list(dict.fromkeys(providers))
+
+    @model_validator(mode="after")
+    def positive_weights(self) -> "FusedRequest":
+        if not any(self.weights.get(provider, 1.0) for provider in self.providers):
+            raise ValueError("weights of the providers must not all be zero")
+        return self
+
+
+class FusedPaperSimilarityRequest(FusedRequest):
+    paper_id: str
+
+
+class FusedTextSimilarityRequest(FusedRequest):
+    user_text: str
 
 
 class PaperSimilarityRequest(BaseRequest):
@@ -47,16 +92,54 @@ class VectorSearchPaper(Paper):
     vector_distance: float
     similarity_score: float
 
-    def __init__(self, *args, **kwargs):
-        kwargs["similarity_score"] = 1 - float(kwargs["vector_distance"])
-        super().__init__(*args, **kwargs)
+    @model_validator(mode="before")
+    @classmethod
+    def set_similarity_score(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "vector_distance" in data:
+            data = {**data, "similarity_score": 1 - float(data["vector_distance"])}
+        return data
 
 
 class SearchResponse(BaseModel):
     total: int
     papers: list[BaseSearchPaper]
+    # token of the next page in cursor pagination
+    next_cursor: Optional[str] = None
 
 
 class VectorSearchResponse(BaseModel):
     total: int
     papers: list[VectorSearchPaper]
+
+
+class FusedSearchPaper(Paper):
+    score: float
+    # rank (from 1) and vector distance for each provider that returned the paper
+    ranks: dict[str, int]
+    distances: dict[str, float]
+
+
+class FusedSearchResponse(BaseModel):
+    total: int
+    papers: list[FusedSearchPaper]
+
+
+class BatchSearchRequest(BaseModel):
+    queries: list[Union[UserTextSimilarityRequest, PaperSimilarityRequest]] = Field(
+        max_length=config.MAX_BATCH_QUERIES
+    )
+
+
+class BatchSearchResponse(BaseModel):
+    results: list[VectorSearchResponse]
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class FacetsResponse(BaseModel):
+    total: int
+    years: list[FacetCount]
+    categories: list[FacetCount]
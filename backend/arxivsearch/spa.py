@@ -1,34 +1,240 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
 import os
-from typing import Tuple
+import re
+from email.utils import formatdate
+from typing import Dict, Optional, Set, Union
 
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
 
+from arxivsearch import config
 
-class SinglePageApplication(StaticFiles):
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+
+# build outputs with a content hash in their name, e.g. main.3f2a9c1e.js,
+# never change and can be cached for good
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript",
+    "application/json",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+    "image/x-icon",
+    "image/vnd.microsoft.icon",
+}
+
+# content codings in order of preference, with their file suffix
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+
+def compressible(media_type: str) -> bool:
+    return media_type.startswith("text/") or media_type in COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(accept_encoding: str) -> Set[str]:
+    """Content codings allowed by an Accept-Encoding header."""
+    accepted, rejected, wildcard = set(), set(), False
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "*":
+            wildcard = q > 0
+        elif q > 0:
+            accepted.add(coding)
+        else:
+            rejected.add(coding)
+    if wildcard:
+        accepted |= set(ENCODINGS) - rejected
+    return accepted
+
+
+class StaticAsset:
+    """A static file held in memory, with its compressed variants."""
+
+    def __init__(
+        self, path: str, body: bytes, mtime: float, variants: Dict[str, bytes]
+    ):
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.media_type = media_type
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.bodies = {"identity": body, **variants}
+        self.headers = {
+            "cache-control": (
+                IMMUTABLE if HASHED_NAME.search(os.path.basename(path)) else REVALIDATE
+            ),
+            "last-modified": formatdate(mtime, usegmt=True),
+        }
+        if variants:
+            self.headers["vary"] = "Accept-Encoding"
+
+    def etag(self, encoding: str) -> str:
+        # each representation gets its own strong validator
+        suffix = "" if encoding == "identity" else f"-{encoding}"
+        return f'"{self.digest}{suffix}"'
+
+    def select(self, accept_encoding: str) -> str:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.bodies and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def response(self, request_headers: Headers) -> Response:
+        encoding = self.select(request_headers.get("accept-encoding", ""))
+        headers = dict(self.headers, etag=self.etag(encoding))
+        if encoding != "identity":
+            headers["content-encoding"] = encoding
+
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match:
+            # If-None-Match uses the weak comparison
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or headers["etag"] in tags:
+                return NotModifiedResponse(Headers(headers))
+        return Response(
+            self.bodies[encoding], media_type=self.media_type, headers=headers
+        )
+
+
+class CachedStaticFiles(StaticFiles):
+    """
+    StaticFiles serving a directory from memory.
+
+    Every file up to STATIC_MAX_FILE_SIZE is read once at startup, with
+    gzip and, when the brotli package is installed, brotli variants of
+    compressible files. Variants built ahead of time (main.js.gz,
+    main.js.br) are used as they are. Responses pick the variant from
+    Accept-Encoding, carry strong ETags answered with 304 Not Modified,
+    and hashed build outputs are cached as immutable.
+
+    Larger files, and without a fallback files added after startup, are
+    served from disk by StaticFiles. With a fallback, paths unknown at
+    startup get the fallback file instead.
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, os.PathLike],
+        html: bool = False,
+        check_dir: bool = True,
+        fallback: Optional[str] = None,
+    ) -> None:
+        super().__init__(
+            directory=directory, packages=None, html=html, check_dir=check_dir
+        )
+        self.fallback = fallback
+        self.assets: Dict[str, StaticAsset] = {}
+        # files known at startup but too large to hold in memory
+        self.on_disk: Set[str] = set()
+        if self.directory is not None and os.path.isdir(self.directory):
+            self.load(str(self.directory))
+
+    def load(self, directory: str):
+        files = {
+            os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+            for root, _, names in os.walk(directory)
+            for name in names
+        }
+        size = 0
+        for path in sorted(files):
+            base, suffix = os.path.splitext(path)
+            if suffix in ENCODINGS.values() and base in files:
+                continue
+            full_path = os.path.join(directory, path)
+            stat = os.stat(full_path)
+            if stat.st_size > config.STATIC_MAX_FILE_SIZE:
+                self.on_disk.add(path)
+                continue
+            with open(full_path, "rb") as f:
+                body = f.read()
+            variants = self.compress(path, body, files, directory)
+            self.assets[path] = StaticAsset(path, body, stat.st_mtime, variants)
+            size += len(body) + sum(map(len, variants.values()))
+        logger.info(
+            f"Loaded {len(self.assets)} static files ({size} bytes) from {directory}"
+        )
+
+    @staticmethod
+    def compress(
+        path: str, body: bytes, files: Set[str], directory: str
+    ) -> Dict[str, bytes]:
+        variants = {}
+        for encoding, suffix in ENCODINGS.items():
+            if path + suffix in files:
+                with open(os.path.join(directory, path + suffix), "rb") as f:
+                    variants[encoding] = f.read()
+        media_type = mimetypes.guess_type(path)[0] or ""
+        if len(body) < config.STATIC_COMPRESS_MIN_SIZE or not compressible(media_type):
+            return variants
+        if "gzip" not in variants:
+            variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+        if "br" not in variants and brotli is not None:
+            variants["br"] = brotli.compress(body, quality=11)
+        # keep only the variants that are actually smaller
+        return {
+            encoding: variant
+            for encoding, variant in variants.items()
+            if len(variant) < len(body)
+        }
+
+    def find(self, key: str) -> Optional[StaticAsset]:
+        asset = self.assets.get(key)
+        if asset is None and self.html:
+            asset = self.assets.get(f"{key}/index.html".lstrip("/"))
+        return asset
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        key = "" if path == "." else path.replace(os.sep, "/")
+        asset = self.find(key)
+        if asset is None and key not in self.on_disk and self.fallback is not None:
+            # client side routes get the index without touching the disk
+            asset = self.assets.get(self.fallback)
+        if asset is None:
+            return await super().get_response(path, scope)
+        return asset.response(Headers(scope=scope))
+
+
+class SinglePageApplication(CachedStaticFiles):
     """Configure a FastAPI application to both serve static files mounted
     at a specific directory and also serve a number of routers for a backend
     API at the same time.
+
+    Paths that match no file at startup are client side routes, answered
+    with the index from memory, so files added to the build later are only
+    served after a restart.
     """
 
-    def __init__(self, directory: os.PathLike, index="index.html") -> None:
+    def __init__(self, directory: Union[str, os.PathLike], index="index.html") -> None:
         self.index = index
 
         # set html=True to resolve the index even when no
         # the base path is passed in
-        super().__init__(directory=directory, packages=None, html=True, check_dir=True)
-
-    async def get_response(self, path: str, scope):
-        response = await super().get_response(path, scope)
-        if response.status_code == 404:
-            response = await super().get_response(".", scope)
-        return response
-
-    def lookup_path(self, path: str) -> Tuple[str, os.stat_result | None]:
-        results = super().lookup_path(path)
-        full_path, stat_result = results
-
-        # if a file cannot be found
-        if stat_result is None:
-            return super().lookup_path(self.index)
-
-        return (full_path, stat_result)
+        super().__init__(directory=directory, html=True, check_dir=True, fallback=index)
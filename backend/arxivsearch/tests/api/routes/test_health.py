@@ -0,0 +1,39 @@
+import pytest
+
+from arxivsearch import config
+from arxivsearch.api.routes import health
+from arxivsearch.db import utils
+
+
+@pytest.mark.asyncio
+async def test_warmup_retries_until_ready(monkeypatch):
+    monkeypatch.setattr(config, "READY_POLL_INTERVAL", 0.001)
+    monkeypatch.setattr(config, "PRECOMPUTE_FACETS", False)
+    monkeypatch.setattr(config, "WARMUP", False)
+    monkeypatch.setattr(
+        health, "state", {"models": False, "index": False, "error": None}
+    )
+    errors = [ConnectionError("Redis is loading"), TimeoutError("still loading")]
+
+    async def indexing_complete(index):
+        if errors:
+            raise errors.pop(0)
+        return True
+
+    monkeypatch.setattr(utils, "indexing_complete", indexing_complete)
+    errors_seen = []
+    sleep = health.asyncio.sleep
+
+    async def record_sleep(delay):
+        errors_seen.append(health.state["error"])
+        await sleep(delay)
+
+    monkeypatch.setattr(health.asyncio, "sleep", record_sleep)
+
+    await health.warmup(index=None)
+
+    assert errors_seen == [
+        "ConnectionError: Redis is loading",
+        "TimeoutError: still loading",
+    ]
+    assert health.state == {"models": True, "index": True, "error": None}
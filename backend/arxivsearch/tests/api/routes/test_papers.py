@@ -1,6 +1,9 @@
+import json
+
 import pytest
 from httpx import AsyncClient
 
+from arxivsearch.api.routes import papers
 from arxivsearch.schema.models import PaperSimilarityRequest, UserTextSimilarityRequest
 
 
@@ -88,6 +91,96 @@ async def test_vector_by_text(
     assert content["papers"][0]["year"] == years
 
 
+@pytest.mark.asyncio(scope="session")
+async def test_root_cursor_pagination(async_client: AsyncClient, test_data) -> None:
+    paper_ids, cursor = [], "*"
+    while cursor:
+        response = await async_client.get(
+            "papers/", params={"limit": 1, "cursor": cursor, "compact": True}
+        )
+        assert response.status_code == 200
+        content = response.json()
+        paper_ids += [paper["paper_id"] for paper in content["papers"]]
+        cursor = content["next_cursor"]
+
+    assert sorted(paper_ids) == sorted(paper["paper_id"] for paper in test_data)
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_root_bad_cursor(async_client: AsyncClient) -> None:
+    response = await async_client.get("papers/", params={"cursor": "not a cursor"})
+    assert response.status_code == 400
+
+    # a cursor only continues the query it was issued for
+    response = await async_client.get(
+        "papers/", params={"limit": 1, "cursor": "*", "compact": True}
+    )
+    cursor = response.json()["next_cursor"]
+    response = await async_client.get("papers/", params={"limit": 1, "cursor": cursor})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_export(async_client: AsyncClient, test_data) -> None:
+    response = await async_client.get("papers/export")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(line["paper_id"] for line in lines) == sorted(
+        paper["paper_id"] for paper in test_data
+    )
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_vector_by_text_compact(
+    async_client: AsyncClient,
+    text_req: UserTextSimilarityRequest,
+):
+    response = await async_client.post(
+        f"papers/vector_search/by_text",
+        params={"compact": True},
+        json=text_req.model_dump(),
+    )
+
+    assert response.status_code == 200
+    paper = response.json()["papers"][0]
+    assert "abstract" not in paper
+    assert paper["similarity_score"] == pytest.approx(1 - paper["vector_distance"])
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_vector_by_paper_response_cache(
+    async_client: AsyncClient,
+    paper_req: PaperSimilarityRequest,
+):
+    first = await async_client.post(
+        "papers/vector_search/by_paper", json=paper_req.model_dump()
+    )
+    second = await async_client.post(
+        "papers/vector_search/by_paper", json=paper_req.model_dump()
+    )
+
+    assert second.headers["x-cache"] == "hit"
+    assert second.content == first.content
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_vector_by_text_response_cache_keys_on_model(
+    async_client: AsyncClient,
+    text_req: UserTextSimilarityRequest,
+    monkeypatch,
+):
+    await async_client.post("papers/vector_search/by_text", json=text_req.model_dump())
+    # another model embeds the same text differently
+    monkeypatch.setattr(papers.embeddings, "model_name", lambda provider: "other")
+    response = await async_client.post(
+        "papers/vector_search/by_text", json=text_req.model_dump()
+    )
+
+    assert response.headers["x-cache"] == "miss"
+
+
 @pytest.mark.asyncio(scope="session")
 async def test_vector_by_text_bad_input(async_client: AsyncClient, bad_req_json: dict):
 
@@ -114,6 +207,27 @@ async def test_vector_by_paper(
     assert len(content["papers"]) == 2
 
 
+@pytest.mark.asyncio(scope="session")
+async def test_vector_by_paper_ef_runtime(
+    async_client: AsyncClient,
+    paper_req: PaperSimilarityRequest,
+):
+    response = await async_client.post(
+        f"papers/vector_search/by_paper",
+        json={**paper_req.model_dump(), "ef_runtime": 50},
+    )
+
+    assert response.status_code == 200
+    assert response.json()["total"] == 2
+
+    response = await async_client.post(
+        f"papers/vector_search/by_paper",
+        json={**paper_req.model_dump(), "ef_runtime": 10**9},
+    )
+
+    assert response.status_code == 422
+
+
 @pytest.mark.asyncio(scope="session")
 async def test_vector_by_paper_bad_input(async_client: AsyncClient, bad_req_json: dict):
 
@@ -122,3 +236,86 @@ async def test_vector_by_paper_bad_input(async_client: AsyncClient, bad_req_json
     )
 
     assert response.status_code == 422
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_facets_w_filters(async_client: AsyncClient, years: str, categories: str):
+
+    response = await async_client.get(f"papers/facets?years={years}")
+
+    assert response.status_code == 200
+    content = response.json()
+    assert content["total"] == 1
+    assert content["years"] == [{"value": years, "count": 1}]
+    assert content["categories"] == [{"value": categories, "count": 1}]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_vector_by_paper_not_found(
+    async_client: AsyncClient, paper_req: PaperSimilarityRequest
+):
+    missing_req = paper_req.model_copy(update={"paper_id": "0000.0000"})
+    response = await async_client.post(
+        "papers/vector_search/by_paper", json=missing_req.model_dump()
+    )
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_vector_batch(
+    async_client: AsyncClient,
+    text_req: UserTextSimilarityRequest,
+    paper_req: PaperSimilarityRequest,
+):
+    batch_req = {"queries": [paper_req.model_dump(), text_req.model_dump()]}
+    response = await async_client.post("papers/vector_search/batch", json=batch_req)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["total"] for result in results] == [2, 1]
+    assert len(results[0]["papers"]) == 2
+    assert results[1]["papers"][0]["year"] == text_req.years[0]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_vector_fused_by_paper(async_client: AsyncClient, test_data):
+    paper_id = test_data[0]["paper_id"]
+    response = await async_client.post(
+        "papers/vector_search/fused/by_paper",
+        json={"paper_id": paper_id, "years": [], "categories": []},
+    )
+
+    assert response.status_code == 200
+    content = response.json()
+    assert content["total"] == 2
+    assert len(content["papers"]) == 2
+    # the paper itself is the nearest neighbour for every provider
+    assert content["papers"][0]["paper_id"] == paper_id
+    assert content["papers"][0]["ranks"] == {
+        "huggingface": 1,
+        "openai": 1,
+        "cohere": 1,
+    }
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_vector_fused_by_text_weighted(
+    async_client: AsyncClient, text_req: UserTextSimilarityRequest
+):
+    fused_req = {
+        "user_text": text_req.user_text,
+        "providers": ["huggingface"],
+        "fusion": "weighted",
+        "years": text_req.years,
+        "categories": text_req.categories,
+    }
+    response = await async_client.post(
+        "papers/vector_search/fused/by_text", json=fused_req
+    )
+
+    assert response.status_code == 200
+    content = response.json()
+    assert content["total"] == 1
+    paper = content["papers"][0]
+    assert paper["score"] == pytest.approx(1 - paper["distances"]["huggingface"])
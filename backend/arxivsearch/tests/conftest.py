@@ -10,7 +10,8 @@ from httpx import AsyncClient
 from redisvl.index import SearchIndex
 
 from arxivsearch import config
-from arxivsearch.db.utils import get_async_index, get_schema
+from arxivsearch.db.pagination import paper_key
+from arxivsearch.db.utils import get_async_index, get_schema, version_key
 from arxivsearch.main import app
 
 
@@ -35,8 +36,11 @@ def test_data(index):
         ).tobytes()
         paper["openai"] = np.array(paper["openai"], dtype=np.float32).tobytes()
         paper["cohere"] = np.array(paper["cohere"], dtype=np.float32).tobytes()
+        paper["paper_key"] = paper_key(paper["paper_id"])
 
     _ = index.load(data=papers, id_field="paper_id")
+    # invalidate counts cached for the previous index contents
+    index.client.incr(version_key(index))
     return papers
 
 
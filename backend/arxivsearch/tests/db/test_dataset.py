@@ -0,0 +1,54 @@
+import io
+import json
+
+import numpy as np
+
+from arxivsearch.db.dataset import (
+    BinaryDataset,
+    convert_json_dataset,
+    iter_json_array,
+    iter_papers,
+)
+
+
+def test_iter_json_array_small_reads():
+    papers = [{"id": str(i), "title": "Paper, [one]", "year": i} for i in range(5)]
+    f = io.StringIO(json.dumps(papers, indent=2))
+
+    assert list(iter_json_array(f, read_size=7)) == papers
+
+
+def test_iter_json_array_empty():
+    assert list(iter_json_array(io.StringIO(" [ ] "), read_size=2)) == []
+
+
+def test_iter_papers_jsonl(tmp_path):
+    path = tmp_path / "papers.jsonl"
+    path.write_text('{"id": "1"}\n\n{"id": "2"}\n')
+
+    assert [paper["id"] for paper in iter_papers(str(path))] == ["1", "2"]
+
+
+def test_convert_json_dataset_round_trip(tmp_path):
+    papers = [
+        {
+            "id": str(i),
+            "title": f"Paper {i}",
+            "categories": "cs.LG,cs.AI",
+            "huggingface": [float(i)] * 3,
+            "openai": [float(i)] * 4,
+            "cohere": [float(i)] * 2,
+        }
+        for i in range(3)
+    ]
+    source = tmp_path / "papers.json"
+    source.write_text(json.dumps(papers))
+
+    convert_json_dataset(str(source), str(tmp_path / "papers"))
+    dataset = BinaryDataset(str(tmp_path / "papers"))
+    records = list(dataset)
+
+    assert len(dataset) == 3
+    assert records[2]["title"] == "Paper 2"
+    assert records[2]["categories"] == "cs.LG,cs.AI"
+    assert np.frombuffer(records[2]["openai"], dtype=np.float32).tolist() == [2.0] * 4
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+from arxivsearch import config
+from arxivsearch.db import embed
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "raw.jsonl"
+    papers = [
+        {"id": str(i), "title": f"Paper {i}", "abstract": "deep learning"}
+        for i in range(5)
+    ]
+    papers[1]["huggingface"] = [0.5] * 768
+    path.write_text("".join(json.dumps(paper) + "\n" for paper in papers))
+    return str(path)
+
+
+def test_completed_rows_truncates_partial_line(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text('{"id": "0"}\n{"id": "1"}\n{"id"')
+
+    assert embed.completed_rows(str(path)) == 2
+    assert path.read_text() == '{"id": "0"}\n{"id": "1"}\n'
+
+
+@pytest.mark.asyncio
+async def test_embed_dataset_fills_missing_vectors_and_resumes(
+    source, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(config, "EMBEDDING_STUB", True)
+    destination = tmp_path / "out.jsonl"
+    destination.write_text(json.dumps({"id": "0"}) + "\n")
+
+    stats = await embed.embed_dataset(
+        source, str(destination), ["huggingface", "cohere"], window_size=2
+    )
+
+    papers = [json.loads(line) for line in destination.read_text().splitlines()]
+    assert [paper["id"] for paper in papers] == ["0", "1", "2", "3", "4"]
+    # the first paper was already written and the second had a vector
+    assert papers[1]["huggingface"] == [0.5] * 768
+    assert len(papers[2]["cohere"]) == 1024
+    assert stats["huggingface"]["papers"] == 3
+    assert stats["cohere"]["papers"] == 4
@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from arxivsearch.db import facets, utils
+from arxivsearch.db.facets import count_from_table, tabulate
+
+COMBINATIONS = [
+    {"year": "2020", "categories": ["cs.lg", "cs.ai"], "count": 3},
+    {"year": "2020", "categories": ["cs.lg"], "count": 2},
+    {"year": "2021", "categories": ["math.co"], "count": 1},
+]
+
+
+def test_tabulate_counts_each_paper_once_per_facet():
+    table = tabulate(COMBINATIONS)
+
+    assert table["|"] == 6
+    assert table["2020|"] == 5
+    assert table["|cs.lg"] == 5
+    assert table["2020|cs.ai"] == 3
+
+
+def test_count_from_table():
+    table = tabulate(COMBINATIONS)
+
+    assert count_from_table(table, (), ()) == 6
+    assert count_from_table(table, ("2020", "2021"), ()) == 6
+    assert count_from_table(table, ("2021",), ("cs.lg",)) == 0
+    assert count_from_table(table, (), ("cs.ai",)) == 3
+    assert count_from_table(table, (), ("cs.ai", "cs.lg")) is None
+
+
+class FakeClient:
+    def __init__(self):
+        self.values = {}
+        self.reads = 0
+
+    async def get(self, key):
+        self.reads += 1
+        return self.values.get(key)
+
+
+def fake_index(name):
+    return SimpleNamespace(schema=SimpleNamespace(index=SimpleNamespace(name=name)))
+
+
+@pytest.mark.asyncio
+async def test_facet_table_misses_are_not_cached(monkeypatch):
+    client = FakeClient()
+
+    async def get_index_version(index):
+        return 1
+
+    monkeypatch.setattr(utils, "get_index_version", get_index_version)
+    monkeypatch.setattr(utils, "get_async_client", lambda: client)
+    monkeypatch.setattr(facets, "_facet_tables", {})
+    papers, other = fake_index("papers"), fake_index("other")
+
+    assert await facets.get_facet_table(papers) is None
+    # built by another worker
+    client.values[facets.facets_key(papers)] = json.dumps(
+        {"version": 1, "table": {"|": 6}}
+    )
+    assert await facets.get_facet_table(papers) == {"|": 6}
+    assert await facets.get_facet_table(papers) == {"|": 6}
+    assert client.reads == 2
+    # each index has its own table
+    assert await facets.get_facet_table(other) is None
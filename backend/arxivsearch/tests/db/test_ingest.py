@@ -0,0 +1,199 @@
+import json
+import os
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+from redisvl.index import AsyncSearchIndex
+
+from arxivsearch.db import ingest, utils
+from arxivsearch.db.load import ingest_async, preprocess_paper
+
+
+def test_content_hash_covers_every_field():
+    paper = {"paper_id": "1", "title": "A", "huggingface": b"\x00\x01"}
+
+    assert ingest.content_hash(paper) == ingest.content_hash(
+        dict(reversed(paper.items()))
+    )
+    assert ingest.content_hash(paper) != ingest.content_hash({**paper, "title": "B"})
+    assert ingest.content_hash(paper) != ingest.content_hash(
+        {**paper, "huggingface": b"\x00\x02"}
+    )
+    # field boundaries are part of the digest
+    assert ingest.content_hash({"a": "bc"}) != ingest.content_hash({"ab": "c"})
+
+
+def test_fingerprint_changes_with_the_file(tmp_path):
+    path = tmp_path / "papers.json"
+    path.write_text("[]")
+    before = ingest.fingerprint(str(path))
+    assert ingest.fingerprint(str(path)) == before
+
+    path.write_text("[ ]")
+    os.utime(path, ns=(0, 1))
+    assert ingest.fingerprint(str(path)) != before
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_advances_over_contiguous_chunks():
+    checkpoint = ingest.Checkpoint(index=None, source="papers.json", offset=100)
+    with patch.object(ingest.Checkpoint, "save", AsyncMock()) as save:
+        await checkpoint.done(1, 10)
+        assert checkpoint.offset == 100
+        save.assert_not_called()
+
+        await checkpoint.done(0, 10)
+        assert checkpoint.offset == 120
+        await checkpoint.done(2, 5)
+        assert checkpoint.offset == 125
+        assert save.await_count == 2
+
+
+def test_preprocess_tombstone():
+    assert preprocess_paper({"id": "1234.5678", "deleted": True}) == {
+        "paper_id": "1234.5678",
+        "deleted": True,
+    }
+
+
+DIMS = {"huggingface": 768, "openai": 1536, "cohere": 1024}
+
+
+def write_dataset(path, ids, title="Paper", deleted=()):
+    # vectors depend on the paper id only, so files share identical papers
+    papers = [
+        {
+            "id": id,
+            "title": f"{title} {id}",
+            "authors": "Jane Doe",
+            "year": "2024",
+            "categories": "cs.LG,cs.IR",
+            "abstract": "",
+            **{
+                provider: np.random.default_rng(int(id)).standard_normal(dims).tolist()
+                for provider, dims in DIMS.items()
+            },
+        }
+        for id in ids
+    ]
+    papers += [{"id": id, "deleted": True} for id in deleted]
+    path.write_text(json.dumps(papers))
+    return str(path)
+
+
+@asynccontextmanager
+async def ingest_index():
+    """An empty index of its own, so ingests do not touch the test data."""
+    schema = utils.get_schema()
+    schema.index.name = f"{schema.index.name}-ingest-test"
+    schema.index.prefix = f"{schema.index.prefix}-ingest-test"
+    index = AsyncSearchIndex(schema, redis_client=utils.get_async_client())
+    await index.create(overwrite=True, drop=True)
+    await ingest.reset(index)
+    try:
+        yield index
+    finally:
+        await index.delete(drop=True)
+        await ingest.reset(index)
+        await utils.get_async_client().delete(utils.version_key(index))
+        # the version cached for the test data index was overwritten
+        utils._index_versions.clear()
+
+
+async def stored_ids(index, ids):
+    client = utils.get_async_client()
+    return [id for id in ids if await client.exists(index.key(id))]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_delta_does_not_undo_snapshot(tmp_path):
+    snapshot = write_dataset(tmp_path / "snapshot.json", ["1", "2", "3"])
+    delta = write_dataset(tmp_path / "delta.json", ["4"], deleted=["2"])
+    async with ingest_index() as index:
+        await ingest_async(index, snapshot, delete_missing=True)
+        await ingest_async(index, delta)
+
+        # the next start loads the default snapshot again
+        summary = await ingest_async(index, snapshot, delete_missing=True)
+        assert summary["skipped"]
+        assert await stored_ids(index, ["1", "2", "3", "4"]) == ["1", "3", "4"]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_upsert_chunk_writes_only_changes(tmp_path):
+    async with ingest_index() as index:
+        papers = [
+            preprocess_paper(paper)
+            for paper in json.loads(
+                open(write_dataset(tmp_path / "papers.json", ["1", "2"])).read()
+            )
+        ]
+        assert await ingest.upsert_chunk(index, papers) == 2
+        assert await ingest.upsert_chunk(index, papers) == 0
+
+        changed = {**papers[0], "title": "Changed"}
+        assert await ingest.upsert_chunk(index, [changed, papers[1]]) == 1
+        client = utils.get_async_client()
+        assert await client.hget(index.key("1"), "title") == b"Changed"
+
+        tombstone = {"paper_id": "2", "deleted": True}
+        assert await ingest.upsert_chunk(index, [tombstone]) == 1
+        assert await stored_ids(index, ["1", "2"]) == ["1"]
+        assert await client.hget(ingest.hashes_key(index), "2") is None
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_snapshot_deletes_missing_papers(tmp_path):
+    first = write_dataset(tmp_path / "first.json", ["1", "2", "3"])
+    second = write_dataset(tmp_path / "second.json", ["1", "3"])
+    async with ingest_index() as index:
+        await ingest_async(index, first, delete_missing=True)
+        summary = await ingest_async(index, second, delete_missing=True)
+
+        assert summary == {"skipped": False, "changed": 0, "deleted": 1}
+        assert await stored_ids(index, ["1", "2", "3"]) == ["1", "3"]
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_crashed_ingest_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr("arxivsearch.config.LOAD_CHUNK_SIZE", 2)
+    monkeypatch.setattr("arxivsearch.config.WRITE_CONCURRENCY", 1)
+    ids = ["1", "2", "3", "4", "5"]
+    path = write_dataset(tmp_path / "papers.json", ids)
+    upsert_chunk = ingest.upsert_chunk
+
+    async def crash_on_second_chunk(index, chunk, seen=None):
+        if chunk[0]["paper_id"] == "3":
+            raise ConnectionError("crash")
+        return await upsert_chunk(index, chunk, seen)
+
+    async with ingest_index() as index:
+        with patch.object(ingest, "upsert_chunk", crash_on_second_chunk):
+            with pytest.raises(ConnectionError):
+                await ingest_async(index, path, delete_missing=True)
+        state = await ingest.Checkpoint.read(index, ingest.fingerprint(path))
+        assert state == {"offset": 2, "status": "running"}
+
+        summary = await ingest_async(index, path, delete_missing=True)
+        # the papers written before the crash are neither rewritten nor
+        # deleted as missing
+        assert summary == {"skipped": False, "changed": 3, "deleted": 0}
+        assert await stored_ids(index, ids) == ids
+
+
+@pytest.mark.asyncio(scope="session")
+async def test_unchanged_ingest_keeps_the_version(tmp_path):
+    path = write_dataset(tmp_path / "papers.json", ["1", "2"])
+    copy = write_dataset(tmp_path / "copy.json", ["1", "2"])
+    async with ingest_index() as index:
+        await ingest_async(index, path, delete_missing=True)
+        client = utils.get_async_client()
+        version = await client.get(utils.version_key(index))
+
+        assert (await ingest_async(index, path, delete_missing=True))["skipped"]
+        # another file with the same papers changes nothing
+        summary = await ingest_async(index, copy, delete_missing=True)
+        assert summary == {"skipped": False, "changed": 0, "deleted": 0}
+        assert await client.get(utils.version_key(index)) == version
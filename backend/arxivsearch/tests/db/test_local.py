@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import pytest_asyncio
+from redisvl.query import CountQuery, FilterQuery, VectorQuery
+
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.utils import build_filter_expression, get_schema
+
+DIMS = {"huggingface": 768, "openai": 1536, "cohere": 1024}
+
+
+def paper(paper_id, year, categories, seed):
+    rng = np.random.default_rng(seed)
+    return {
+        "paper_id": paper_id,
+        "title": f"Paper {paper_id}",
+        "authors": "Jane Doe",
+        "year": year,
+        "categories": categories,
+        **{
+            provider: rng.standard_normal(dims).astype(np.float32).tobytes()
+            for provider, dims in DIMS.items()
+        },
+    }
+
+
+@pytest_asyncio.fixture
+async def index():
+    index = LocalSearchIndex(get_schema())
+    await index.create()
+    await index.load(
+        [
+            paper("a", "2020", "cs.LG|cs.AI", 0),
+            paper("b", "2020", "math.CO", 1),
+            paper("c", "2021", "cs.LG", 2),
+        ]
+    )
+    return index
+
+
+@pytest.mark.asyncio
+async def test_count_and_filter_queries(index):
+    assert await index.query(CountQuery(build_filter_expression([], []))) == 3
+    assert (
+        await index.query(CountQuery(build_filter_expression(["2020"], ["CS.lg"]))) == 1
+    )
+
+    query = FilterQuery(
+        return_fields=["paper_id"],
+        filter_expression=build_filter_expression([], ["cs.LG", "math.CO"]),
+    )
+    query.paging(1, 5)
+    assert await index.query(query) == [
+        {"id": "paper:b", "paper_id": "b"},
+        {"id": "paper:c", "paper_id": "c"},
+    ]
+
+
+@pytest.mark.asyncio
+async def test_vector_query_is_exact(index):
+    vector = index.vector("c", "openai")
+    query = VectorQuery(
+        vector=vector.tolist(),
+        vector_field_name="openai",
+        return_fields=["paper_id"],
+        num_results=2,
+    )
+    results = await index.query(query)
+
+    assert [result["paper_id"] for result in results] == ["c", results[1]["paper_id"]]
+    assert results[0]["vector_distance"] == pytest.approx(0, abs=1e-6)
+    assert results[0]["vector_distance"] <= results[1]["vector_distance"]
+
+    query.set_filter(build_filter_expression(["2020"], []))
+    results = await index.query(query)
+    assert {result["paper_id"] for result in results} == {"a", "b"}
+
+
+@pytest.mark.asyncio
+async def test_load_replaces_existing_papers(index):
+    await index.load([paper("b", "2021", "math.CO", 1)])
+
+    assert len(index) == 3
+    assert await index.query(CountQuery(build_filter_expression(["2021"], []))) == 2
+    combinations = index.combinations(build_filter_expression(["2021"], []))
+    assert sorted(combinations, key=lambda row: row["categories"]) == [
+        {"year": "2021", "categories": ["cs.LG"], "count": 1},
+        {"year": "2021", "categories": ["math.CO"], "count": 1},
+    ]
@@ -0,0 +1,181 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from redis.exceptions import ResponseError
+from redisvl.index import AsyncSearchIndex
+
+from arxivsearch import config
+from arxivsearch.db import pagination, utils
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.utils import build_filter_expression, get_schema
+
+VECTORS = {
+    name: np.zeros(field.attrs.dims, dtype=np.float32)
+    for name, field in get_schema().fields.items()
+    if field.type == "vector"
+}
+
+
+def record(paper_id, year, key=None):
+    return {
+        "paper_id": paper_id,
+        "paper_key": pagination.paper_key(paper_id) if key is None else key,
+        "year": year,
+        **VECTORS,
+    }
+
+
+@pytest_asyncio.fixture
+async def index():
+    index = LocalSearchIndex(get_schema())
+    await index.create()
+    await index.load([record(str(i), "2020" if i % 2 else "2021") for i in range(7)])
+    return index
+
+
+async def read_all(index, filter_expression, count, return_fields):
+    cursor, pages = pagination.START, []
+    while cursor:
+        papers, cursor = await pagination.read_page(
+            index, filter_expression, count, cursor, return_fields
+        )
+        pages.append([paper["paper_id"] for paper in papers])
+    return pages
+
+
+def test_cursor_round_trip():
+    state = {"index": "arxiv", "after": 12345, "seen": ["1"]}
+    token = pagination.encode_cursor(state)
+    assert "=" not in token
+    assert pagination.decode_cursor(token) == state
+
+
+@pytest.mark.parametrize("token", ["not a cursor", "WzFd", ""])
+def test_malformed_cursor(token):
+    with pytest.raises(pagination.InvalidCursor):
+        pagination.decode_cursor(token)
+
+
+@pytest.mark.asyncio
+async def test_read_pages_until_exhausted(index):
+    filter_expression = build_filter_expression(["2020"], [])
+    pages = await read_all(index, filter_expression, 2, ["paper_id"])
+
+    # pages follow the paper_key order
+    expected = sorted(["1", "3", "5"], key=pagination.paper_key)
+    assert pages == [expected[:2], expected[2:]]
+
+
+@pytest.mark.asyncio
+async def test_papers_sharing_a_key_are_paged_once(index):
+    await index.load([record(f"tie{i}", "2022", key=5) for i in range(5)])
+    filter_expression = build_filter_expression(["2022"], [])
+
+    pages = await read_all(index, filter_expression, 2, ["paper_id"])
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sorted(id for page in pages for id in page) == [f"tie{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_cursor_only_continues_its_query(index):
+    filter_expression = build_filter_expression(["2020"], [])
+    _, cursor = await pagination.read_page(index, filter_expression, 1)
+
+    # another filter, or compact fields instead of every field
+    with pytest.raises(pagination.InvalidCursor):
+        await pagination.read_page(index, "*", 1, cursor)
+    with pytest.raises(pagination.InvalidCursor):
+        await pagination.read_page(index, filter_expression, 1, cursor, ["paper_id"])
+
+    token = pagination.encode_cursor(
+        {**pagination.decode_cursor(cursor), "index": "other"}
+    )
+    with pytest.raises(pagination.InvalidCursor):
+        await pagination.read_page(index, filter_expression, 1, token)
+    token = pagination.encode_cursor(
+        {**pagination.decode_cursor(cursor), "after": "@year:{*}"}
+    )
+    with pytest.raises(pagination.InvalidCursor):
+        await pagination.read_page(index, filter_expression, 1, token)
+
+
+@pytest.mark.asyncio
+async def test_scan_papers(index):
+    pages = [
+        [paper["paper_id"] for paper in papers]
+        async for papers in pagination.scan_papers(index, "*", 3, ["paper_id"])
+    ]
+    assert pages == [["0", "1", "2"], ["3", "4", "5"], ["6"]]
+
+
+class FakeNode:
+    """Records the search commands sent to a Redis node."""
+
+    def __init__(self, pages=2, fail=False):
+        self.pages = pages
+        self.fail = fail
+        self.calls = []
+
+    def ft(self, name):
+        return self
+
+    async def aggregate(self, request):
+        if self.fail:
+            raise ResponseError("Too many cursors allocated for index")
+        self.calls.append(type(request).__name__)
+        cursor = SimpleNamespace(cid=7 if len(self.calls) < self.pages else 0)
+        return SimpleNamespace(rows=[[b"paper_id", b"1"]], cursor=cursor)
+
+    async def execute_command(self, *args):
+        self.calls.append(args[0])
+
+
+@pytest.fixture
+def replicated(monkeypatch):
+    def nodes(primary):
+        monkeypatch.setattr(config, "REDIS_REPLICA_URLS", ["redis://r1", "redis://r2"])
+        monkeypatch.setattr(utils, "_global_client", primary)
+        monkeypatch.setattr(utils, "_read_clients", [FakeNode(), FakeNode()])
+        monkeypatch.setattr(utils, "_read_indexes", None)
+        monkeypatch.setattr(
+            utils, "_global_index", AsyncSearchIndex(get_schema(), redis_client=primary)
+        )
+        return utils._read_clients
+
+    return nodes
+
+
+@pytest.mark.asyncio
+async def test_export_cursor_stays_on_primary_with_replicas(replicated):
+    primary = FakeNode()
+    replicas = replicated(primary)
+
+    pages = pagination.scan_papers(await utils.get_read_index(), "*", 1)
+    assert [page async for page in pages] == [[{"paper_id": "1"}]] * 2
+
+    assert primary.calls == ["AggregateRequest", "Cursor"]
+    assert not any(replica.calls for replica in replicas)
+
+
+@pytest.mark.asyncio
+async def test_abandoned_export_releases_its_cursor(replicated):
+    primary = FakeNode(pages=3)
+    replicated(primary)
+
+    pages = pagination.scan_papers(await utils.get_async_index(), "*", 1)
+    await anext(pages)
+    await pages.aclose()
+
+    assert primary.calls == ["AggregateRequest", "FT.CURSOR"]
+
+
+@pytest.mark.asyncio
+async def test_export_without_cursor(replicated):
+    replicated(FakeNode(fail=True))
+
+    pages = pagination.scan_papers(await utils.get_async_index(), "*", 1)
+    with pytest.raises(pagination.CursorUnavailable):
+        await anext(pages)
@@ -0,0 +1,218 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+import pytest_asyncio
+from redis import asyncio as aredis
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import CountQuery, FilterQuery, VectorQuery
+
+from arxivsearch.db import pagination, sharding
+from arxivsearch.db.load import write_chunk
+from arxivsearch.db.local import LocalSearchIndex
+from arxivsearch.db.sharding import ShardedSearchIndex
+from arxivsearch.db.utils import (
+    build_filter_expression,
+    get_schema,
+    indexing_complete,
+    run_queries,
+)
+
+DIMS = {"huggingface": 768, "openai": 1536, "cohere": 1024}
+
+
+def make_papers(count):
+    rng = np.random.default_rng(0)
+    return [
+        {
+            "paper_id": f"{i:04d}.0001",
+            "paper_key": pagination.paper_key(f"{i:04d}.0001"),
+            "title": f"Paper {i}",
+            "year": "2020" if i % 3 else "2021",
+            "categories": "cs.LG" if i % 2 else "math.CO",
+            **{
+                provider: rng.standard_normal(dims).astype(np.float32).tobytes()
+                for provider, dims in DIMS.items()
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def knn(vector, num_results=5, years=()):
+    return VectorQuery(
+        vector=vector,
+        vector_field_name="openai",
+        num_results=num_results,
+        return_fields=["paper_id"],
+        filter_expression=build_filter_expression(list(years), []),
+    )
+
+
+class FailingShard:
+    def __init__(self, shard, delay=None):
+        self.shard = shard
+        self.schema = shard.schema
+        self.delay = delay
+
+    async def query(self, query):
+        if self.delay is None:
+            raise ConnectionError("shard down")
+        await asyncio.sleep(self.delay)
+        return await self.shard.query(query)
+
+
+@pytest_asyncio.fixture
+async def indexes():
+    papers = make_papers(40)
+    whole = LocalSearchIndex(get_schema())
+    await whole.load(papers)
+    sharded = ShardedSearchIndex([LocalSearchIndex(get_schema()) for _ in range(3)])
+    for shard, group in sharded.partition(papers):
+        await shard.load(group)
+    return whole, sharded
+
+
+def test_partition_is_stable():
+    index = ShardedSearchIndex([LocalSearchIndex(get_schema()) for _ in range(4)])
+    papers = make_papers(100)
+    groups = index.partition(papers)
+
+    assert sum(len(group) for _, group in groups) == 100
+    assert len(groups) == 4
+    for shard, group in groups:
+        assert all(index.shard_for(paper["paper_id"]) is shard for paper in group)
+
+
+@pytest.mark.asyncio
+async def test_knn_merges_global_top_k(indexes):
+    whole, sharded = indexes
+    vector = np.random.default_rng(1).standard_normal(1536).astype(np.float32)
+    for years in [(), ("2021",)]:
+        expected = await whole.query(knn(vector, 7, years))
+        merged = await sharded.query(knn(vector, 7, years))
+        assert [doc["paper_id"] for doc in merged] == [
+            doc["paper_id"] for doc in expected
+        ]
+
+
+@pytest.mark.asyncio
+async def test_counts_are_summed(indexes):
+    whole, sharded = indexes
+    for years in [[], ["2020"]]:
+        query = CountQuery(build_filter_expression(years, ["cs.LG"]))
+        assert await sharded.query(query) == await whole.query(query)
+
+
+@pytest.mark.asyncio
+async def test_filter_pages_cover_every_paper(indexes):
+    _, sharded = indexes
+    ids = []
+    for offset in range(0, 40, 15):
+        query = FilterQuery(return_fields=["paper_id"], filter_expression="*")
+        query.paging(offset, 15)
+        ids += [doc["paper_id"] for doc in await sharded.query(query)]
+        # the shared query is restored after widening it for the shards
+        assert (query._offset, query._num) == (offset, 15)
+
+    assert sorted(ids) == sorted(paper["paper_id"] for paper in make_papers(40))
+
+
+@pytest.mark.asyncio
+async def test_run_queries_merges_each_query(indexes):
+    whole, sharded = indexes
+    vector = np.random.default_rng(2).standard_normal(1536).astype(np.float32)
+    queries = [knn(vector), CountQuery(build_filter_expression(["2020"], []))]
+
+    assert await run_queries(sharded, queries) == await run_queries(whole, queries)
+
+
+@pytest.mark.asyncio
+async def test_partial_results_report_failed_shards(indexes):
+    _, sharded = indexes
+    sharded.shards[1] = FailingShard(sharded.shards[1])
+    sharded.shards[2] = FailingShard(sharded.shards[2], delay=1)
+    sharded.timeout = 0.05
+    expected = await sharded.shards[0].query(CountQuery("*"))
+
+    await sharding.track_failed_shards()
+    assert await sharded.query(CountQuery("*")) == expected
+    assert sharding.failed_shards() == ["shard1", "shard2"]
+
+    sharded.partial_results = False
+    with pytest.raises(ConnectionError):
+        await sharded.query(CountQuery("*"))
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_match_the_whole_index(indexes):
+    whole, sharded = indexes
+    filter_expression = build_filter_expression(["2020"], [])
+    pages = {}
+    for name, index in {"whole": whole, "sharded": sharded}.items():
+        cursor, pages[name] = pagination.START, []
+        while cursor:
+            papers, cursor = await pagination.read_page(
+                index, filter_expression, 7, cursor, ["paper_id"]
+            )
+            pages[name].append([paper["paper_id"] for paper in papers])
+
+    assert pages["sharded"] == pages["whole"]
+    assert sum(map(len, pages["whole"])) == 26
+
+
+@pytest.mark.asyncio
+async def test_cursor_scans_every_shard(indexes):
+    _, sharded = indexes
+    pages = [
+        [paper["paper_id"] for paper in papers]
+        async for papers in pagination.scan_papers(
+            sharded, build_filter_expression([], ["cs.LG"]), 6, ["paper_id"]
+        )
+    ]
+
+    assert all(len(page) <= 6 for page in pages)
+    ids = [id for page in pages for id in page]
+    assert sorted(ids) == sorted(
+        paper["paper_id"] for paper in make_papers(40) if paper["categories"] == "cs.LG"
+    )
+
+
+@pytest.mark.skipif(
+    not os.environ.get("TEST_REDIS_SHARD_URLS"),
+    reason="set TEST_REDIS_SHARD_URLS to several Redis URLs",
+)
+@pytest.mark.asyncio
+async def test_redis_shards_match_exact_search():
+    clients = [
+        aredis.Redis.from_url(url)
+        for url in os.environ["TEST_REDIS_SHARD_URLS"].split(",")
+    ]
+    shards = []
+    for client in clients:
+        schema = get_schema()
+        schema.index.name = f"{schema.index.name}-shard-test"
+        schema.index.prefix = f"{schema.index.prefix}-shard-test"
+        shards.append(AsyncSearchIndex(schema, redis_client=client))
+    sharded = ShardedSearchIndex(shards, timeout=5)
+    await sharded.create(overwrite=True, drop=True)
+    try:
+        papers = make_papers(60)
+        await write_chunk(sharded, papers)
+        while not await indexing_complete(sharded):
+            await asyncio.sleep(0.1)
+        whole = LocalSearchIndex(get_schema())
+        await whole.load(papers)
+
+        for shard, group in sharded.partition(papers):
+            assert await shard.query(CountQuery("*")) == len(group)
+        vector = np.random.default_rng(3).standard_normal(1536).astype(np.float32)
+        query = knn(vector.tobytes(), 10, ["2020"])
+        assert [doc["paper_id"] for doc in await sharded.query(query)] == [
+            doc["paper_id"] for doc in await whole.query(query)
+        ]
+    finally:
+        await sharded.delete(drop=True)
+        for client in clients:
+            await client.aclose()
@@ -0,0 +1,240 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError
+from redisvl.index import AsyncSearchIndex
+from redisvl.query import CountQuery, FilterQuery, VectorQuery
+
+from arxivsearch import config
+from arxivsearch.db import utils
+from arxivsearch.db.utils import (
+    HNSWVectorQuery,
+    build_filter_expression,
+    build_vector_query,
+)
+from arxivsearch.schema.models import FusedTextSimilarityRequest
+from arxivsearch.utils.vectors import int8_field
+
+
+def test_hnsw_vector_query_ef_runtime():
+    query = HNSWVectorQuery(
+        vector=b"\x00" * 8,
+        vector_field_name="openai",
+        filter_expression=build_filter_expression(["2020"], []),
+        ef_runtime=50,
+    )
+
+    assert str(query).startswith(
+        "@year:{2020}=>[KNN 10 @openai $vector EF_RUNTIME $ef_runtime AS vector_distance]"
+    )
+    assert query.params["ef_runtime"] == 50
+
+
+def test_fused_vector_query_needs_a_provider():
+    request = FusedTextSimilarityRequest(categories=[], years=[], user_text="x")
+    vector = [0.1, 0.2]
+
+    query = build_vector_query(vector, request, "openai")
+    assert query._vector_field_name in ("openai", int8_field("openai"))
+    with pytest.raises(ValueError):
+        build_vector_query(vector, request)
+
+
+def test_hnsw_vector_query_default_ef_runtime():
+    query = HNSWVectorQuery(vector=b"\x00" * 8, vector_field_name="openai")
+
+    assert "EF_RUNTIME" not in str(query)
+    assert "ef_runtime" not in query.params
+
+
+def test_connection_pool_settings(monkeypatch):
+    monkeypatch.setattr(config, "REDIS_MAX_CONNECTIONS", 7)
+    monkeypatch.setattr(config, "REDIS_RETRIES", 2)
+    pool = utils.connection_pool("redis://localhost:6379")
+
+    assert pool.max_connections == 7
+    assert pool.timeout == config.REDIS_POOL_TIMEOUT
+    assert pool.connection_kwargs["socket_timeout"] == config.REDIS_SOCKET_TIMEOUT
+    assert pool.connection_kwargs["retry"]._retries == 2
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_wait_timeouts():
+    pool = utils.MeteredConnectionPool(max_connections=1, timeout=0.01)
+    # take the only connection without connecting it
+    held = pool.get_available_connection()
+    pool.in_use += 1
+    with pytest.raises(ConnectionError):
+        await pool.get_connection()
+
+    stats = pool.stats()
+    assert stats["in_use"] == 1 and stats["available"] == 0
+    assert stats["waiting"] == 0
+    assert stats["wait_timeouts"] == 1
+
+    await pool.release(held)
+    assert pool.stats()["in_use"] == 0 and pool.stats()["available"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_does_not_count_connect_failures_as_timeouts():
+    # nothing listens on port 1
+    pool = utils.MeteredConnectionPool.from_url(
+        "redis://127.0.0.1:1", max_connections=1, timeout=1
+    )
+    # take the only connection without connecting it
+    held = pool.get_available_connection()
+    pool.in_use += 1
+    waiter = asyncio.create_task(pool.get_connection())
+    await asyncio.sleep(0.01)
+    assert pool.stats()["waiting"] == 1
+
+    await pool.release(held)
+    with pytest.raises(ConnectionError):
+        await waiter
+
+    assert pool.stats()["wait_timeouts"] == 0
+    assert pool.stats()["in_use"] == 0
+
+
+def test_reads_rotate_over_replicas(monkeypatch):
+    monkeypatch.setattr(
+        config, "REDIS_REPLICA_URLS", ["redis://replica1:6379", "redis://replica2:6379"]
+    )
+    monkeypatch.setattr(utils, "_read_clients", None)
+    clients = {id(utils.get_read_client()) for _ in range(4)}
+
+    assert len(clients) == 2
+    assert id(utils.get_async_client()) not in clients
+    assert set(utils.pool_stats()) == {"primary", "replica0", "replica1"}
+
+
+def test_reads_use_primary_without_replicas(monkeypatch):
+    monkeypatch.setattr(config, "REDIS_REPLICA_URLS", [])
+    monkeypatch.setattr(utils, "_read_clients", None)
+
+    assert utils.get_read_client() is utils.get_async_client()
+    assert set(utils.pool_stats()) == {"primary"}
+
+
+@pytest.mark.asyncio
+async def test_close_clients_disconnects_pools(monkeypatch):
+    monkeypatch.setattr(config, "SEARCH_ENGINE", "redis")
+    monkeypatch.setattr(config, "REDIS_SHARD_URLS", [])
+    monkeypatch.setattr(
+        config, "REDIS_REPLICA_URLS", ["redis://replica1:6379", "redis://replica2:6379"]
+    )
+    monkeypatch.setattr(utils, "_global_client", None)
+    monkeypatch.setattr(utils, "_read_clients", None)
+    monkeypatch.setattr(utils, "_global_index", None)
+    index = await utils.get_async_index()
+    pools = [client.connection_pool for client in utils.get_read_clients()]
+    pools.append(utils.get_async_client().connection_pool)
+    disconnected = []
+
+    async def disconnect(*args, **kwargs):
+        disconnected.append(args)
+
+    for pool in pools:
+        monkeypatch.setattr(pool, "disconnect", disconnect)
+
+    await utils.close_clients()
+
+    assert len(disconnected) == 3
+    assert utils._global_client is None
+    assert await utils.get_async_index() is not index
+
+
+class VersionNode:
+    """Redis node holding an index version stamp."""
+
+    def __init__(self, version):
+        self.version = version
+
+    async def get(self, key):
+        return str(self.version).encode()
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_use_the_replica_version(monkeypatch):
+    primary, replicas = VersionNode(5), [VersionNode(4), VersionNode(5)]
+    monkeypatch.setattr(config, "REDIS_REPLICA_URLS", ["redis://r1", "redis://r2"])
+    monkeypatch.setattr(utils, "_global_client", primary)
+    monkeypatch.setattr(utils, "_read_clients", replicas)
+    monkeypatch.setattr(utils, "_read_indexes", None)
+    monkeypatch.setattr(utils, "_index_versions", {})
+    index = AsyncSearchIndex(utils.get_schema(), redis_client=primary)
+    monkeypatch.setattr(utils, "_global_index", index)
+
+    read_indexes = [await utils.get_read_index() for _ in replicas]
+    versions = {
+        read_index.client.version: await utils.get_index_version(read_index)
+        for read_index in read_indexes
+    }
+
+    # results of the lagging replica are cached under its own version
+    assert versions == {4: 4, 5: 5}
+    assert await utils.get_index_version(index) == 5
+    assert utils.node_client(read_indexes[0]) is read_indexes[0].client
+
+
+class SearchNode:
+    """Redis node answering FT.SEARCH pipelines with raw replies."""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.searched = []
+
+    def ft(self, name):
+        return self
+
+    def pipeline(self, transaction=True):
+        return self
+
+    async def search(self, query, query_params=None):
+        self.searched.append(query)
+        return self
+
+    async def execute(self):
+        return self.responses
+
+
+def test_redisvl_query_internals():
+    # run_queries and ShardedSearchIndex read these query internals, pinned
+    # by the redisvl version in pyproject.toml
+    queries = [
+        VectorQuery([0.1, 0.2], "openai", return_fields=["paper_id"]),
+        FilterQuery(build_filter_expression(["2020"], []), return_fields=["title"]),
+        CountQuery(build_filter_expression([], ["cs.LG"])),
+    ]
+    for query in queries:
+        query.paging(3, 7)
+        assert (query._offset, query._num) == (3, 7)
+        assert isinstance(query._no_content, bool)
+        assert isinstance(query._with_payloads, bool)
+        assert isinstance(query._with_scores, bool)
+        # run_queries decodes every returned field as UTF-8
+        assert set(query._return_fields_decode_as.values()) <= {"utf8"}
+
+
+@pytest.mark.asyncio
+async def test_run_queries_processes_raw_replies():
+    queries = [
+        VectorQuery(
+            [0.1, 0.2], "openai", return_fields=["paper_id", "vector_distance"]
+        ),
+        CountQuery(build_filter_expression([], ["cs.LG"])),
+    ]
+    node = SearchNode(
+        [
+            [1, b"arxiv:1", [b"paper_id", b"1", b"vector_distance", b"0.25"]],
+            [3],
+        ]
+    )
+    index = AsyncSearchIndex(utils.get_schema(), redis_client=node)
+
+    papers, count = await utils.run_queries(index, queries)
+
+    assert node.searched == queries
+    assert papers == [{"id": "arxiv:1", "paper_id": "1", "vector_distance": "0.25"}]
+    assert count == 3
@@ -0,0 +1,126 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from arxivsearch import spa
+from arxivsearch.spa import (
+    IMMUTABLE,
+    REVALIDATE,
+    CachedStaticFiles,
+    SinglePageApplication,
+    accepted_encodings,
+)
+
+INDEX = b"<html>" + b"<div>app</div>" * 100 + b"</html>"
+SCRIPT = b"console.log('search');" * 100
+
+
+@pytest.fixture
+def build(tmp_path):
+    (tmp_path / "static" / "js").mkdir(parents=True)
+    (tmp_path / "index.html").write_bytes(INDEX)
+    (tmp_path / "static" / "js" / "main.3f2a9c1e.js").write_bytes(SCRIPT)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + bytes(1000))
+    (tmp_path / "large.json").write_bytes(b"[" + b"1," * 3000 + b"1]")
+    return tmp_path
+
+
+@pytest.fixture
+def client(build, monkeypatch):
+    monkeypatch.setattr("arxivsearch.config.STATIC_MAX_FILE_SIZE", 5000)
+    app = FastAPI()
+    app.mount("/data", CachedStaticFiles(directory=build), name="data")
+    app.mount("/", SinglePageApplication(directory=build), name="SPA")
+    return TestClient(app)
+
+
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip;q=0.5") == {"gzip"}
+    assert accepted_encodings("*, gzip;q=0") == {"br"}
+    assert accepted_encodings("") == set()
+
+
+def test_compressed_variants(client):
+    response = client.get(
+        "/static/js/main.3f2a9c1e.js", headers={"accept-encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.content == SCRIPT
+
+    response = client.get(
+        "/static/js/main.3f2a9c1e.js", headers={"accept-encoding": "identity"}
+    )
+    assert "content-encoding" not in response.headers
+    assert response.content == SCRIPT
+
+    # images are not compressed
+    response = client.get("/logo.png")
+    assert "content-encoding" not in response.headers
+    assert response.headers["cache-control"] == REVALIDATE
+
+
+@pytest.mark.skipif(spa.brotli is None, reason="brotli not installed")
+def test_brotli_variants(client):
+    response = client.get(
+        "/static/js/main.3f2a9c1e.js", headers={"accept-encoding": "gzip, br"}
+    )
+    assert response.headers["content-encoding"] == "br"
+    assert response.content == SCRIPT
+
+    response = client.get("/index.html", headers={"accept-encoding": "br;q=0, *"})
+    assert response.headers["content-encoding"] == "gzip"
+
+
+def test_prebuilt_variants_are_used(build, client):
+    (build / "static" / "js" / "main.3f2a9c1e.js.gz").write_bytes(
+        gzip.compress(b"prebuilt")
+    )
+    app = FastAPI()
+    app.mount("/", SinglePageApplication(directory=build), name="SPA")
+    response = TestClient(app).get(
+        "/static/js/main.3f2a9c1e.js", headers={"accept-encoding": "gzip"}
+    )
+    assert response.content == b"prebuilt"
+    # variants are not served as files of their own
+    assert TestClient(app).get("/static/js/main.3f2a9c1e.js.gz").content == INDEX
+
+
+def test_etags_and_not_modified(client):
+    response = client.get("/index.html")
+    etag = response.headers["etag"]
+    identity = client.get("/index.html", headers={"accept-encoding": "identity"})
+    assert identity.headers["etag"] != etag
+
+    response = client.get("/index.html", headers={"if-none-match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = client.get("/index.html", headers={"if-none-match": f"W/{etag}"})
+    assert response.status_code == 304
+    response = client.get("/index.html", headers={"if-none-match": '"stale"'})
+    assert response.status_code == 200
+
+
+def test_spa_routes_fall_back_to_index(client, build):
+    (build / "index.html").unlink()
+    for path in ["/", "/search/graphs", "/static/js/missing.js"]:
+        response = client.get(path)
+        assert response.status_code == 200
+        assert response.content == INDEX
+        assert response.headers["cache-control"] == REVALIDATE
+
+
+def test_data_mount(client, build):
+    assert client.get("/data/logo.png").status_code == 200
+    assert client.get("/data/missing.png").status_code == 404
+
+    # files above STATIC_MAX_FILE_SIZE are served from disk
+    (build / "later.png").write_bytes(b"later")
+    assert client.get("/data/large.json").json()[0] == 1
+    assert client.get("/data/later.png").content == b"later"
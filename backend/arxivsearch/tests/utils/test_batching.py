@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from arxivsearch.utils.batching import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_batcher_groups_concurrent_requests():
+    calls = []
+
+    async def embed_many(texts):
+        calls.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    batcher = MicroBatcher("test", embed_many, max_batch_size=8, max_wait=0.01)
+    results = await asyncio.gather(*[batcher.submit(t) for t in ["a", "bb", "a"]])
+
+    assert results == [[1.0], [2.0], [1.0]]
+    assert calls == [["a", "bb"]]
+    assert batcher.stats()["batch_size"]["count"] == 1
+    assert batcher.stats()["wait_seconds"]["count"] == 3
+
+
+@pytest.mark.asyncio
+async def test_batcher_propagates_errors():
+    async def embed_many(texts):
+        raise RuntimeError("provider down")
+
+    batcher = MicroBatcher("test", embed_many, max_batch_size=1, max_wait=0.01)
+    with pytest.raises(RuntimeError):
+        await batcher.submit("a")
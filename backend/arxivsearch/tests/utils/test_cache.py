@@ -0,0 +1,53 @@
+import time
+
+import pytest
+
+from arxivsearch.utils.cache import EmbeddingCache, LRUCache, ResponseCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_cache_expires_entries():
+    cache = LRUCache(maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_embedding_cache_keys_on_model():
+    cache = EmbeddingCache(redis_client=None)
+    await cache.set("huggingface", "model-a", "deep learning", [0.1, 0.2])
+
+    assert await cache.get("huggingface", "model-a", "deep learning") == [0.1, 0.2]
+    assert await cache.get("huggingface", "model-b", "deep learning") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_response_cache_keys_on_index_version():
+    cache = ResponseCache(redis_client=None)
+    params = {"years": ["2020"], "provider": "openai", "compact": True}
+    key = cache.key(1, "by_text", params)
+    await cache.set(key, b"{}")
+
+    assert (
+        await cache.get(cache.key(1, "by_text", dict(reversed(params.items()))))
+        == b"{}"
+    )
+    assert await cache.get(cache.key(2, "by_text", params)) is None
+    assert await cache.get(cache.key(1, "by_paper", params)) is None
@@ -0,0 +1,51 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from arxivsearch import config
+from arxivsearch.utils.embeddings import (
+    Embeddings,
+    ProviderNotEnabled,
+    StubVectorizer,
+    preprocess_text,
+)
+
+
+def test_stub_vectorizer_is_deterministic():
+    vectorizer = StubVectorizer(dims=16)
+    first, second, other = vectorizer.embed_many(["deep learning"] * 2 + ["graphs"])
+
+    assert len(first) == 16
+    assert first == second
+    assert first != other
+    assert np.isclose(np.linalg.norm(first), 1.0)
+
+
+def test_preprocess_text():
+    assert preprocess_text("Deep-Learning,\nfor  NLP!") == "deep learning for n l p"
+
+
+def test_providers_are_created_lazily(monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_STUB", True)
+    embeddings = Embeddings(providers=["huggingface"])
+    try:
+        assert embeddings._vectorizers == {}
+        vector = asyncio.run(embeddings.get("huggingface", "graph neural networks"))
+        assert len(vector) == 768
+        assert list(embeddings._vectorizers) == ["huggingface"]
+    finally:
+        embeddings.shutdown()
+
+
+def test_disabled_provider_is_rejected(monkeypatch):
+    monkeypatch.setattr(config, "EMBEDDING_STUB", True)
+    embeddings = Embeddings(providers=["huggingface"])
+    try:
+        with pytest.raises(ProviderNotEnabled):
+            asyncio.run(embeddings.get("openai", "graph neural networks"))
+        with pytest.raises(ProviderNotEnabled):
+            asyncio.run(embeddings.warmup("cohere"))
+        assert "openai" not in embeddings._vectorizers
+    finally:
+        embeddings.shutdown()
@@ -0,0 +1,40 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from arxivsearch.utils.executor import EmbeddingExecutor, EmbeddingQueueFull
+
+
+@pytest.fixture
+def executor():
+    executor = EmbeddingExecutor(
+        ThreadPoolExecutor(max_workers=2), name="test", max_pending=1, timeout=0.05
+    )
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_executor_runs_off_loop(executor):
+    assert await executor.run(sum, [1, 2, 3]) == 6
+    assert executor.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_executor_rejects_when_full(executor):
+    slow = asyncio.ensure_future(executor.run(time.sleep, 0.02))
+    await asyncio.sleep(0)
+
+    with pytest.raises(EmbeddingQueueFull):
+        await executor.run(sum, [1])
+    await slow
+    assert executor.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_executor_times_out(executor):
+    with pytest.raises(asyncio.TimeoutError):
+        await executor.run(time.sleep, 0.2)
+    assert executor.stats()["timeouts"] == 1
@@ -0,0 +1,78 @@
+import pytest
+from pydantic import ValidationError
+
+from arxivsearch.schema.models import FusedRequest
+from arxivsearch.utils.fusion import RRF, WEIGHTED, fuse
+
+
+def knn(*papers):
+    return [
+        {"id": f"paper:{paper_id}", "paper_id": paper_id, "vector_distance": distance}
+        for paper_id, distance in papers
+    ]
+
+
+RESULTS = {
+    "huggingface": knn(("a", "0.1"), ("b", "0.2"), ("c", "0.3")),
+    "openai": knn(("b", "0.05"), ("a", "0.5")),
+    "cohere": knn(("c", "0.2"), ("b", "0.4")),
+}
+
+
+def test_rrf():
+    papers = fuse(RESULTS, RRF, k=60)
+
+    assert [paper["paper_id"] for paper in papers] == ["b", "a", "c"]
+    b = papers[0]
+    assert b["score"] == pytest.approx(1 / 62 + 1 / 61 + 1 / 62)
+    assert b["ranks"] == {"huggingface": 2, "openai": 1, "cohere": 2}
+    assert b["distances"] == {"huggingface": 0.2, "openai": 0.05, "cohere": 0.4}
+    assert "vector_distance" not in b and "id" not in b
+
+
+def test_rrf_weights_and_limit():
+    papers = fuse(RESULTS, RRF, weights={"cohere": 10}, limit=2)
+
+    # cohere moves c ahead of a
+    assert [paper["paper_id"] for paper in papers] == ["b", "c"]
+
+
+def test_weighted():
+    papers = fuse(RESULTS, WEIGHTED, weights={"openai": 2})
+
+    # weighted mean of the similarities, missing providers count as 0
+    scores = {paper["paper_id"]: paper["score"] for paper in papers}
+    assert scores["a"] == pytest.approx((0.9 + 2 * 0.5) / 4)
+    assert scores["b"] == pytest.approx((0.8 + 2 * 0.95 + 0.6) / 4)
+    assert scores["c"] == pytest.approx((0.7 + 0.8) / 4)
+    assert [paper["paper_id"] for paper in papers] == ["b", "a", "c"]
+
+
+def test_single_provider_keeps_knn_order():
+    papers = fuse({"openai": RESULTS["openai"]}, RRF)
+
+    assert [paper["paper_id"] for paper in papers] == ["b", "a"]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        fuse(RESULTS, "borda")
+
+
+def test_invalid_weights():
+    with pytest.raises(ValueError):
+        fuse(RESULTS, WEIGHTED, weights={"openai": -1})
+    with pytest.raises(ValueError):
+        fuse(RESULTS, RRF, weights=dict.fromkeys(RESULTS, 0))
+
+
+def test_request_weights_are_validated():
+    request = dict(categories=[], years=[], providers=["openai", "cohere"])
+
+    with pytest.raises(ValidationError):
+        FusedRequest(**request, weights={"openai": -0.5})
+    with pytest.raises(ValidationError):
+        FusedRequest(**request, weights={"openai": 0, "cohere": 0})
+    # zero weights are fine as long as one provider counts
+    assert FusedRequest(**request, weights={"openai": 0}).weights == {"openai": 0}
+    assert FusedRequest(**request, weights={"huggingface": 0})
@@ -0,0 +1,74 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from arxivsearch.utils.metrics import (
+    Histogram,
+    MetricsRegistry,
+    TimingMiddleware,
+    render_histogram,
+    set_label,
+    stage,
+    timed,
+)
+
+
+def test_histogram_snapshot_is_cumulative():
+    histogram = Histogram([1, 2])
+    for value in (0.5, 1, 1.5, 3):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"1": 2, "2": 3, "inf": 4}
+    assert snapshot["count"] == 4
+
+
+def test_render_histogram():
+    histogram = Histogram([1])
+    histogram.observe(0.5)
+    lines = render_histogram("latency", {"endpoint": '/a"b'}, histogram.snapshot())
+
+    assert lines[0] == 'latency_bucket{endpoint="/a\\"b",le="1"} 1'
+    assert lines[1] == 'latency_bucket{endpoint="/a\\"b",le="+Inf"} 1'
+    assert lines[-1] == 'latency_count{endpoint="/a\\"b"} 1'
+
+
+def test_stage_is_noop_outside_requests():
+    with stage("embed"):
+        pass
+    set_label("provider", "openai")
+
+
+@pytest.mark.asyncio
+async def test_timing_middleware():
+    app = FastAPI()
+
+    @app.get("/api/items/{item_id}")
+    async def item(item_id: str):
+        set_label("provider", "openai")
+        await timed("lookup", _noop())
+        with stage("serialize"):
+            return {"item_id": item_id}
+
+    registry = MetricsRegistry()
+    app.add_middleware(TimingMiddleware, path_prefix="/api", metrics=registry)
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://test"  # type: ignore
+    ) as client:
+        response = await client.get("/api/items/1")
+
+    server_timing = response.headers["server-timing"]
+    assert server_timing.startswith("lookup;dur=")
+    assert "serialize;dur=" in server_timing and "total;dur=" in server_timing
+
+    stages = registry.histograms["arxivsearch_stage_duration_seconds"]
+    assert (
+        ("endpoint", "/api/items/{item_id}"),
+        ("provider", "openai"),
+        ("stage", "lookup"),
+    ) in stages
+    assert "arxivsearch_request_duration_seconds_count" in "\n".join(registry.render())
+
+
+async def _noop():
+    return None
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import socket
+import stat
+import time
+from typing import List
+
+import numpy as np
+import pytest
+import pytest_asyncio
+
+from arxivsearch.utils.embeddings import StubVectorizer
+from arxivsearch.utils.executor import EmbeddingQueueFull
+from arxivsearch.utils.model_server import (
+    ModelClient,
+    ModelServer,
+    ModelServerError,
+    ModelServerUnavailable,
+)
+
+
+class RecordingVectorizer(StubVectorizer):
+    def __init__(self, dims: int):
+        super().__init__(dims)
+        self.calls: List[List[str]] = []
+
+    def embed_many(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        if "fail" in texts:
+            raise RuntimeError("model failure")
+        return super().embed_many(texts)
+
+
+@pytest_asyncio.fixture
+async def server(tmp_path):
+    server = ModelServer(
+        str(tmp_path / "model.sock"), RecordingVectorizer(8), max_wait=0.02
+    )
+    await server.start()
+    yield server
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_client_embeds_through_server(server):
+    client = ModelClient(server.path, timeout=5)
+    vectors = await client.embed_many(["graph neural networks", "transformers"])
+    client.close()
+
+    expected = StubVectorizer(8).embed_many(["graph neural networks", "transformers"])
+    assert np.allclose(vectors, expected)
+
+
+@pytest.mark.asyncio
+async def test_requests_from_workers_share_a_batch(server):
+    workers = [ModelClient(server.path, timeout=5) for _ in range(3)]
+    results = await asyncio.gather(
+        *[client.embed_many([f"text {i}"]) for i, client in enumerate(workers)]
+    )
+    for client in workers:
+        client.close()
+
+    assert [len(vectors) for vectors in results] == [1, 1, 1]
+    assert server.vectorizer.calls == [["text 0", "text 1", "text 2"]]
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_raised(server):
+    client = ModelClient(server.path, timeout=5)
+    with pytest.raises(ModelServerError, match="model failure"):
+        await client.embed_many(["fail"])
+    # the connection is still usable
+    assert len(await client.embed_many(["ok"])) == 1
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_socket_is_private(server):
+    assert stat.S_IMODE(os.stat(server.path).st_mode) == 0o600
+
+
+@pytest.mark.asyncio
+async def test_server_does_not_replace_a_live_server(server):
+    other = ModelServer(server.path, RecordingVectorizer(8))
+    with pytest.raises(RuntimeError, match="already listening"):
+        await other.start()
+    other.executor.shutdown()
+
+    # the running server still answers
+    client = ModelClient(server.path, timeout=5)
+    assert len(await client.embed_many(["ok"])) == 1
+    client.close()
+
+
+@pytest.mark.asyncio
+async def test_server_replaces_a_stale_socket(tmp_path):
+    path = str(tmp_path / "model.sock")
+    # left behind by a server that died, nothing listens on it
+    stale = socket.socket(socket.AF_UNIX)
+    stale.bind(path)
+    stale.close()
+
+    server = ModelServer(path, RecordingVectorizer(8))
+    await server.start()
+    client = ModelClient(path, timeout=5)
+    assert len(await client.embed_many(["ok"])) == 1
+    client.close()
+    # let the server see the connection close
+    await asyncio.sleep(0.01)
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_unavailable_server(tmp_path):
+    client = ModelClient(str(tmp_path / "missing.sock"), timeout=5)
+    with pytest.raises(ModelServerUnavailable):
+        await client.embed_many(["text"])
+    assert client.stats()["errors"] == 1
+
+
+class SlowVectorizer(StubVectorizer):
+    def embed_many(self, texts, **kwargs):
+        time.sleep(0.2)
+        return super().embed_many(texts)
+
+
+@pytest.mark.asyncio
+async def test_overloaded_server_rejects_requests(tmp_path):
+    server = ModelServer(
+        str(tmp_path / "model.sock"),
+        SlowVectorizer(8),
+        max_batch_size=1,
+        max_wait=0,
+        max_pending=1,
+    )
+    await server.start()
+    client = ModelClient(server.path, timeout=5)
+    try:
+        results = await asyncio.gather(
+            client.embed_many(["first"]),
+            client.embed_many(["second"]),
+            return_exceptions=True,
+        )
+        assert len(results[0]) == 1
+        assert isinstance(results[1], EmbeddingQueueFull)
+        # the server accepts requests again once the queue drains
+        assert len(await client.embed_many(["third"])) == 1
+    finally:
+        client.close()
+        # let the server see the connection close
+        await asyncio.sleep(0.2)
+        await server.close()
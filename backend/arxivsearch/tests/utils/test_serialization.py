@@ -0,0 +1,64 @@
+import json
+
+import pytest
+from starlette.requests import Request
+
+from arxivsearch.schema.models import VectorSearchPaper, VectorSearchResponse
+from arxivsearch.utils import serialization
+
+ROW = {
+    "id": "paper:1",
+    "paper_id": "1",
+    "authors": "Jane Doe",
+    "categories": "cs.LG",
+    "year": "2020",
+    "title": "Title",
+    "vector_distance": "0.25",
+}
+
+
+def request(accept: str = "") -> Request:
+    headers = [(b"accept", accept.encode())] if accept else []
+    return Request({"type": "http", "headers": headers})
+
+
+def test_similarity_score_is_set_by_validator():
+    paper = VectorSearchPaper.model_validate(ROW)
+    assert paper.similarity_score == 0.75
+
+
+def test_compact_response_drops_unused_fields():
+    content = serialization.compact_response(3, [{**ROW, "openai": "\x00"}])
+    assert content == {
+        "total": 3,
+        "papers": [
+            {
+                "paper_id": "1",
+                "authors": "Jane Doe",
+                "categories": "cs.LG",
+                "year": "2020",
+                "title": "Title",
+                "vector_distance": 0.25,
+                "similarity_score": 0.75,
+            }
+        ],
+    }
+
+
+def test_render_json():
+    model = serialization.search_content(VectorSearchResponse, 1, [ROW], False)
+    response = serialization.render(model, request())
+
+    assert response.media_type == "application/json"
+    body = json.loads(response.body)
+    assert body["papers"][0]["similarity_score"] == 0.75
+    assert body["papers"][0]["abstract"] == ""
+
+
+@pytest.mark.skipif(not serialization.HAS_MSGPACK, reason="msgpack not installed")
+def test_render_msgpack():
+    content = serialization.search_content(VectorSearchResponse, 1, [ROW], True)
+    response = serialization.render(content, request("application/msgpack"))
+
+    assert response.media_type == "application/msgpack"
+    assert serialization.msgpack.unpackb(response.body) == content
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from arxivsearch.utils.vectors import DATATYPES, decode_vector, encode_vector
+
+
+@pytest.mark.parametrize(
+    "datatype,size", [("float32", 4), ("float16", 2), ("bfloat16", 2), ("int8", 1)]
+)
+def test_vector_round_trip_keeps_direction(datatype, size):
+    vector = np.random.default_rng(0).standard_normal(256).astype(np.float32)
+    buffer = encode_vector(vector.tolist(), datatype)
+    decoded = decode_vector(buffer, datatype)
+
+    assert len(buffer) == 256 * size
+    cosine = vector @ decoded / np.linalg.norm(vector) / np.linalg.norm(decoded)
+    assert cosine > 0.999
+
+
+def test_encode_accepts_float32_buffers():
+    vector = np.arange(4, dtype=np.float32)
+    for datatype in DATATYPES:
+        assert encode_vector(memoryview(vector).cast("B"), datatype) == encode_vector(
+            vector, datatype
+        )
+
+
+def test_bfloat16_rounds_to_nearest():
+    decoded = decode_vector(encode_vector([1.00390625, -2.0], "bfloat16"), "bfloat16")
+    assert decoded.tolist() == [1.0, -2.0]
+
+
+def test_unknown_datatype():
+    with pytest.raises(ValueError):
+        encode_vector([1.0], "float64")
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, Tuple
+
+from arxivsearch import config
+from arxivsearch.utils.metrics import (
+    BATCH_SIZE_BUCKETS,
+    WAIT_SECONDS_BUCKETS,
+    Histogram,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-text embedding requests into batches.
+
+    Texts submitted while a batch is open are embedded together once the
+    batch reaches max_batch_size or max_wait seconds have passed since the
+    first text arrived. Every caller receives only its own vector.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        embed_many: Callable[[List[str]], Awaitable[List[Any]]],
+        max_batch_size: int = config.EMBEDDING_BATCH_SIZE,
+        max_wait: float = config.EMBEDDING_BATCH_WAIT_MS / 1000,
+    ):
+        self.name = name
+        self.embed_many = embed_many
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_time = Histogram(WAIT_SECONDS_BUCKETS)
+        self._pending: List[Tuple[str, asyncio.Future, float]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set = set()
+
+    async def submit(self, text: str) -> Any:
+        """Queue a text for the next batch and wait for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.monotonic()))
+
+        if len(self._pending) >= self.max_batch_size or self.max_wait <= 0:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[str, asyncio.Future, float]]):
+        now = time.monotonic()
+        for _, _, enqueued_at in batch:
+            self.wait_time.observe(now - enqueued_at)
+
+        # identical texts in the same window are embedded once
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        self.batch_size.observe(len(texts))
+        try:
+            vectors = dict(zip(texts, await self.embed_many(texts)))
+        except BaseException as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        for text, future, _ in batch:
+            if not future.done():
+                future.set_result(vectors[text])
+
+    def stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size.snapshot(),
+            "wait_seconds": self.wait_time.snapshot(),
+        }
@@ -0,0 +1,238 @@
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional
+
+import numpy as np
+from redis import asyncio as aredis
+from redis.exceptions import RedisError
+
+from arxivsearch import config
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """In-process least-recently-used cache with optional per-entry TTL.
+
+    Entries past their TTL are treated as misses and dropped on access.
+    Hit, miss and eviction counters are kept so callers can report
+    cache effectiveness.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss."""
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value = entry
+        if expires_at and expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        """Store value under key, evicting the least recently used entry
+        when the cache is full."""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0.0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class TieredCache:
+    """Two-tier cache: a per-process LRU in front of Redis.
+
+    Redis hits are promoted into the local tier. Subclasses convert values
+    to and from the bytes stored in Redis. Redis errors are logged and
+    counted, and treated as misses.
+    """
+
+    name = "cache"
+
+    def __init__(
+        self,
+        redis_client: Optional[aredis.Redis],
+        prefix: str,
+        maxsize: int,
+        ttl: Optional[float],
+        redis_ttl: Optional[int],
+    ):
+        self.local = LRUCache(maxsize=maxsize, ttl=ttl)
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.redis_ttl = redis_ttl
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.redis_errors = 0
+
+    def encode(self, value: Any) -> bytes:
+        return value
+
+    def decode(self, buffer: bytes) -> Any:
+        return buffer
+
+    async def lookup(self, key: str) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.redis_client is None:
+            return value
+
+        try:
+            buffer = await self.redis_client.get(key)
+        except RedisError:
+            logger.warning(f"{self.name} cache lookup failed", exc_info=True)
+            self.redis_errors += 1
+            return None
+
+        if buffer is None:
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        value = self.decode(buffer)
+        self.local.set(key, value)
+        return value
+
+    async def store(self, key: str, value: Any):
+        self.local.set(key, value)
+        if self.redis_client is None:
+            return
+
+        try:
+            await self.redis_client.set(
+                key, self.encode(value), ex=self.redis_ttl or None
+            )
+        except RedisError:
+            logger.warning(f"{self.name} cache write failed", exc_info=True)
+            self.redis_errors += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.local.stats(),
+            "redis_hits": self.redis_hits,
+            "redis_misses": self.redis_misses,
+            "redis_errors": self.redis_errors,
+        }
+
+
+class EmbeddingCache(TieredCache):
+    """Two-tier cache for query embeddings.
+
+    The first tier is a per-process LRU. The second tier is shared through
+    Redis so that every API worker benefits from a hit, with vectors stored
+    as raw float32 bytes. Keys are derived from the provider, the model name
+    and the preprocessed text, so changing a configured model automatically
+    stops serving vectors produced by the previous one.
+    """
+
+    name = "Embedding"
+
+    def __init__(
+        self,
+        redis_client: Optional[aredis.Redis] = None,
+        prefix: str = config.EMBEDDING_CACHE_PREFIX,
+        maxsize: int = config.EMBEDDING_CACHE_SIZE,
+        ttl: Optional[float] = config.EMBEDDING_CACHE_TTL,
+        redis_ttl: Optional[int] = config.EMBEDDING_CACHE_REDIS_TTL,
+    ):
+        super().__init__(redis_client, prefix, maxsize, ttl, redis_ttl)
+
+    def key(self, provider: str, model: str, text: str) -> str:
+        digest = hashlib.sha1(f"{model}\x00{text}".encode()).hexdigest()
+        return f"{self.prefix}:{provider}:{digest}"
+
+    def encode(self, value: List[float]) -> bytes:
+        return np.asarray(value, dtype=np.float32).tobytes()
+
+    def decode(self, buffer: bytes) -> List[float]:
+        return np.frombuffer(buffer, dtype=np.float32).tolist()
+
+    async def get(self, provider: str, model: str, text: str) -> Optional[List[float]]:
+        """Look up an embedding, promoting Redis hits into the local tier.
+
+        Args:
+            provider (str): Embedding provider name.
+            model (str): Model name used by the provider.
+            text (str): Preprocessed text that was embedded.
+
+        Returns:
+            Optional[List[float]]: The cached embedding or None on a miss.
+        """
+        return await self.lookup(self.key(provider, model, text))
+
+    async def set(self, provider: str, model: str, text: str, vector: List[float]):
+        """Store an embedding in both cache tiers."""
+        await self.store(self.key(provider, model, text), vector)
+
+
+class ResponseCache(TieredCache):
+    """Two-tier cache of serialized search responses.
+
+    Keys combine the index version with a digest of the canonical request
+    parameters, so a write to the index, which bumps the version, stops
+    every worker from serving responses computed before it. Bodies are
+    stored as they were sent, so a hit skips embedding, querying and
+    serialization.
+    """
+
+    name = "Response"
+
+    def __init__(
+        self,
+        redis_client: Optional[aredis.Redis] = None,
+        prefix: str = config.RESPONSE_CACHE_PREFIX,
+        maxsize: int = config.RESPONSE_CACHE_SIZE,
+        ttl: Optional[float] = config.RESPONSE_CACHE_TTL,
+        redis_ttl: Optional[int] = config.RESPONSE_CACHE_REDIS_TTL,
+    ):
+        super().__init__(redis_client, prefix, maxsize, ttl, redis_ttl)
+
+    def key(self, version: int, endpoint: str, params: Dict[str, Any]) -> str:
+        """
+        Cache key of a request. params must already be canonical, e.g. with
+        filters normalized; they are hashed as JSON with sorted keys.
+        """
+        canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+        digest = hashlib.sha1(f"{endpoint}\x00{canonical}".encode()).hexdigest()
+        return f"{self.prefix}:{version}:{endpoint}:{digest}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.lookup(key)
+
+    async def set(self, key: str, body: bytes):
+        await self.store(key, body)
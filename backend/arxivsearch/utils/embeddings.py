@@ -1,6 +1,12 @@
+import asyncio
+import functools
+import hashlib
 import re
 import string
+import threading
+from typing import Any, Dict, Iterable
 
+import numpy as np
 from redisvl.utils.vectorize import (
     CohereTextVectorizer,
     HFTextVectorizer,
@@ -8,7 +14,17 @@ from redisvl.utils.vectorize import (
 )
 
 from arxivsearch import config
+from arxivsearch.db.utils import get_async_client, get_schema
 from arxivsearch.schema.models import Provider
+from arxivsearch.utils.batching import MicroBatcher
+from arxivsearch.utils.cache import EmbeddingCache
+from arxivsearch.utils.executor import (
+    hf_embed_many,
+    hf_process_executor,
+    thread_executor,
+)
+from arxivsearch.utils.metrics import stage
+from arxivsearch.utils.model_server import ModelClient
 
 
 def preprocess_text(text: str) -> str:
@@ -38,28 +54,229 @@ def preprocess_text(text: str) -> str:
     return text.strip()
 
 
+class StubVectorizer:
+    """Deterministic offline stand-in for a provider vectorizer.
+
+    Each text seeds a random unit vector of the provider's dimension, so the
+    same text always embeds the same way and no model download or API key
+    is needed.
+    """
+
+    def __init__(self, dims: int):
+        self.dims = dims
+
+    def embed(self, text: str, **kwargs) -> list[float]:
+        seed = int.from_bytes(hashlib.sha1(text.encode()).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dims)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    def embed_many(self, texts: list[str], **kwargs) -> list[list[float]]:
+        return [self.embed(text) for text in texts]
+
+    async def aembed_many(self, texts: list[str], **kwargs) -> list[list[float]]:
+        return self.embed_many(texts)
+
+
+class ProviderNotEnabled(ValueError):
+    """Raised for embedding requests to a provider missing from
+    EMBEDDING_PROVIDERS."""
+
+
 class Embeddings:
+    """
+    Query embeddings for the enabled providers.
+
+    Provider vectorizers are created on first use (or by warmup), so
+    constructing this is cheap: no model is loaded and no API key is needed
+    until a provider is actually used.
+    """
+
+    def __init__(self, providers: Iterable[str] = config.EMBEDDING_PROVIDERS):
+        self.providers = list(providers)
+        self._vectorizers: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        # Network providers share a thread pool, the local HuggingFace model
+        # gets its own pool of threads or worker processes
+        self.network_executor = thread_executor(
+            "network", config.EMBEDDING_THREAD_WORKERS
+        )
+        self.hf_in_process = (
+            config.EMBEDDING_STUB or config.HF_EMBEDDING_BACKEND != "process"
+        )
+        # with the server backend every worker shares one model server
+        self.model_client = (
+            ModelClient() if config.HF_EMBEDDING_BACKEND == "server" else None
+        )
+        if self.hf_in_process:
+            self.hf_executor = thread_executor(
+                "huggingface", config.EMBEDDING_PROCESS_WORKERS
+            )
+        else:
+            # worker processes load the model on their first call
+            self.hf_executor = hf_process_executor(
+                config.SENTENCE_TRANSFORMER_MODEL, config.EMBEDDING_PROCESS_WORKERS
+            )
+        self.cache = EmbeddingCache(
+            redis_client=get_async_client() if config.EMBEDDING_CACHE_REDIS else None
+        )
+        # Concurrent requests per provider are grouped into batch calls
+        self.batchers = {
+            provider: MicroBatcher(
+                provider, functools.partial(self._embed_many, provider)
+            )
+            for provider in self.providers
+        }
+
+    def check(self, provider: str):
+        if provider not in self.providers:
+            raise ProviderNotEnabled(f"Embedding provider {provider} is not enabled")
+
+    def vectorizer(self, provider: str) -> Any:
+        """Vectorizer of an enabled provider, created on first use. Blocks
+        while the HuggingFace model loads, call it off the event loop."""
+        self.check(provider)
+        with self._lock:
+            if provider not in self._vectorizers:
+                self._vectorizers[provider] = self._create_vectorizer(provider)
+            return self._vectorizers[provider]
+
+    @staticmethod
+    def _create_vectorizer(provider: str) -> Any:
+        if config.EMBEDDING_STUB:
+            return StubVectorizer(get_schema().fields[provider].attrs.dims)
+        if provider == Provider.huggingface.value:
+            return HFTextVectorizer(model=config.SENTENCE_TRANSFORMER_MODEL)
+        elif provider == Provider.openai.value:
+            return OpenAITextVectorizer(model=config.OPENAI_EMBEDDING_MODEL)
+        elif provider == Provider.cohere.value:
+            return CohereTextVectorizer(model=config.COHERE_EMBEDDING_MODEL)
+        raise ValueError(f"Unknown embedding provider {provider}")
+
+    async def warmup(self, provider: str):
+        """
+        Create the vectorizer of a provider ahead of the first request. The
+        HuggingFace model (and the stubs) also run a dummy embedding, once
+        per worker process with the process backend, so that no request
+        pays for loading the model. With the server backend this waits for
+        the model server instead. Network providers are not called.
+        """
+        self.check(provider)
+        if provider == Provider.huggingface.value and self.model_client:
+            await self.model_client.wait_until_ready()
+            return
+        if provider == Provider.huggingface.value and not self.hf_in_process:
+            await asyncio.gather(
+                *[
+                    self.hf_executor.run(hf_embed_many, ["warmup"])
+                    for _ in range(config.EMBEDDING_PROCESS_WORKERS)
+                ]
+            )
+            return
+        if provider == Provider.huggingface.value or config.EMBEDDING_STUB:
+            await self._embed_many(provider, ["warmup"])
+        else:
+            await asyncio.to_thread(self.vectorizer, provider)
 
-    def __init__(self):
-        self.oai_vectorizer = OpenAITextVectorizer(model=config.OPENAI_EMBEDDING_MODEL)
-        self.co_vectorizer = CohereTextVectorizer(model=config.COHERE_EMBEDDING_MODEL)
-        self.hf_vectorizer = HFTextVectorizer(model=config.SENTENCE_TRANSFORMER_MODEL)
+    @staticmethod
+    def model_name(provider: str) -> str:
+        """Name of the model configured for a provider. Part of the cache
+        key so that switching models invalidates cached vectors."""
+        model = {
+            Provider.huggingface.value: config.SENTENCE_TRANSFORMER_MODEL,
+            Provider.openai.value: config.OPENAI_EMBEDDING_MODEL,
+            Provider.cohere.value: config.COHERE_EMBEDDING_MODEL,
+        }[provider]
+        return f"stub:{model}" if config.EMBEDDING_STUB else model
 
     async def get(self, provider: str, text: str):
         """
-        Create embeddings from input text.
+        Create embeddings from input text, serving repeated queries from the
+        embedding cache.
 
         Args:
             provider (str): Specified provider to use
             text (str): Text to embed.
         """
+        self.check(provider)
+        with stage("preprocess"):
+            text = preprocess_text(text)
+        model = self.model_name(provider)
+        with stage("embedding_cache"):
+            vector = await self.cache.get(provider, model, text)
+        if vector is None:
+            with stage("embed"):
+                vector = await self._embed(provider, text)
+            await self.cache.set(provider, model, text, vector)
+        return vector
+
+    async def get_many(self, provider: str, texts: list[str]):
+        """
+        Create embeddings for several texts, embedding every cache miss in a
+        single batched provider call.
+
+        Args:
+            provider (str): Specified provider to use
+            texts (list[str]): Texts to embed.
+        """
+        self.check(provider)
+        texts = [preprocess_text(text) for text in texts]
+        model = self.model_name(provider)
+        vectors = await asyncio.gather(
+            *[self.cache.get(provider, model, text) for text in texts]
+        )
+        missing = list(
+            dict.fromkeys(
+                text for text, vector in zip(texts, vectors) if vector is None
+            )
+        )
+        if missing:
+            embedded = dict(zip(missing, await self._embed_many(provider, missing)))
+            for text, vector in embedded.items():
+                await self.cache.set(provider, model, text, vector)
+            vectors = [
+                embedded[text] if vector is None else vector
+                for text, vector in zip(texts, vectors)
+            ]
+        return vectors
+
+    async def _embed(self, provider: str, text: str):
+        """Embed already preprocessed text as part of the provider's next
+        micro-batch."""
+        return await self.batchers[provider].submit(text)
+
+    async def _embed_many(self, provider: str, texts: list[str]):
+        """Call the provider batch vectorizer on already preprocessed texts
+        without blocking the event loop."""
         if provider == Provider.huggingface.value:
             # Use HuggingFace Sentence Transformer
-            return self.hf_vectorizer.embed(text, preprocess=preprocess_text)
+            if self.model_client:
+                return await self.model_client.embed_many(texts)
+            if not self.hf_in_process:
+                return await self.hf_executor.run(hf_embed_many, texts)
+            return await self.hf_executor.run(self._hf_embed_many, texts)
         elif provider == Provider.openai.value:
             # Use OpenAI Embeddings API
-            return await self.oai_vectorizer.aembed(text, preprocess=preprocess_text)
+            return await asyncio.wait_for(
+                self.vectorizer(provider).aembed_many(texts),
+                config.EMBEDDING_TIMEOUT,
+            )
         elif provider == Provider.cohere.value:
-            return self.co_vectorizer.embed(
-                text, input_type="search_query", preprocess=preprocess_text
+            return await self.network_executor.run(
+                self.vectorizer(provider).embed_many,
+                texts,
+                input_type="search_query",
             )
+        raise ValueError(f"Unknown embedding provider {provider}")
+
+    def _hf_embed_many(self, texts: list[str]):
+        # runs on an executor thread, where loading the model may block
+        return self.vectorizer(Provider.huggingface.value).embed_many(texts)
+
+    def batch_stats(self) -> dict:
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+    def shutdown(self):
+        self.network_executor.shutdown()
+        self.hf_executor.shutdown()
+        if self.model_client:
+            self.model_client.close()
@@ -0,0 +1,119 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from arxivsearch import config
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingQueueFull(Exception):
+    """Raised when an executor already has its maximum number of pending
+    embedding calls."""
+
+
+class EmbeddingExecutor:
+    """Run blocking embedding calls off the event loop.
+
+    Wraps a concurrent.futures executor with a cap on pending calls and a
+    per-call timeout so that slow providers shed load instead of piling up
+    requests behind them.
+    """
+
+    def __init__(
+        self,
+        executor: Executor,
+        name: str,
+        max_pending: int = config.EMBEDDING_MAX_PENDING,
+        timeout: Optional[float] = config.EMBEDDING_TIMEOUT,
+    ):
+        self.executor = executor
+        self.name = name
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the executor.
+
+        Raises:
+            EmbeddingQueueFull: If max_pending calls are already in flight.
+            asyncio.TimeoutError: If the call does not finish within timeout.
+                The underlying call is not interrupted, but the caller is
+                released.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise EmbeddingQueueFull(
+                f"{self.name} embedding queue is full ({self.max_pending} pending)"
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self.executor, functools.partial(fn, *args, **kwargs)
+            )
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+def thread_executor(name: str, max_workers: int, **kwargs) -> EmbeddingExecutor:
+    return EmbeddingExecutor(
+        ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name),
+        name=name,
+        **kwargs,
+    )
+
+
+# HuggingFace model loaded inside each worker process
+_worker_vectorizer = None
+
+
+def _init_hf_worker(model: str):
+    global _worker_vectorizer
+    from redisvl.utils.vectorize import HFTextVectorizer
+
+    _worker_vectorizer = HFTextVectorizer(model=model)
+
+
+def hf_embed_many(texts: List[str]) -> List[List[float]]:
+    """Embed preprocessed texts with the HuggingFace model of the current
+    worker process."""
+    return _worker_vectorizer.embed_many(texts)  # type: ignore
+
+
+def hf_process_executor(model: str, max_workers: int, **kwargs) -> EmbeddingExecutor:
+    """Executor that runs sentence-transformers inference in dedicated
+    processes, each holding its own copy of the model. Keyword arguments
+    override the EmbeddingExecutor limits."""
+    return EmbeddingExecutor(
+        ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_hf_worker,
+            initargs=(model,),
+        ),
+        name="huggingface",
+        **kwargs,
+    )
@@ -0,0 +1,74 @@
+from typing import Any, Dict, List, Optional
+
+RRF = "rrf"
+WEIGHTED = "weighted"
+
+
+def fuse(
+    results: Dict[str, List[Dict[str, Any]]],
+    method: str = RRF,
+    weights: Optional[Dict[str, float]] = None,
+    k: int = 60,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Merge the KNN results of several providers into a single ranking.
+
+    With reciprocal rank fusion (rrf), a paper scores sum(w / (k + rank))
+    over the providers that returned it, ranks starting at 1. It only
+    depends on ranks, so it works whatever the distance scales of the
+    models. With weighted fusion, a paper scores the weighted mean of its
+    cosine similarities, a provider that did not return it counting as 0.
+
+    Args:
+        results (Dict[str, List[Dict[str, Any]]]): KNN results per provider,
+            nearest first, each with its vector_distance.
+        method (str, optional): RRF or WEIGHTED. Defaults to RRF.
+        weights (Dict[str, float], optional): Non-negative weight per
+            provider, 1 for providers left out, not all zero. Defaults to
+            None.
+        k (int, optional): RRF rank constant. Defaults to 60.
+        limit (int, optional): Number of papers to return, all when None.
+
+    Returns:
+        List[Dict[str, Any]]: Papers by descending score, with their fused
+            score and the rank and vector distance of every provider that
+            returned them.
+    """
+    if method not in (RRF, WEIGHTED):
+        raise ValueError(f"Unknown fusion method {method}")
+    weights = {provider: (weights or {}).get(provider, 1.0) for provider in results}
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError("Fusion weights must not be negative")
+    total_weight = sum(weights.values())
+    if results and not total_weight:
+        raise ValueError("Fusion weights must not all be zero")
+
+    fused: Dict[str, Dict[str, Any]] = {}
+    for provider, papers in results.items():
+        weight = weights[provider]
+        for rank, paper in enumerate(papers, start=1):
+            paper_id = paper["paper_id"]
+            entry = fused.get(paper_id)
+            if entry is None:
+                entry = {key: value for key, value in paper.items() if key != "id"}
+                entry.pop("vector_distance", None)
+                entry.update(score=0.0, ranks={}, distances={})
+                fused[paper_id] = entry
+            distance = float(paper["vector_distance"])
+            entry["ranks"][provider] = rank
+            entry["distances"][provider] = distance
+            if method == RRF:
+                entry["score"] += weight / (k + rank)
+            else:
+                entry["score"] += weight * (1 - distance) / total_weight
+
+    ranked = sorted(
+        fused.values(),
+        key=lambda entry: (
+            -entry["score"],
+            min(entry["ranks"].values()),
+            entry["paper_id"],
+        ),
+    )
+    return ranked if limit is None else ranked[:limit]
@@ -0,0 +1,255 @@
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Awaitable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Default bucket upper bounds
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+WAIT_SECONDS_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1)
+LATENCY_SECONDS_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, in the style of
+    Prometheus histograms."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict:
+        """Cumulative bucket counts keyed by upper bound, plus sum and count."""
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+T = TypeVar("T")
+
+
+class RequestTimings:
+    """Stage durations in seconds and metric labels collected while serving
+    one request."""
+
+    __slots__ = ("stages", "labels")
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.labels: Dict[str, str] = {}
+
+    def server_timing(self) -> str:
+        return ", ".join(
+            f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()
+        )
+
+
+_current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+class _Stage:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: RequestTimings, name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        stages = self.timings.stages
+        stages[self.name] = stages.get(self.name, 0.0) + elapsed
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name: str):
+    """
+    Context manager timing a stage of the current request. Repeated stages
+    accumulate. Outside an instrumented request this is a shared no-op, so
+    instrumented code costs one context variable lookup when timing is off.
+    """
+    timings = _current_timings.get()
+    if timings is None:
+        return _NO_STAGE
+    return _Stage(timings, name)
+
+
+async def timed(name: str, awaitable: Awaitable[T]) -> T:
+    """Await awaitable as a stage of the current request."""
+    with stage(name):
+        return await awaitable
+
+
+def set_label(name: str, value: str):
+    """Attach a metric label, such as the provider, to the current request."""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.labels[name] = value
+
+
+class MetricsRegistry:
+    """Labelled histograms rendered in the Prometheus text format."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_SECONDS_BUCKETS):
+        self.buckets = buckets
+        self.histograms: Dict[str, Dict[Tuple, Histogram]] = {}
+        self.help: Dict[str, str] = {}
+
+    def observe(self, name: str, labels: Tuple[Tuple[str, str], ...], value: float):
+        series = self.histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for name, series in self.histograms.items():
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                lines += render_histogram(name, dict(labels), histogram.snapshot())
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def render_histogram(name: str, labels: Dict[str, str], snapshot: Dict) -> List[str]:
+    """Prometheus sample lines for a Histogram snapshot."""
+    lines = []
+    for bound, count in snapshot["buckets"].items():
+        le = "+Inf" if bound == "inf" else bound
+        lines.append(f"{name}_bucket{format_labels({**labels, 'le': le})} {count}")
+    lines.append(f"{name}_sum{format_labels(labels)} {snapshot['sum']}")
+    lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+    return lines
+
+
+def render_samples(
+    name: str, kind: str, samples: Iterable[Tuple[Dict[str, str], float]]
+) -> List[str]:
+    """Prometheus lines for a gauge or counter with one sample per label set."""
+    lines = [f"# TYPE {name} {kind}"]
+    lines += [f"{name}{format_labels(labels)} {value}" for labels, value in samples]
+    return lines
+
+
+# request and stage latencies of the API
+registry = MetricsRegistry()
+registry.help["arxivsearch_request_duration_seconds"] = "API request latency"
+registry.help["arxivsearch_stage_duration_seconds"] = "API request stage latency"
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that times API requests and the stages recorded with
+    stage() while serving them. Adds a Server-Timing header and feeds the
+    metrics registry, each only when enabled.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        path_prefix: str,
+        server_timing: bool = True,
+        metrics: Optional[MetricsRegistry] = registry,
+    ):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.server_timing = server_timing
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_timing(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                timings.stages["total"] = time.perf_counter() - start
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timings.reset(token)
+            if self.metrics is not None:
+                self.record(scope, timings, status["code"])
+
+    def record(self, scope: Scope, timings: RequestTimings, status: int):
+        route = scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        provider = timings.labels.get("provider", "")
+        total = timings.stages.get("total", 0.0)
+        self.metrics.observe(  # type: ignore
+            "arxivsearch_request_duration_seconds",
+            (("endpoint", endpoint), ("status", str(status))),
+            total,
+        )
+        for name, seconds in timings.stages.items():
+            if name != "total":
+                self.metrics.observe(  # type: ignore
+                    "arxivsearch_stage_duration_seconds",
+                    (("endpoint", endpoint), ("provider", provider), ("stage", name)),
+                    seconds,
+                )
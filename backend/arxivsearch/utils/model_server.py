@@ -0,0 +1,329 @@
+"""
+Shared HuggingFace embedding model for multi-worker deployments.
+
+With HF_EMBEDDING_BACKEND=server, one model server process loads the
+sentence-transformers model and every API worker sends it preprocessed
+query texts over a Unix socket, so model memory does not grow with the
+number of workers. Texts from all workers go through one MicroBatcher, so
+concurrent queries from different workers are embedded in the same batch.
+
+`main.main()` starts the server next to uvicorn. Run it on its own, e.g.
+as a separate container sharing the socket, with:
+
+    python -m arxivsearch.utils.model_server --socket /tmp/arxivsearch-embeddings.sock
+
+Frames are a fixed header followed by a payload. Requests carry a JSON list
+of texts. Responses carry the float32 vectors row by row, or an error
+message when the dimension field is negative: OVERLOADED when the server
+sheds the request, ERROR for any other failure.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import stat
+import struct
+from multiprocessing.context import SpawnProcess
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from arxivsearch import config
+from arxivsearch.schema.models import Provider
+from arxivsearch.utils.batching import MicroBatcher
+from arxivsearch.utils.executor import EmbeddingQueueFull, thread_executor
+
+logger = logging.getLogger(__name__)
+
+# request id, payload length
+REQUEST = struct.Struct("!II")
+# request id, payload length, vector dimensions (negative for an error)
+RESPONSE = struct.Struct("!IIi")
+# dimension field of error responses
+ERROR = -1
+OVERLOADED = -2
+
+
+class ModelServerUnavailable(Exception):
+    """Raised when the model server cannot be reached or the connection is
+    lost before a response arrives."""
+
+
+class ModelServerError(RuntimeError):
+    """Raised when the model server fails to embed a request."""
+
+
+class ModelServer:
+    """
+    Serve embeddings of one model over a Unix socket. Requests from every
+    connection are micro-batched together, and inference runs on
+    MODEL_SERVER_THREADS threads so the server keeps reading requests
+    while a batch is embedded. Requests arriving with MODEL_SERVER_MAX_PENDING
+    batches already queued are rejected as overloaded, and clients raise
+    EmbeddingQueueFull for them.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        vectorizer,
+        max_batch_size: int = config.MODEL_SERVER_BATCH_SIZE,
+        max_wait: float = config.MODEL_SERVER_BATCH_WAIT_MS / 1000,
+        threads: int = config.MODEL_SERVER_THREADS,
+        max_pending: int = config.MODEL_SERVER_MAX_PENDING,
+    ):
+        self.path = path
+        self.vectorizer = vectorizer
+        self.executor = thread_executor(
+            "model_server", threads, max_pending=max_pending, timeout=None
+        )
+        self.batcher = MicroBatcher(
+            "model_server", self._embed_many, max_batch_size, max_wait
+        )
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def _embed_many(self, texts: List[str]) -> List[List[float]]:
+        return await self.executor.run(self.vectorizer.embed_many, texts)
+
+    async def start(self):
+        """
+        Listen on the socket path, readable and writable by the owner only.
+
+        Raises:
+            RuntimeError: If another server answers on the path, or the path
+                exists and is not a socket.
+        """
+        if os.path.exists(self.path):
+            if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+                raise RuntimeError(f"{self.path} exists and is not a socket")
+            try:
+                _, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                # left behind by a server that did not shut down cleanly
+                os.unlink(self.path)
+            else:
+                writer.close()
+                await writer.wait_closed()
+                raise RuntimeError(
+                    f"A model server is already listening on {self.path}"
+                )
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o600)
+        logger.info(f"Model server listening on {self.path}")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        try:
+            while True:
+                request_id, length = REQUEST.unpack(
+                    await reader.readexactly(REQUEST.size)
+                )
+                texts = json.loads(await reader.readexactly(length))
+                # respond out of order, so one connection carries many batches
+                task = asyncio.ensure_future(self._respond(writer, request_id, texts))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+    async def _respond(
+        self, writer: asyncio.StreamWriter, request_id: int, texts: List[str]
+    ):
+        try:
+            if not texts:
+                raise ValueError("No texts to embed")
+            vectors = await asyncio.gather(
+                *[self.batcher.submit(text) for text in texts]
+            )
+            matrix = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+            header = RESPONSE.pack(request_id, matrix.nbytes, matrix.shape[1])
+            payload = matrix.tobytes()
+        except EmbeddingQueueFull as e:
+            logger.warning(f"Embedding request rejected: {e}")
+            payload = str(e).encode()
+            header = RESPONSE.pack(request_id, len(payload), OVERLOADED)
+        except Exception as e:
+            logger.exception("Embedding request failed")
+            payload = f"{type(e).__name__}: {e}".encode()
+            header = RESPONSE.pack(request_id, len(payload), ERROR)
+        if not writer.is_closing():
+            writer.write(header + payload)
+            await writer.drain()
+
+
+class ModelClient:
+    """
+    Connection from an API worker to the model server.
+
+    Requests are multiplexed over a single connection, opened on first use
+    and reopened after a failure, and matched to responses by id.
+    """
+
+    def __init__(
+        self,
+        path: str = config.MODEL_SERVER_SOCKET,
+        timeout: Optional[float] = config.EMBEDDING_TIMEOUT,
+    ):
+        self.path = path
+        self.timeout = timeout
+        self.errors = 0
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._receiver: Optional[asyncio.Future] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def _connect(self) -> asyncio.StreamWriter:
+        # the lock is created lazily, inside the event loop that uses it
+        self._lock = self._lock or asyncio.Lock()
+        async with self._lock:
+            if self._writer is None or self._writer.is_closing():
+                try:
+                    reader, writer = await asyncio.open_unix_connection(self.path)
+                except OSError as e:
+                    raise ModelServerUnavailable(
+                        f"Model server at {self.path} is unavailable ({e})"
+                    )
+                self._writer = writer
+                self._receiver = asyncio.ensure_future(self._receive(reader, writer))
+            return self._writer
+
+    async def _receive(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                request_id, length, dims = RESPONSE.unpack(
+                    await reader.readexactly(RESPONSE.size)
+                )
+                payload = await reader.readexactly(length)
+                future = self._pending.pop(request_id, None)
+                if future is None or future.done():
+                    # the caller timed out
+                    continue
+                if dims == OVERLOADED:
+                    future.set_exception(EmbeddingQueueFull(payload.decode()))
+                elif dims < 0:
+                    future.set_exception(ModelServerError(payload.decode()))
+                else:
+                    vectors = np.frombuffer(payload, dtype=np.float32)
+                    future.set_result(vectors.reshape(-1, dims).tolist())
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+            pending, self._pending = self._pending, {}
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(
+                        ModelServerUnavailable("Lost connection to the model server")
+                    )
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed preprocessed texts with the shared model.
+
+        Raises:
+            ModelServerUnavailable: If the server cannot be reached.
+            EmbeddingQueueFull: If the server is overloaded.
+            ModelServerError: If the server fails to embed the texts.
+            asyncio.TimeoutError: If no response arrives within timeout.
+        """
+        try:
+            writer = await self._connect()
+            request_id = next(self._ids) % 2**32
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+            payload = json.dumps(texts).encode()
+            try:
+                writer.write(REQUEST.pack(request_id, len(payload)) + payload)
+                await writer.drain()
+                return await asyncio.wait_for(future, self.timeout)
+            finally:
+                self._pending.pop(request_id, None)
+        except ConnectionError as e:
+            self.errors += 1
+            raise ModelServerUnavailable(f"Lost connection to the model server ({e})")
+        except Exception:
+            self.errors += 1
+            raise
+
+    async def wait_until_ready(self, poll_interval: float = config.READY_POLL_INTERVAL):
+        """Wait for the server to accept connections, which it does once
+        its model is loaded, and run a first embedding."""
+        while True:
+            try:
+                await self.embed_many(["warmup"])
+                return
+            except ModelServerUnavailable:
+                logger.info(f"Waiting for the model server at {self.path}")
+                await asyncio.sleep(poll_interval)
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._pending), "errors": self.errors}
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def create_vectorizer():
+    # imported here because the embeddings module depends on this one
+    from arxivsearch.utils.embeddings import Embeddings
+
+    return Embeddings._create_vectorizer(Provider.huggingface.value)
+
+
+def serve(path: str = config.MODEL_SERVER_SOCKET):
+    """Load the model, then serve it on path until interrupted."""
+    logging.basicConfig(level=logging.INFO)
+    server = ModelServer(path, create_vectorizer())
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.executor.shutdown()
+        # only remove the socket this server listened on
+        if server._server is not None and os.path.exists(path):
+            os.unlink(path)
+
+
+def start_process(path: str = config.MODEL_SERVER_SOCKET) -> SpawnProcess:
+    """Run the model server in a child process that exits with its parent."""
+    process = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(path,), name="model-server", daemon=True
+    )
+    process.start()
+    return process
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve the HuggingFace embedding model to the API workers."
+    )
+    parser.add_argument("--socket", default=config.MODEL_SERVER_SOCKET)
+    args = parser.parse_args()
+    serve(args.socket)
@@ -0,0 +1,122 @@
+import json
+from typing import Any, Dict, List, Type, Union
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:  # pragma: no cover
+    HAS_ORJSON = False
+
+try:
+    import msgpack
+
+    HAS_MSGPACK = True
+except ImportError:  # pragma: no cover
+    HAS_MSGPACK = False
+
+JSON_MEDIA_TYPE = "application/json"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# paper fields returned in compact responses
+COMPACT_FIELDS = ["paper_id", "authors", "categories", "year", "title"]
+# scores of fused multi-provider results
+FUSED_FIELDS = ["score", "ranks", "distances"]
+# paper fields written by the NDJSON export
+EXPORT_FIELDS = COMPACT_FIELDS + ["abstract"]
+
+
+def compact_paper(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Trim a search result to the fields the UI shows, dropping embeddings
+    and abstracts. Vector search results keep their distance and
+    similarity score, fused results their fused score, ranks and distances.
+    """
+    paper = {field: doc.get(field, "") for field in COMPACT_FIELDS}
+    if "vector_distance" in doc:
+        distance = float(doc["vector_distance"])
+        paper["vector_distance"] = distance
+        paper["similarity_score"] = 1 - distance
+    for field in FUSED_FIELDS:
+        if field in doc:
+            paper[field] = doc[field]
+    return paper
+
+
+def compact_response(
+    total: int, papers: List[Dict[str, Any]], **fields: Any
+) -> Dict[str, Any]:
+    return {
+        "total": total,
+        "papers": [compact_paper(paper) for paper in papers],
+        **fields,
+    }
+
+
+def search_content(
+    model: Type[BaseModel],
+    total: int,
+    papers: List[Dict[str, Any]],
+    compact: bool,
+    **fields: Any,
+) -> Union[BaseModel, Dict[str, Any]]:
+    """
+    Build a search response, validated once into model unless compact.
+    Extra fields such as next_cursor are passed through.
+    """
+    if compact:
+        return compact_response(total, papers, **fields)
+    return model(total=total, papers=papers, **fields)
+
+
+def ndjson(papers: List[Dict[str, Any]]) -> bytes:
+    """Encode papers as newline delimited JSON, one paper per line."""
+    return b"".join(
+        dumps({field: paper.get(field, "") for field in EXPORT_FIELDS}) + b"\n"
+        for paper in papers
+    )
+
+
+def dumps(content: Any) -> bytes:
+    """Encode plain data as JSON, with orjson when it is installed."""
+    if HAS_ORJSON:
+        return orjson.dumps(content)
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def media_type(request: Request) -> str:
+    """Response format negotiated from the Accept header."""
+    if HAS_MSGPACK and MSGPACK_MEDIA_TYPE in request.headers.get("accept", ""):
+        return MSGPACK_MEDIA_TYPE
+    return JSON_MEDIA_TYPE
+
+
+def render(content: Union[BaseModel, Dict[str, Any]], request: Request) -> Response:
+    """
+    Serialize a response exactly once.
+
+    Pydantic models are already validated, so they are encoded directly with
+    the pydantic-core serializer instead of being validated again against
+    the route response_model. Plain (compact) data is encoded with orjson.
+    Clients sending ``Accept: application/msgpack`` get MessagePack when
+    msgpack is installed.
+
+    Args:
+        content: Response model or plain data.
+        request (Request): Request whose Accept header selects the format.
+
+    Returns:
+        Response: Encoded response.
+    """
+    if media_type(request) == MSGPACK_MEDIA_TYPE:
+        if isinstance(content, BaseModel):
+            content = content.model_dump(mode="json")
+        return Response(msgpack.packb(content), media_type=MSGPACK_MEDIA_TYPE)
+
+    if isinstance(content, BaseModel):
+        return Response(content.model_dump_json(), media_type=JSON_MEDIA_TYPE)
+    return Response(dumps(content), media_type=JSON_MEDIA_TYPE)
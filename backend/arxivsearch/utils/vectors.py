@@ -0,0 +1,57 @@
+from typing import Any
+
+import numpy as np
+
+# Storage datatypes supported for paper vectors
+DATATYPES = ("float32", "float16", "bfloat16", "int8")
+
+
+def int8_field(provider: str) -> str:
+    """Name of the field holding the int8 quantized copy of a provider vector."""
+    return f"{provider}_int8"
+
+
+def to_float32(vector: Any) -> np.ndarray:
+    """Coerce a list, array or float32 byte buffer into a float32 array."""
+    if isinstance(vector, (bytes, memoryview)):
+        return np.frombuffer(vector, dtype=np.float32)
+    return np.asarray(vector, dtype=np.float32)
+
+
+def encode_vector(vector: Any, datatype: str) -> bytes:
+    """
+    Encode a vector as the byte payload Redis expects for a vector field of
+    the given datatype.
+
+    bfloat16 keeps the upper 16 bits of each float32 (rounded to nearest
+    even). int8 is a symmetric scalar quantization scaled by the largest
+    absolute component; cosine distance ignores the scale so no per-vector
+    factor needs to be stored.
+    """
+    vector = to_float32(vector)
+    if datatype == "float32":
+        return vector.tobytes()
+    if datatype == "float16":
+        return vector.astype(np.float16).tobytes()
+    if datatype == "bfloat16":
+        bits = vector.view(np.uint32).astype(np.uint64)
+        rounded = (bits + 0x7FFF + ((bits >> 16) & 1)) >> 16
+        return rounded.astype(np.uint16).tobytes()
+    if datatype == "int8":
+        scale = float(np.abs(vector).max()) or 1.0
+        return np.round(vector / scale * 127).astype(np.int8).tobytes()
+    raise ValueError(f"Unsupported vector datatype {datatype}")
+
+
+def decode_vector(buffer: bytes, datatype: str) -> np.ndarray:
+    """Decode a vector field payload back into a float32 array."""
+    if datatype == "float32":
+        return np.frombuffer(buffer, dtype=np.float32)
+    if datatype == "float16":
+        return np.frombuffer(buffer, dtype=np.float16).astype(np.float32)
+    if datatype == "bfloat16":
+        bits = np.frombuffer(buffer, dtype=np.uint16).astype(np.uint32) << 16
+        return bits.view(np.float32)
+    if datatype == "int8":
+        return np.frombuffer(buffer, dtype=np.int8).astype(np.float32) / 127
+    raise ValueError(f"Unsupported vector datatype {datatype}")
@@ -44,7 +44,7 @@ export const getPapers = async (limit = 15, skip = 0, years: string[] = [], cate
       var params = `?limit=${limit}&skip=${skip}&categories=${categories.join()}`
     }
   }
-  return fetchFromBackend(`${MASTER_URL}${params}`, 'GET');
+  return fetchFromBackend(`${MASTER_URL}${params}&compact=true`, 'GET');
 }
 // get papers from Redis through the FastAPI backend
 
@@ -68,7 +68,7 @@ export const getSemanticallySimilarPapers = async (
     categories: categories
   }
 
-  const url = MASTER_URL + "vector_search/by_paper";
+  const url = MASTER_URL + "vector_search/by_paper?compact=true";
   return fetchFromBackend(url, 'POST', body);
 };
 
@@ -92,6 +92,6 @@ export const getSemanticallySimilarPapersbyText = async (
 
   console.log(body)
 
-  const url = MASTER_URL + "vector_search/by_text";
+  const url = MASTER_URL + "vector_search/by_text?compact=true";
   return fetchFromBackend(url, 'POST', body);
 };